@@ -1,8 +1,8 @@
 import zipfile
 import xml.etree.ElementTree as ET
-import tempfile
-import shutil
 import os
+from functools import partial
+from services.ooxml_rewriter import rewrite_ooxml_in_place
 
 class OfficeMetadataHelper:
     _parts = {
@@ -47,42 +47,44 @@ class OfficeMetadataHelper:
         return metadata
 
     @staticmethod
-    def delete_metadata(file_path: str, fields_to_delete: list[str]) -> None:
-        ext = os.path.splitext(file_path)[-1].lower()
-        if ext not in OfficeMetadataHelper.OFFICE_EXTENSIONS:
-            raise ValueError(f"Unsupported file type: {ext}")
+    def _strip_part(part_name: str, data: bytes, fields_to_delete: list[str] | None) -> bytes:
+        """Removes the given fields (or all of them when None) from one docProps part."""
+        root = ET.fromstring(data)
 
-        tmp_fd, tmp_path = tempfile.mkstemp(suffix=ext)
-        os.close(tmp_fd)
+        if part_name in ('core', 'app'):
+            for child in list(root):
+                tag = child.tag.split('}')[-1]
+                key = f"{part_name}:{tag}"
+                if fields_to_delete is None or key in fields_to_delete:
+                    root.remove(child)
+        else:  # custom
+            for prop in root.findall(f'.//{{{OfficeMetadataHelper._ns_custom}}}property'):
+                name = prop.get('name')
+                key = f"custom:{name}"
+                if fields_to_delete is None or key in fields_to_delete:
+                    root.remove(prop)
 
-        with zipfile.ZipFile(file_path, 'r') as zin, \
-             zipfile.ZipFile(tmp_path, 'w') as zout:
+        return ET.tostring(root, encoding='utf-8', xml_declaration=True)
 
-            for item in zin.infolist():
-                data = zin.read(item.filename)
+    @staticmethod
+    def delete_metadata(file_path: str, fields_to_delete: list[str] | None) -> None:
+        """Removes fields from the docProps parts; `None` clears them all.
 
-                if item.filename in OfficeMetadataHelper._parts.values():
-                    part_name = next(
-                        key for key, val in OfficeMetadataHelper._parts.items()
-                        if val == item.filename
-                    )
-                    root = ET.fromstring(data)
+        Only those parts are rewritten. Every other package member is copied
+        over with its original compressed bytes into a sibling temp file,
+        which then replaces `file_path`.
+        """
+        ext = os.path.splitext(file_path)[-1].lower()
+        if ext not in OfficeMetadataHelper.OFFICE_EXTENSIONS:
+            raise ValueError(f"Unsupported file type: {ext}")
 
-                    if part_name in ('core', 'app'):
-                        for child in list(root):
-                            tag = child.tag.split('}')[-1]
-                            key = f"{part_name}:{tag}"
-                            if key in fields_to_delete:
-                                root.remove(child)
-                        data = ET.tostring(root, encoding='utf-8', xml_declaration=True)
-                    else:  # custom
-                        for prop in root.findall(f'.//{{{OfficeMetadataHelper._ns_custom}}}property'):
-                            name = prop.get('name')
-                            key = f"custom:{name}"
-                            if key in fields_to_delete:
-                                root.remove(prop)
-                        data = ET.tostring(root, encoding='utf-8', xml_declaration=True)
+        rewrites = {
+            path: partial(OfficeMetadataHelper._strip_part, part_name, fields_to_delete=fields_to_delete)
+            for part_name, path in OfficeMetadataHelper._parts.items()
+        }
 
-                zout.writestr(item, data)
+        rewrite_ooxml_in_place(file_path, rewrites)
 
-        shutil.move(tmp_path, file_path)
+    @staticmethod
+    def clear_metadata(file_path: str) -> None:
+        OfficeMetadataHelper.delete_metadata(file_path, None)
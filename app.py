@@ -1,25 +1,42 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager, contextmanager
 import asyncio
 import time
 import os
 import uuid
 import shutil
-import exiftool
 import json
-import tempfile
+import hashlib
 from typing import List
-from pathlib import Path
-from zipfile import ZipFile
-from io import BytesIO
 import zipfile
-from openpyxl import load_workbook
-from openpyxl.packaging.core import DocumentProperties
+import io
 from typing import Dict, List
 from monitor import PerformanceMiddleware
+from services.metrics import REGISTRY
+from services import spans
+from services.json_response import dumps, json_response, streaming_json_response
 from OfficeMetadataHelper import OfficeMetadataHelper as OMH
+from services.exiftool_pool import ExifToolPool
+from services.tag_allowlist import TagAllowlist
+from services.isobmff import IsobmffFormatError, skeleton_ranges, write_skeleton
+from services.tag_index import TagIndex
+from services.executor import BlockingExecutor
+from services.scratch import ScratchSpace
+from services.metadata_cache import MetadataCache
+from services.jpeg_stripper import strip_jpeg, strip_jpeg_file
+from services.jpeg_stripper import families_for_groups as jpeg_families_for_groups
+from services.png_stripper import strip_png, strip_png_file
+from services.png_stripper import selection_for_tags as png_selection_for_tags
+from services.isobmff_stripper import strip_isobmff, strip_isobmff_file
+from services.isobmff_stripper import selection_for_tags as isobmff_selection_for_tags
+from services.zip_stream import stream_zip
+from services.jobs import JobManager
+from services.expiry import ExpiryIndex
+from services.blob_store import BlobStore
+from services.batch_manifests import BatchManifests
 
 
 
@@ -27,22 +44,101 @@ from OfficeMetadataHelper import OfficeMetadataHelper as OMH
 
 TEMP_DIR = "uploads"
 MAX_AGE_SECONDS = 5 * 60  # 5 minutes
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB per read while streaming uploads to disk
+EXIFTOOL_BATCH_SIZE = int(os.getenv("EXIFTOOL_BATCH_SIZE", "32"))  # files per exiftool command in batch cleans
+SWEEP_INTERVAL_SECONDS = 10
+# How often the uploads directory is listed for files the expiry index doesn't know
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("RECONCILE_INTERVAL_SECONDS", str(MAX_AGE_SECONDS)))
+# Uploads up to this size are hashed, looked up and (JPEG/PNG) stripped in memory
+DISKLESS_MAX_BYTES = int(os.getenv("DISKLESS_MAX_BYTES", str(1024 * 1024)))
+# Viewed with exiftool's -fast and, for uploads not yet stored, from their header/trailer boxes only
+FAST_SCAN_SUFFIXES = {".mp4", ".mov"}
 
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+# Persistent exiftool workers shared by every endpoint.
+# Size with EXIFTOOL_POOL_SIZE, recycle after EXIFTOOL_MAX_REQUESTS commands.
+exiftool_pool = ExifToolPool.from_env()
+
+# Uploads are stored once per content hash; file ids are hard links to the blobs.
+blob_store = BlobStore.from_env(TEMP_DIR)
+
+# Expiry times and sizes of everything in TEMP_DIR, filled as uploads land.
+# Disk cap via UPLOADS_HIGH_WATER_BYTES / UPLOADS_LOW_WATER_BYTES.
+upload_expiry = ExpiryIndex.from_env(TEMP_DIR, MAX_AGE_SECONDS, remove=blob_store.remove)
+
+# Batch downloads by zip name -> file ids, on disk so any worker can serve them;
+# the archive is built on the fly when fetched
+batch_manifests = BatchManifests(os.path.join(TEMP_DIR, ".batches"))
+
+# Background clean jobs; results are kept as long as the uploads they refer to
+job_manager = JobManager(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_JOBS", "2")),
+    retention=MAX_AGE_SECONDS,
+)
+
+# Thread pool for exiftool, zip and disk work so the event loop stays free.
+# Size with BLOCKING_WORKERS, per-endpoint caps with *_CONCURRENCY.
+blocking = BlockingExecutor.from_env()
+
+# Per-request temp files: /dev/shm when they fit, disk otherwise.
+# Quotas via SCRATCH_RAM_QUOTA, SCRATCH_RAM_MAX_FILE and SCRATCH_DISK_QUOTA.
+scratch = ScratchSpace.from_env()
+
+# (metadata, filtered, selectable) by content hash, so repeat views skip exiftool.
+metadata_cache = MetadataCache.from_env()
+
+# Writable/deletable tags per group, built from exiftool's tag tables.
+tag_index = TagIndex(exiftool_pool, os.getenv("TAG_INDEX_PATH", os.path.join(".cache", "tag_index.json")))
+
+FILE_SECONDS = REGISTRY.histogram(
+    "metastrip_file_seconds", "Per-file view and clean time by file group", ("operation", "group")
+)
+CLEANER_RUNS = REGISTRY.counter(
+    "metastrip_cleaner_runs_total", "Cleaner runs per file by outcome (ok, error, fallback)", ("cleaner", "outcome")
+)
+REGISTRY.gauge(
+    "metastrip_exiftool_workers", "exiftool pool workers idle and callers waiting for one",
+    lambda: {(k,): v for k, v in exiftool_pool.stats().items()}, ("state",),
+)
+REGISTRY.gauge("metastrip_upload_bytes", "Bytes tracked in the uploads directory", lambda: upload_expiry.total_bytes)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    exiftool_pool.start()
+    tag_index.load()
+    blocking.start()
+    scratch.start()
+    # Without a registry (first start on an old uploads dir) fall back to a scan
+    upload_expiry.rebuild(blob_store.entries() if blob_store.start() else None)
+    for path, created_at, size in batch_manifests.entries():
+        upload_expiry.track(path, size, created_at)
+
     # Start the background cleanup task
     async def cleanup_loop():
+        reconciled_at = 0.0
         while True:
-            delete_old_files()
-            await asyncio.sleep(60)  # run every minute
+            deleted = 0
+            try:
+                deleted = await blocking.run("cleanup", upload_expiry.sweep)
+                if time.monotonic() - reconciled_at >= RECONCILE_INTERVAL_SECONDS:
+                    reconciled_at = time.monotonic()
+                    await blocking.run("cleanup", lambda: upload_expiry.reconcile(blob_store.live_paths()))
+                    await blocking.run("cleanup", metadata_cache.evict_disk)
+            except Exception as e:
+                print(f"⚠️ Upload cleanup failed, retrying: {e}")
+            if deleted < upload_expiry.batch_size:
+                await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
 
     task = asyncio.create_task(cleanup_loop())
 
     yield  # app is now running
 
     task.cancel()
+    job_manager.shutdown()
+    blocking.stop()
+    exiftool_pool.stop()
+    blob_store.stop()
 
 app = FastAPI(lifespan=lifespan)
 app.add_middleware(PerformanceMiddleware)
@@ -64,8 +160,7 @@ EXTENSION_GROUPS = {
     ".mp3": "MP3",
 }
 
-with open("meta.json", "r") as f:
-    metadata_mapping = json.load(f)
+tag_allowlist = TagAllowlist.load("meta.json")
 
 app.add_middleware(
     CORSMiddleware,
@@ -75,111 +170,343 @@ app.add_middleware(
     allow_headers=["*"],  # or restrict to ['Content-Type', 'Authorization']
 )
 
-def delete_old_files():
-    now = time.time()
-    for file in Path(TEMP_DIR).glob("*"):
-        if file.is_file() and now - file.stat().st_mtime > MAX_AGE_SECONDS:
-            try:
-                file.unlink()
-                print(f"🗑️ Deleted: {file}")
-            except Exception as e:
-                print(f"⚠️ Failed to delete {file}: {e}")
-
-def view_metadata(file_bytes, suffix):
-    """Reads metadata from raw file bytes using a temporary file."""
-    if suffix == ".docx":
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(file_bytes)
-            tmp.flush()  # Ensure all bytes are written
-            meta = OMH.get_metadata(tmp.name)
-            return {}, {}, meta
-        
-    if suffix == ".xlsx":
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(file_bytes)
-            tmp.flush()
-            meta = OMH.get_metadata(tmp.name)
+def file_group(suffix):
+    return EXTENSION_GROUPS.get(suffix.lower(), "other")
+
+@contextmanager
+def timed(operation, suffix):
+    """Records the block's duration in FILE_SECONDS under the file's group."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        FILE_SECONDS.observe(time.perf_counter() - start, (operation, file_group(suffix)))
+
+@contextmanager
+def cleaner_run(cleaner):
+    """Counts one cleaner run as ok or error in CLEANER_RUNS."""
+    try:
+        yield
+    except Exception:
+        CLEANER_RUNS.inc((cleaner, "error"))
+        raise
+    CLEANER_RUNS.inc((cleaner, "ok"))
+
+def scan_options(suffix, full_scan=False):
+    """exiftool's -fast for large media, unless a full scan was asked for."""
+    return () if full_scan or suffix.lower() not in FAST_SCAN_SUFFIXES else (b"-fast",)
+
+def view_metadata(file_path, suffix, full_scan=False):
+    """Reads metadata from a file already stored on disk."""
+    with timed("view", suffix):
+        if suffix in (".docx", ".xlsx"):
+            with spans.span("office_read"):
+                meta = OMH.get_metadata(file_path)
             return {}, {}, meta
-        
-    group = EXTENSION_GROUPS.get(suffix.lower())
-    allowed = set(metadata_mapping.get(group, []))
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(file_bytes)
-        tmp.flush()
-        tmp_path = tmp.name
-        
-    with exiftool.ExifTool() as et:
-        result = et.execute(b"-G", b"-j", tmp_path.encode("utf-8"))
-        metadata = json.loads(result)[0]
+        with exiftool_pool.checkout() as et, spans.span("exiftool_read"):
+            result = et.execute(b"-G", b"-j", *scan_options(suffix, full_scan), file_path.encode("utf-8"))
+            metadata = json.loads(result)[0]
 
-    deletable = get_deletable_metadata_exiftool(file_bytes, suffix=suffix)
+        with spans.span("diff"):
+            return split_metadata(metadata, suffix)
 
-    allowed = set()
-    if group:
-        allowed = set(metadata_mapping.get(group, []))
-        if group == "JPEG/HEIC/TIFF":
-            exif_keys = {k for k in metadata.keys() if k.startswith("EXIF:")}
-            allowed |= exif_keys
+BINARY_PLACEHOLDER_SUFFIX = ", use -b option to extract)"
 
-    selectable = {k: v for k, v in metadata.items() if k in allowed}
+def trim_binary_placeholders(metadata):
+    """Shortens exiftool's "(Binary data N bytes, use -b option to extract)" values in place."""
+    for key, value in metadata.items():
+        if isinstance(value, str) and value.endswith(BINARY_PLACEHOLDER_SUFFIX):
+            metadata[key] = value[:-len(BINARY_PLACEHOLDER_SUFFIX)] + ")"
+    return metadata
 
+def split_metadata(metadata, suffix):
+    """Derives the (metadata, deletable, selectable) triple from exiftool output."""
+    group = EXTENSION_GROUPS.get(suffix.lower())
+    trim_binary_placeholders(metadata)
+
+    deletable = get_deletable_metadata_exiftool(metadata, suffix=suffix)
+    selectable = tag_allowlist.selectable(metadata, group)
 
     return metadata, deletable, selectable
 
-def save_file_bytes(file_bytes: bytes, original_filename: str):
-    upload_dir = os.path.join(os.getcwd(), TEMP_DIR)
-    
+def view_selectable(file_path, suffix):
+    """Reads only the selectable tags, letting exiftool skip everything else."""
+    with timed("view", suffix):
+        if suffix in (".docx", ".xlsx"):
+            with spans.span("office_read"):
+                return OMH.get_metadata(file_path)
+
+        matcher = tag_allowlist.matcher(file_group(suffix))
+        if matcher is None:
+            return {}
+
+        with exiftool_pool.checkout() as et, spans.span("exiftool_read"):
+            result = et.execute(b"-G", b"-j", *scan_options(suffix), *matcher.arguments, file_path.encode("utf-8"))
+            metadata = json.loads(result)[0]
+
+        with spans.span("diff"):
+            return matcher.select(trim_binary_placeholders(metadata))
+
+def view_metadata_batch(file_paths, suffixes):
+    """Reads metadata for many files with a single exiftool command.
+
+    Returns {path: (metadata, deletable, selectable)}, or {path: exception}
+    for files that could not be read.
+    """
+    results = {}
+    exiftool_paths = {}
+    for file_path, suffix in zip(file_paths, suffixes):
+        if suffix in (".docx", ".xlsx"):
+            try:
+                results[file_path] = view_metadata(file_path, suffix)
+            except Exception as e:
+                results[file_path] = e
+        else:
+            exiftool_paths[file_path] = suffix
+
+    # Options apply to a whole command, so files read with -fast go in their own
+    # command; each file is read exactly as view_metadata would read it alone
+    by_options = {}
+    for file_path, suffix in exiftool_paths.items():
+        by_options.setdefault(scan_options(suffix), []).append(file_path)
+
+    for options, paths in by_options.items():
+        with exiftool_pool.checkout() as et, spans.span("exiftool_read"):
+            output = et.execute(b"-G", b"-j", *options, *[p.encode("utf-8") for p in paths])
+            by_source = {item.get("SourceFile"): item for item in (json.loads(output) if output.strip() else [])}
+
+        with spans.span("diff"):
+            for file_path in paths:
+                metadata = by_source.get(file_path)
+                if metadata is None:
+                    results[file_path] = RuntimeError("exiftool returned no metadata")
+                else:
+                    results[file_path] = split_metadata(metadata, exiftool_paths[file_path])
+
+    return results
+
+def cached_view_metadata(file_path, suffix, sha256=None, full_scan=False):
+    """view_metadata, served from the metadata cache when the same content was seen before."""
+    if sha256 is None:
+        sha256 = metadata_cache.digest(file_path)
+    # Full scans of fast-scanned formats are cached apart from the default view
+    key_suffix = f"{suffix}#full" if scan_options(suffix) and full_scan else suffix
+    return metadata_cache.get_or_compute(
+        sha256, key_suffix, lambda: view_metadata(local_path(file_path), suffix=suffix, full_scan=full_scan),
+        file_path=known_path(file_path),
+    )
+
+def local_path(file_path):
+    """`file_path`, or the path a deferred write returns (see view_and_discard)."""
+    return file_path() if callable(file_path) else file_path
+
+def known_path(file_path):
+    """`file_path` when it is already on disk, None for a deferred write."""
+    return None if callable(file_path) else file_path
+
+def cached_view_selectable(file_path, suffix, sha256=None):
+    """view_selectable, reusing a cached full view of the same content if there is one."""
+    if sha256 is None:
+        sha256 = metadata_cache.digest(file_path)
+    full = metadata_cache.get(metadata_cache.key(sha256, suffix), known_path(file_path))
+    if full is not None:
+        return full[2]
+    # Cached as a 1-tuple under its own key: a partial read must never pass for a full view
+    return metadata_cache.get_or_compute(
+        sha256, f"{suffix}#selectable", lambda: (view_selectable(local_path(file_path), suffix),),
+        file_path=known_path(file_path),
+    )[0]
+
+def cached_view_metadata_batch(file_paths, suffixes):
+    """view_metadata_batch that only sends cache misses to exiftool.
+
+    Entries share cached_view_metadata's key (and so the full view
+    cached_view_selectable looks for first): same content, same scan options.
+    """
+    results = {}
+    missing = []
+    for file_path, suffix in zip(file_paths, suffixes):
+        key = metadata_cache.key(metadata_cache.digest(file_path), suffix)
+        cached = metadata_cache.get(key, file_path)
+        if cached is None:
+            missing.append((file_path, suffix, key))
+        else:
+            results[file_path] = cached
+
+    if missing:
+        fresh = view_metadata_batch([m[0] for m in missing], [m[1] for m in missing])
+        for file_path, suffix, key in missing:
+            value = fresh[file_path]
+            if not isinstance(value, Exception):
+                metadata_cache.put(key, value)
+            results[file_path] = value
+
+    return results
+
+def save_upload_stream(src, original_filename: str):
+    """Stores an upload under a new file id.
+
+    The upload is hashed first; bytes already in the blob store are linked
+    instead of written again, and their cached metadata is served with the
+    path tags of the new file id (see PATH_TAGS), never the first owner's.
+    """
     # Split filename and extension
     filename_base, ext = os.path.splitext(original_filename)
     ext = ext or ".bin"  # Default to .bin if no extension
     
     # Create unique filename while preserving original name
     unique_filename = f"{filename_base}_{uuid.uuid4().hex[:8]}{ext}"
-    dest = os.path.join(upload_dir, unique_filename)
 
+    with spans.span("hash"):
+        sha256, size = hash_stream(src)
+    with spans.span("store"):
+        dest, blob, blob_size = blob_store.put(unique_filename, sha256, ext, lambda path: write_stream(src, path))
+    metadata_cache.remember_digest(dest, sha256)
+    upload_expiry.track(dest, 0, blob=blob, blob_size=blob_size)
+    if upload_expiry.over_high_water():
+        upload_expiry.sweep()
+    return unique_filename, sha256, size
+
+def hash_stream(src):
+    """Returns the SHA-256 and size of a file object, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    src.seek(0)
+    while chunk := src.read(UPLOAD_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+def write_stream(src, dest):
+    src.seek(0)
     with open(dest, "wb") as buffer:
-        buffer.write(file_bytes)
-    
-    return unique_filename
+        shutil.copyfileobj(src, buffer, UPLOAD_CHUNK_SIZE)
+
+def copy_stream(src, dest):
+    """Copies a file object to `dest` in chunks and returns its SHA-256 and size."""
+    digest = hashlib.sha256()
+    size = 0
+    src.seek(0)
+    with open(dest, "wb") as buffer:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+            buffer.write(chunk)
+    return digest.hexdigest(), size
 
 def remove_metadata_exiftool(file_path):
-    with exiftool.ExifTool() as et:
+    with cleaner_run("exiftool"), exiftool_pool.checkout() as et, spans.span("exiftool_clean"):
         et.execute(b"-overwrite_original", b"-all=", file_path.encode('utf-8'))
 
-def remove_metadata_tags_exiftool(file_path: str, tags: List[str]):
-    args = [
-            b"-overwrite_original",
-            b"-m",
-            *[f"-{tag}=".encode("utf-8") for tag in tags],
-            file_path.encode("utf-8"),
-        ]    
-    print(args, flush=True)
-    with exiftool.ExifTool() as et:
+# In-process strippers: extension -> (strip file in place, map request tags to a selection)
+NATIVE_STRIPPERS = {
+    ".jpg": (strip_jpeg_file, jpeg_families_for_groups),
+    ".jpeg": (strip_jpeg_file, jpeg_families_for_groups),
+    ".png": (strip_png_file, png_selection_for_tags),
+    ".mp4": (strip_isobmff_file, isobmff_selection_for_tags),
+    ".mov": (strip_isobmff_file, isobmff_selection_for_tags),
+    ".heic": (strip_isobmff_file, isobmff_selection_for_tags),
+}
+
+# The same strippers from one stream to another, for uploads cleaned in memory
+STREAM_STRIPPERS = {
+    ".jpg": strip_jpeg,
+    ".jpeg": strip_jpeg,
+    ".png": strip_png,
+    ".mp4": strip_isobmff,
+    ".mov": strip_isobmff,
+    ".heic": strip_isobmff,
+}
+
+def strip_in_memory(src, ext):
+    """Strips all metadata from a small upload without writing it anywhere.
+
+    Returns the cleaned bytes as a file object, or None when the native
+    stripper can't handle the file and it has to be stored and cleaned.
+    """
+    strip = STREAM_STRIPPERS[ext]
+    cleaner = strip.__name__.removeprefix("strip_")
+    dst = io.BytesIO()
+    src.seek(0)
+    try:
+        with timed("clean", ext), cleaner_run(cleaner), spans.span("native_strip"):
+            strip(src, dst)
+    except ValueError as e:  # JpegFormatError, PngFormatError, IsobmffFormatError
+        CLEANER_RUNS.inc((cleaner, "fallback"))
+        print(f"⚠️ In-memory strip failed, storing and cleaning the file: {e}")
+        return None
+    dst.seek(0)
+    return dst
+
+def remove_metadata_native(file_path: str, tags: List[str] | None = None):
+    """Strips metadata in-process for formats with a native stripper.
+
+    `tags=None` means strip everything. Returns False when the format or tag
+    list isn't supported natively, so the caller falls back to exiftool.
+    """
+    ext = get_file_extension(file_path)
+    if ext not in NATIVE_STRIPPERS:
+        return False
+
+    strip_file, selection_for_tags = NATIVE_STRIPPERS[ext]
+    selection = None
+    if tags is not None:
+        selection = selection_for_tags(tags)
+        if selection is None:
+            return False
+    cleaner = strip_file.__name__.removeprefix("strip_").removesuffix("_file")
+    try:
+        with cleaner_run(cleaner), spans.span("native_strip"):
+            strip_file(file_path, selection)
+    except ValueError as e:  # JpegFormatError, PngFormatError, IsobmffFormatError
+        CLEANER_RUNS.inc((cleaner, "fallback"))
+        print(f"⚠️ Native strip failed for {file_path}, using exiftool: {e}")
+        return False
+    return True
+
+def remove_metadata_exiftool_batch(file_paths: List[str], tags: List[str] | None = None):
+    """Cleans many files with one exiftool command.
+
+    `tags=None` strips everything. The -stay_open pipe already feeds exiftool
+    one argument per line, like an argfile, so long tag and file lists need
+    no extra handling. Returns {path: error message or None}.
+    """
+    if tags is None:
+        args = [b"-overwrite_original", b"-all="]
+    else:
+        args = [b"-overwrite_original", b"-m", *[f"-{tag}=".encode("utf-8") for tag in tags]]
+    args += [file_path.encode("utf-8") for file_path in file_paths]
+
+    with exiftool_pool.checkout() as et, spans.span("exiftool_clean"):
         et.execute(*args)
+        stderr = et.last_stderr or ""
+
+    # exiftool reports per-file failures as "Error: <message> - <file>"
+    errors = {file_path: None for file_path in file_paths}
+    for line in stderr.splitlines():
+        if line.startswith("Error") and " - " in line:
+            message, _, file_path = line.rpartition(" - ")
+            if file_path in errors:
+                errors[file_path] = message.removeprefix("Error: ")
+
+    failed = sum(1 for error in errors.values() if error)
+    CLEANER_RUNS.inc(("exiftool", "ok"), len(errors) - failed)
+    if failed:
+        CLEANER_RUNS.inc(("exiftool", "error"), failed)
+    return errors
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 def remove_metadata_docx(file_path, file_id):
     output_path = os.path.join(TEMP_DIR, f"{file_id}")
 
-    # Create a temporary in-memory DOCX without metadata
-    buffer = BytesIO()
-
-    with zipfile.ZipFile(file_path, 'r') as zin:
-        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zout:
-            for item in zin.infolist():
-                # Remove metadata files
-                if item.filename in [
-                    "docProps/core.xml",
-                    "docProps/app.xml",
-                    "custom.xml"
-                ]:
-                    continue
-                zout.writestr(item, zin.read(item.filename))
-
-    # Write the cleaned DOCX file to TEMP_DIR
-    os.makedirs(TEMP_DIR, exist_ok=True)
-    with open(output_path, 'wb') as f:
-        f.write(buffer.getvalue())
+    # Empty the docProps parts; every other member is copied without recompression
+    if os.path.abspath(output_path) != os.path.abspath(file_path):
+        shutil.copyfile(file_path, output_path)
+    OMH.clear_metadata(output_path)
 
     return output_path
 
@@ -190,15 +517,10 @@ def remove_metadata_excel(file_path, file_id):
     output_path = os.path.join(TEMP_DIR, f"{file_id}")
 
     try:
-        wb = load_workbook(file_path)
-        wb.properties = DocumentProperties()
-
-        buffer = BytesIO()
-        wb.save(buffer)
-
-        os.makedirs(TEMP_DIR, exist_ok=True)
-        with open(output_path, 'wb') as f:
-            f.write(buffer.getvalue())
+        # Empty the docProps parts at package level; sheets are never parsed
+        if os.path.abspath(output_path) != os.path.abspath(file_path):
+            shutil.copyfile(file_path, output_path)
+        OMH.clear_metadata(output_path)
 
         print(f"[✓] Cleaned metadata: {file_path}")
         return output_path
@@ -210,13 +532,6 @@ def remove_metadata_excel(file_path, file_id):
 def remove_metadata_tags_excel(file_path: str, tags: List[str]):
     OMH.delete_metadata(file_path, tags)
 
-def create_zip_file(file_paths, zip_name):
-    zip_path = os.path.join(TEMP_DIR, zip_name)
-    with ZipFile(zip_path, 'w') as zip_file:
-        for file_path in file_paths:
-            zip_file.write(file_path, arcname=os.path.basename(file_path))
-    return zip_path
-
 def delete_file(file_path):
     try:
         os.remove(file_path)
@@ -227,124 +542,292 @@ def delete_file(file_path):
         return False
     
 def create_zip_file(file_paths, zip_name):
-    zip_name = f"{zip_name}_{uuid.uuid4().hex[:8]}"
-    zip_path = os.path.join(TEMP_DIR, f"{zip_name}.zip")
-    
-    with ZipFile(zip_path, 'w') as zip_file:
-        for file_path in file_paths:
-            file_abs_path = os.path.join(TEMP_DIR, file_path)
-            original_name = os.path.basename(file_path)
-
-            # Remove UUID if present and prefix 'cleaned_'
-            # e.g., "filename_123abc.pdf" → "cleaned_filename.pdf"
-            base, ext = os.path.splitext(original_name)
-            base_cleaned = base.split('_')[:-1]  # remove UUID suffix if any
-            cleaned_name = f"cleaned_{base_cleaned}{ext}"
-
-            zip_file.write(file_abs_path, arcname=cleaned_name)
-    
-    return f"{zip_name}.zip"
+    """Registers a batch download; the archive is streamed when it is fetched."""
+    zip_name, manifest_path = batch_manifests.create(zip_name, list(file_paths), TEMP_DIR)
+    upload_expiry.track(manifest_path)
+    return zip_name
+
+def zip_entries(file_paths):
+    for file_path in file_paths:
+        file_abs_path = os.path.join(TEMP_DIR, file_path)
+        original_name = os.path.basename(file_path)
+
+        # Remove UUID if present and prefix 'cleaned_'
+        # e.g., "filename_123abc.pdf" → "cleaned_filename.pdf"
+        base, ext = os.path.splitext(original_name)
+        base_cleaned = "_".join(base.split('_')[:-1]) or base  # remove UUID suffix if any
+        cleaned_name = f"cleaned_{base_cleaned}{ext}"
+
+        yield file_abs_path, cleaned_name
 
 def get_file_extension(file_path):
     return os.path.splitext(file_path)[1].lower()
 
 def get_exiftool_metadata(file_path):
-    with exiftool.ExifTool() as et:
+    with exiftool_pool.checkout() as et:
         result = et.execute(b"-json", file_path.encode("utf-8"))
         return json.loads(result)[0]
 
-def get_deletable_metadata_exiftool(file_bytes, suffix=".jpg"):
-    # Step 1: Save original file to temp
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(file_bytes)
-        tmp.flush()
-        tmp_path = tmp.name
-
-    try:
-        # Step 2: Get original metadata
-        original_metadata = get_exiftool_metadata(tmp_path)
-
-        # Step 3: Overwrite temp file with deleted metadata version
-        with exiftool.ExifTool() as et:
-            et.execute(b"-all=", b"-overwrite_original", tmp_path.encode("utf-8"))
-
-        # Step 4: Get cleaned metadata
-        cleaned_metadata = get_exiftool_metadata(tmp_path)
-
-        # Step 5: Compare and extract deletable fields
-        deletable = {k: v for k, v in original_metadata.items() if k not in cleaned_metadata}
-
-    finally:
-        os.remove(tmp_path)
-
-    return deletable
+def get_deletable_metadata_exiftool(metadata, suffix=".jpg"):
+    # Writable tags in the groups `-all=` strips, looked up in the tag index
+    group = EXTENSION_GROUPS.get(suffix.lower())
+    return tag_index.deletable(metadata, group)
 
 def remove_metadata_fields(file_path: str, fields_to_remove: list[str]):
-    with exiftool.ExifTool() as et:
+    with exiftool_pool.checkout() as et:
         args = [b"-overwrite_original", b"-ignoreMinorErrors"]
         for field in fields_to_remove:
             args.append(f"-{field}=".encode("utf-8"))
         args.append(file_path.encode("utf-8"))
         et.execute(*args)
 
+def clean_file_in_process(file_path, file_id, tags=None):
+    """Cleans Office files and formats with a native stripper.
+
+    `tags=None` strips everything. Returns False when exiftool is needed.
+    """
+    ext = get_file_extension(file_path)
+
+    # Word docs & spreadsheets
+    if ext in ['.docx', '.doc']:
+        with cleaner_run("office"), spans.span("office_clean"):
+            if tags is None:
+                remove_metadata_docx(file_path, file_id)
+            else:
+                remove_metadata_tags_docx(file_path, tags)
+        return True
+    if ext in ['.xlsx']:
+        with cleaner_run("office"), spans.span("office_clean"):
+            if tags is None:
+                remove_metadata_excel(file_path, file_id)
+            else:
+                remove_metadata_tags_excel(file_path, tags)
+        return True
+
+    # JPEG, PNG, MP4/MOV/HEIC
+    return remove_metadata_native(file_path, tags)
+
+def clean_file_metadata(file_path, file_id):
+    """Strips all metadata from a stored upload, picking the cleaner by extension."""
+    with timed("clean", get_file_extension(file_path)):
+        if not clean_file_in_process(file_path, file_id):
+            remove_metadata_exiftool(file_path)
+    track_cleaned([file_path])
+
+def track_cleaned(file_paths):
+    """Re-counts cleaned uploads in the expiry index: a cleaner's output is a new file next to the blob."""
+    for file_path in file_paths:
+        usage = blob_store.usage(file_path)
+        if usage is not None:
+            upload_expiry.update(file_path, *usage)
+
+def copy_skeleton(session, src, suffix):
+    """Copies only the container boxes of an ISOBMFF upload into a sparse scratch file.
+
+    Returns (path, skeleton digest), or None when the upload can't be parsed.
+    """
+    size = src.seek(0, os.SEEK_END)
+    try:
+        ranges = skeleton_ranges(src, size)
+        tmp_path = session.path(suffix, size_hint=sum(length for _, length in ranges))
+        return tmp_path, write_skeleton(src, tmp_path, ranges, size)
+    except IsobmffFormatError as e:
+        print(f"⚠️ Header-only copy failed, copying the whole file: {e}")
+        return None
+
+def view_and_discard(src, filename, size_hint=0, fields=None, full_scan=False):
+    suffix = f".{filename.split('.')[-1]}"
+    with scratch.session() as session:
+        if src.seek(0, os.SEEK_END) <= DISKLESS_MAX_BYTES:
+            # Hashed in memory; only a cache miss writes the file to scratch for exiftool
+            with spans.span("hash"):
+                sha256, size = hash_stream(src)
+
+            def write_scratch():
+                tmp_path = session.path(suffix, size_hint=size)
+                write_stream(src, tmp_path)
+                return tmp_path
+
+            return cached_view(write_scratch, suffix, fields, sha256=sha256, full_scan=full_scan)
+
+        if scan_options(suffix, full_scan):
+            with spans.span("skeleton"):
+                skeleton = copy_skeleton(session, src, suffix)
+            if skeleton is not None:
+                tmp_path, sha256 = skeleton
+                return cached_view(tmp_path, suffix, fields, sha256=sha256)
+
+        tmp_path = session.path(suffix, size_hint=size_hint)
+        sha256, _ = copy_stream(src, tmp_path)
+        return cached_view(tmp_path, suffix, fields, sha256=sha256, full_scan=full_scan)
+
+def cached_view(file_path, suffix, fields=None, sha256=None, full_scan=False):
+    """cached_view_metadata, or a selectable-only read when that is all `fields` asks for."""
+    if fields == ("selectable",) and not full_scan:
+        return {}, {}, cached_view_selectable(file_path, suffix, sha256=sha256)
+    return cached_view_metadata(file_path, suffix, sha256=sha256, full_scan=full_scan)
+
+def store_and_clean(src, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in STREAM_STRIPPERS and src.seek(0, os.SEEK_END) <= DISKLESS_MAX_BYTES:
+        cleaned = strip_in_memory(src, ext)
+        if cleaned is not None:
+            file_id, _, _ = save_upload_stream(cleaned, filename)
+            return file_id
+
+    file_id, _, _ = save_upload_stream(src, filename)
+    clean_file_metadata(os.path.join(TEMP_DIR, file_id), file_id)
+    return file_id
+
 # ----------------------------------- 
 #               APIs
 # -----------------------------------
 
 
+def with_timing(response: dict, timing: bool):
+    """Adds the request's per-stage milliseconds to `response` when asked for."""
+    recorder = spans.current()
+    if timing and recorder is not None:
+        response["timing"] = recorder.snapshot()
+    return response
+
+def stream_results(results, summary, request):
+    """Streams `{"results": [...], **summary}` as orjson, compressed like `json_response`.
+
+    `results` is an async iterator of per-file dicts, each sent as soon as it
+    is ready; `summary()` is awaited once they are all out and must return a
+    non-empty dict.
+    """
+    async def chunks():
+        yield b'{"results":['
+        first = True
+        async for result in results:
+            yield (b"" if first else b",") + dumps(result)
+            first = False
+        yield b"]," + dumps(await summary())[1:]
+
+    return streaming_json_response(chunks(), request)
+
+METADATA_FIELDS = ("metadata", "filtered", "selectable")
+
+def parse_fields(fields: str | None):
+    """The `fields=` query parameter as a tuple of metadata views (all of them when absent)."""
+    if fields is None:
+        return METADATA_FIELDS
+    wanted = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in wanted if name not in METADATA_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(METADATA_FIELDS)})",
+        )
+    return wanted
+
+def metadata_view(metadata, filtered, selectable, fields=METADATA_FIELDS, compact=False):
+    """The metadata part of a response, limited to `fields`.
+
+    With `compact`, `filtered` and `selectable` are sent as key lists into
+    `metadata` instead of repeating their values.  `metadata` then only holds
+    what was asked for: the full map if requested, plus the subsets' values
+    (Office properties appear only in `selectable`).
+    """
+    subsets = {"filtered": filtered, "selectable": selectable}
+    if not compact:
+        views = {"metadata": metadata, **subsets}
+        return {name: views[name] for name in fields}
+
+    values = metadata if "metadata" in fields else {}
+    view = {}
+    for name, subset in subsets.items():
+        if name not in fields:
+            continue
+        view[name] = list(subset)
+        missing = [key for key in subset if key not in values]
+        if missing:
+            values = {**values, **{key: subset[key] for key in missing}}
+    return {"metadata": values, **view}
+
 @app.post("/viewmetadata/")
-async def view_metadata_endpoint(file: UploadFile = File(...)):
-    file_bytes = await file.read()
-    metadata, filtered, selectable = view_metadata(file_bytes, suffix=f".{file.filename.split('.')[-1]}")
+async def view_metadata_endpoint(
+    request: Request, file: UploadFile = File(...), timing: bool = False,
+    fields: str | None = None, compact: bool = False, full_scan: bool = False,
+):
+    """Reads an upload's metadata without storing it.
+
+    MP4/MOV uploads are read from their header and trailer boxes only, with
+    exiftool's -fast; `full_scan` reads the whole file instead.
+    """
+    spans.since_request_start("multipart")
+    wanted = parse_fields(fields)
+    metadata, filtered, selectable = await blocking.run(
+        "view", view_and_discard, file.file, file.filename, file.size or 0, wanted, full_scan
+    )
 
-    return {
-        "filename": file.filename, 
-        "metadata": metadata, 
-        "filtered": filtered,
-        "selectable": selectable
-    }
+    return json_response(with_timing({
+        "filename": file.filename,
+        **metadata_view(metadata, filtered, selectable, wanted, compact),
+    }, timing), request)
 
 @app.get("/viewmetadata1/{file_id}")
-async def view_metadata_file(file_id: str):
+async def view_metadata_file(
+    request: Request, file_id: str, fields: str | None = None, compact: bool = False, full_scan: bool = False
+):
+    wanted = parse_fields(fields)
     file_path = os.path.join(TEMP_DIR, file_id)
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    with open(file_path, 'rb') as f:
-        file_bytes = f.read()
-
-    metadata, filtered, selectable = view_metadata(file_bytes, suffix=os.path.splitext(file_id)[1])
+    metadata, filtered, selectable = await blocking.run(
+        "view", cached_view, file_path, os.path.splitext(file_id)[1], wanted, None, full_scan
+    )
 
-    return {
+    return json_response({
         "filename": file_id,
-        "metadata": metadata,
-        "filtered": filtered,
-        "selectable": selectable
-    }
+        **metadata_view(metadata, filtered, selectable, wanted, compact),
+    }, request)
 
 @app.post("/upload/")
-async def create_upload_files(files: List[UploadFile] = File(...), clean: bool = False):
-    async def process_single_file(file: UploadFile):
+async def create_upload_files(
+    request: Request, files: List[UploadFile] = File(...), clean: bool = False, timing: bool = False,
+    fields: str | None = None, compact: bool = False, full_scan: bool = False,
+):
+    """Stores every upload, then streams each file's result as soon as its metadata is read.
+
+    The uploads are read before the response starts because FastAPI closes
+    them once the endpoint returns.  `fields` and `compact` shape each
+    file's metadata as in `metadata_view`; `full_scan` turns off exiftool's
+    -fast for MP4/MOV.
+    """
+    spans.since_request_start("multipart")
+    wanted = parse_fields(fields)
+
+    stored = await asyncio.gather(
+        *[blocking.run("upload", save_upload_stream, file.file, file.filename) for file in files],
+        return_exceptions=True,
+    )
+
+    async def process_single_file(file: UploadFile, saved):
         try:
-            file_bytes = await file.read()
-            metadata, filtered, selectable = view_metadata(
-                file_bytes, 
-                suffix=f".{file.filename.split('.')[-1]}"
+            if isinstance(saved, Exception):
+                raise saved
+            file_id, sha256, size = saved
+            metadata, filtered, selectable = await blocking.run(
+                "upload", cached_view,
+                os.path.join(TEMP_DIR, file_id), f".{file.filename.split('.')[-1]}", wanted, sha256, full_scan,
             )
-            file_id = save_file_bytes(file_bytes, file.filename)
             
             result = {
                 "status": "success",
                 "filename": file.filename,
                 "fileid": file_id,
                 "filetype": file.content_type,
-                "metadata": metadata,
-                "filtered": filtered,
-                "selectable": selectable
+                "size": size,
+                "sha256": sha256,
+                **metadata_view(metadata, filtered, selectable, wanted, compact),
             }
 
             if clean:
-                cleaned_result = await clean_file(file_id)
+                cleaned_result = await clean_stored_file(file_id)
                 result["cleaned"] = cleaned_result
 
             return result
@@ -355,19 +838,29 @@ async def create_upload_files(files: List[UploadFile] = File(...), clean: bool =
                 "error": str(e)
             }
 
-    results = await asyncio.gather(
-        *[process_single_file(file) for file in files]
-    )
-    
-    file_ids = [r["fileid"] for r in results if r["status"] == "success"]
-    
-    return {
-        "total_files": len(files),
-        "successful": len([r for r in results if r["status"] == "success"]),
-        "files": results,
-        "file_ids": file_ids,
-        "cleaned": clean
-    }
+    async def chunks():
+        tasks = [asyncio.create_task(process_single_file(file, saved)) for file, saved in zip(files, stored)]
+        try:
+            file_ids = []
+            yield b'{"files":['
+            for i, task in enumerate(tasks):
+                result = await task
+                if result["status"] == "success":
+                    file_ids.append(result["fileid"])
+                yield (b"," if i else b"") + dumps(result)
+
+            summary = with_timing({
+                "total_files": len(files),
+                "successful": len(file_ids),
+                "file_ids": file_ids,
+                "cleaned": clean
+            }, timing)
+            yield b"]," + dumps(summary)[1:]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return streaming_json_response(chunks(), request)
 
 @app.get("/getfile/{file_id}")
 async def get_file(file_id: str):
@@ -378,27 +871,24 @@ async def get_file(file_id: str):
     return FileResponse(file_path)
 
 @app.get("/clean/{file_id}")
-async def clean_file(file_id: str):
+async def clean_file(file_id: str, request: Request):
+    return json_response(await clean_stored_file(file_id), request)
+
+async def clean_stored_file(file_id: str):
+    """Strips a stored upload and reads back its metadata; the /clean/{file_id} result."""
     file_path = os.path.join(TEMP_DIR, file_id)
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
     try:
-        if get_file_extension(file_path) in ['.docx', '.doc']:
-            remove_metadata_docx(file_path, file_id)
-        elif get_file_extension(file_path) in ['.xlsx']:
-            remove_metadata_excel(file_path, file_id)
-        else:
-            remove_metadata_exiftool(file_path)
+        await blocking.run("clean", clean_file_metadata, file_path, file_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error cleaning file")
 
-    # Read the cleaned file to get its metadata
-    with open(file_path, 'rb') as f:
-        cleaned_bytes = f.read()
-    
     # Get metadata of cleaned file
-    metadata, filtered = view_metadata(cleaned_bytes, suffix=os.path.splitext(file_id)[1])
+    metadata, filtered, selectable = await blocking.run(
+        "view", cached_view_metadata, file_path, os.path.splitext(file_id)[1]
+    )
 
     return {
         "message": "File cleaned successfully",
@@ -408,115 +898,256 @@ async def clean_file(file_id: str):
         "download_url": f"/download/cleaned/{file_id}"
     }
 
-@app.post("/clean/batch/")
-async def clean_files(file_ids: List[str] = Body(...)):
-    print("hey", flush=True)
-    cleaned_results = []
-    for file_id in file_ids:
-        file_path = os.path.join(TEMP_DIR, file_id)
+async def clean_batch(jobs: Dict[str, List[str] | None]):
+    """Cleans stored uploads, sharing exiftool commands between files.
 
-        if not os.path.exists(file_path):
-            cleaned_results.append({
-                "file": file_id,
-                "error": "File not found"
-            })
-            continue
+    `jobs` maps file_id to the tags to remove (None strips everything).
+    Office files and native formats are cleaned one by one in process; the
+    rest are grouped by tag list into multi-file exiftool commands of up to
+    EXIFTOOL_BATCH_SIZE files. Returns {file_id: error message or None}.
+    """
+    errors = {}
 
+    async def clean_in_process(file_id, tags):
+        file_path = os.path.join(TEMP_DIR, file_id)
         try:
-            if get_file_extension(file_path) in ['.docx', '.doc']:
-                x = remove_metadata_docx(file_path, file_id)
-            elif get_file_extension(file_path) in ['.xlsx']:
-                x = remove_metadata_excel(file_path, file_id)
-            else:
-                remove_metadata_exiftool(file_path)
+            handled = await blocking.run("clean", clean_file_in_process, file_path, file_id, tags)
+        except Exception as e:
+            errors[file_id] = str(e)
+            return None
+        return None if handled else file_id
 
-            with open(file_path, 'rb') as f:
-                cleaned_bytes = f.read()
+    leftovers = await asyncio.gather(
+        *[clean_in_process(file_id, tags) for file_id, tags in jobs.items()]
+    )
 
-            # metadata, filtered = view_metadata(cleaned_bytes, suffix=os.path.splitext(file_id)[1])
+    groups = {}
+    for file_id in leftovers:
+        if file_id is not None:
+            tags = jobs[file_id]
+            groups.setdefault(None if tags is None else tuple(tags), []).append(file_id)
 
-            cleaned_results.append({
-                "message": "File cleaned successfully",
-                "file": file_id,
-                # "metadata": metadata,
-                # "filtered_metadata": filtered,
-                # "download_url": f"/download/cleaned/{file_id}"
-            })
+    async def clean_group(tags, file_ids):
+        file_paths = [os.path.join(TEMP_DIR, file_id) for file_id in file_ids]
+        try:
+            group_errors = await blocking.run(
+                "clean", remove_metadata_exiftool_batch, file_paths, None if tags is None else list(tags)
+            )
         except Exception as e:
-            cleaned_results.append({
-                "file": file_id,
-                "error": str(e)
-            })
+            group_errors = {file_path: str(e) for file_path in file_paths}
+        for file_id, file_path in zip(file_ids, file_paths):
+            errors[file_id] = group_errors[file_path]
+
+    await asyncio.gather(*[
+        clean_group(tags, chunk)
+        for tags, file_ids in groups.items()
+        for chunk in chunked(file_ids, EXIFTOOL_BATCH_SIZE)
+    ])
+    await blocking.run("clean", track_cleaned, [os.path.join(TEMP_DIR, file_id) for file_id in jobs])
+
+    return {file_id: errors.get(file_id) for file_id in jobs}
+
+async def view_batch(file_ids: List[str]):
+    """Cached metadata for many stored uploads, read with shared exiftool commands."""
+    async def view_chunk(chunk):
+        file_paths = [os.path.join(TEMP_DIR, file_id) for file_id in chunk]
+        suffixes = [os.path.splitext(file_id)[1] for file_id in chunk]
+        try:
+            views = await blocking.run("view", cached_view_metadata_batch, file_paths, suffixes)
+        except Exception as e:
+            return {file_id: e for file_id in chunk}
+        return {file_id: views[file_path] for file_id, file_path in zip(chunk, file_paths)}
 
-    download_url = ""
-    if len(file_ids) > 1:
-        zip_name = create_zip_file(file_ids, "cleaned_files")
-        download_url = f"/download/cleaned/{zip_name}"
-    else:
-        
-        download_url = f"/download/cleaned/{file_ids[0]}"
+    results = {}
+    for views in await asyncio.gather(*[view_chunk(chunk) for chunk in chunked(file_ids, EXIFTOOL_BATCH_SIZE)]):
+        results.update(views)
+    return results
 
-    return {"results": cleaned_results, "download_url": download_url}
+@app.post("/clean/batch/")
+async def clean_files(request: Request, file_ids: List[str] = Body(...), timing: bool = False):
+    jobs = {
+        file_id: None for file_id in file_ids
+        if os.path.exists(os.path.join(TEMP_DIR, file_id))
+    }
+    errors = await clean_batch(jobs)
+
+    async def cleaned_results():
+        for file_id in file_ids:
+            if file_id not in jobs:
+                yield {
+                    "file": file_id,
+                    "error": "File not found"
+                }
+            elif errors[file_id]:
+                yield {
+                    "file": file_id,
+                    "error": errors[file_id]
+                }
+            else:
+                yield {
+                    "message": "File cleaned successfully",
+                    "file": file_id,
+                }
 
+    async def summary():
+        return with_timing({"download_url": await cleaned_download_url(file_ids)}, timing)
 
-@app.post("/clean/batch/v2/")
-async def clean_files(files_to_clean: Dict[str, List[str]] = Body(...)):
-    cleaned_results = []
+    return stream_results(cleaned_results(), summary, request)
+
+
+async def clean_and_view(files_to_clean: Dict[str, List[str]]):
+    """The /clean/batch/v2/ pipeline as {file_id: per-file result} in request order."""
+    results = await clean_then_view(files_to_clean)
+    return {result["file"]: result async for result in results}
+
+async def clean_then_view(files_to_clean: Dict[str, List[str]]):
+    """Validates and cleans the files; returns an async iterator of per-file results.
+
+    Cleaning is done before this returns, so a failure there can still become
+    an error status. The iterator then reads back what is still selectable
+    and yields results in request order, each as soon as the shared exiftool
+    read of its chunk is done.
+    """
+    results = {}
+    jobs = {}
     for file_id, tags in files_to_clean.items():
         file_path = os.path.join(TEMP_DIR, file_id)
         if not os.path.exists(file_path):
-            cleaned_results.append({"file": file_id, "error": "File not found"})
+            results[file_id] = {"file": file_id, "error": "File not found"}
             continue
 
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in [".docx", ".doc", ".xlsx"] and tags != ["all"]:
+            unknown = tag_index.unknown_tags(tags)
+            if unknown:
+                results[file_id] = {"file": file_id, "error": f"Unknown tags: {', '.join(unknown)}"}
+                continue
+
+        jobs[file_id] = None if tags == ["all"] else tags
+
+    errors = await clean_batch(jobs)
+    cleaned = [file_id for file_id in jobs if not errors[file_id]]
+
+    async def viewed():
+        views = {}
+        for chunk in chunked(cleaned, EXIFTOOL_BATCH_SIZE):
+            task = asyncio.create_task(view_batch(chunk))
+            views.update(dict.fromkeys(chunk, task))
+
         try:
-            ext = os.path.splitext(file_path)[1].lower()
-
-            # Word docs & spreadsheets
-            if ext in [".docx", ".doc"]:
-                path = os.path.join(TEMP_DIR, file_id)
-                remove_metadata_tags_docx(path, tags)
-            elif ext in [".xlsx"]:
-                path = os.path.join(TEMP_DIR, file_id)
-                remove_metadata_tags_excel(path, tags)
-            # Images, PDFs, etc.
-            else:
-                if len(tags) == 1 and tags[0] == "all":
-                    remove_metadata_exiftool(file_path)
+            for file_id in files_to_clean:
+                if file_id in results:
+                    yield results[file_id]
+                elif errors[file_id]:
+                    yield {"file": file_id, "error": errors[file_id]}
                 else:
-                    remove_metadata_tags_exiftool(file_path, tags)
-
-            # Read back cleaned file bytes
-            with open(file_path, "rb") as f:
-                cleaned_bytes = f.read()
-
-            metadata, filtered, selectable = view_metadata(cleaned_bytes, suffix=os.path.splitext(file_id)[1])
-
-            cleaned_results.append({
-                "file": file_id,
-                "message": "File cleaned successfully",
-                # you can re-enable metadata inspection here if needed
-                # "metadata": metadata,
-                # "filtered_metadata": filtered_metadata,
-                "selectable_metadata": selectable,
-            })
-        except Exception as e:
-            cleaned_results.append({"file": file_id, "error": str(e)})
+                    view = (await views[file_id])[file_id]
+                    if isinstance(view, Exception):
+                        yield {"file": file_id, "error": str(view)}
+                        continue
+                    metadata, filtered, selectable = view
+                    yield {
+                        "file": file_id,
+                        "message": "File cleaned successfully",
+                        # you can re-enable metadata inspection here if needed
+                        # "metadata": metadata,
+                        # "filtered_metadata": filtered_metadata,
+                        "selectable_metadata": selectable,
+                    }
+        finally:
+            for task in views.values():
+                task.cancel()
+
+    return viewed()
+
+async def cleaned_download_url(file_ids):
+    if len(file_ids) > 1:
+        # Stats every file and writes the manifest
+        zip_name = await blocking.run("manifest", create_zip_file, list(file_ids), "cleaned_files")
+        return f"/download/cleaned/{zip_name}"
+    return f"/download/cleaned/{file_ids[0]}"
 
-    # Build download URL(s)
-    if len(files_to_clean) > 1:
-        zip_name = create_zip_file(list(files_to_clean.keys()), "cleaned_files")
-        download_url = f"/download/cleaned/{zip_name}"
-    else:
-        only_file = next(iter(files_to_clean))
-        download_url = f"/download/cleaned/{only_file}"
+@app.post("/clean/batch/v2/")
+async def clean_files(request: Request, files_to_clean: Dict[str, List[str]] = Body(...), timing: bool = False):
+    async def summary():
+        # Build download URL(s)
+        return with_timing({"download_url": await cleaned_download_url(list(files_to_clean.keys()))}, timing)
+
+    return stream_results(await clean_then_view(files_to_clean), summary, request)
+
+@app.post("/jobs/clean/")
+async def submit_clean_job(files_to_clean: Dict[str, List[str]] = Body(...)):
+    if not files_to_clean:
+        raise HTTPException(status_code=400, detail="No files to clean")
+
+    job = job_manager.submit(
+        files_to_clean,
+        clean_and_view,
+        chunk_size=EXIFTOOL_BATCH_SIZE,
+        finalize=lambda job: cleaned_download_url(job.file_ids),
+    )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
-    return {"results": cleaned_results, "download_url": download_url}
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job_manager.cancel(job_id)
+    return job.snapshot(include_results=False)
+
+@app.get("/metrics/scratch")
+async def scratch_metrics():
+    return scratch.stats()
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    return metadata_cache.stats()
+
+@app.get("/metrics/uploads")
+async def uploads_metrics():
+    return {**upload_expiry.stats(), **blob_store.stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def find_download(file_id):
+    """(batch entries or None, file ids no longer as they were batched, file exists)."""
+    zip_batch = batch_manifests.load(file_id)
+    if zip_batch is not None:
+        return zip_batch, batch_manifests.unavailable(zip_batch, TEMP_DIR), True
+    return None, [], os.path.exists(os.path.join(TEMP_DIR, file_id))
 
 @app.get("/download/cleaned/{file_id}")
 async def download_cleaned_file(file_id: str):
     cleaned_file_path = os.path.join(TEMP_DIR, file_id)
+    zip_batch, unavailable, found = await blocking.run("manifest", find_download, file_id)
 
-    if not os.path.exists(cleaned_file_path):
+    if not found:
         raise HTTPException(status_code=404, detail="Cleaned file not found")
     
     # Extract base and extension
@@ -528,24 +1159,27 @@ async def download_cleaned_file(file_id: str):
     
     download_name = f"cleaned_{cleaned_base}{ext}"
 
+    if zip_batch is not None:
+        if unavailable:
+            raise HTTPException(
+                status_code=410,
+                detail=f"Expired or changed since the batch was cleaned: {', '.join(unavailable)}",
+            )
+        return StreamingResponse(
+            stream_zip(zip_entries([entry["id"] for entry in zip_batch])),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{download_name}"'},
+        )
+
     return FileResponse(cleaned_file_path, filename=download_name)
 
 @app.post("/upload/clean/")
 async def upload_clean_file(file: UploadFile = File(...)):
-    file_bytes = await file.read()
-
-    file_id = save_file_bytes(file_bytes, file.filename)
-    file_path = os.path.join(TEMP_DIR, file_id)
-    if get_file_extension(file_path) in ['.docx', '.doc']:
-        x = remove_metadata_docx(file_path, file_id)
-    elif get_file_extension(file_path) in ['.xlsx']:
-        x = remove_metadata_excel(file_path, file_id)
-    else:
-        remove_metadata_exiftool(file_path)
-    # Get metadata of cleaned file
+    spans.since_request_start("multipart")
+    file_id = await blocking.run("upload", store_and_clean, file.file, file.filename)
 
     return {
         "message": "File cleaned successfully",
         "file": file_id,
         "download_url": f"/download/cleaned/{file_id}"
-    }
\ No newline at end of file
+    }
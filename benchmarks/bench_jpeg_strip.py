@@ -0,0 +1,66 @@
+"""Compare native JPEG stripping with `exiftool -all=` on the same file.
+
+    python benchmarks/bench_jpeg_strip.py [path/to/file.jpg] [--runs N]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.exiftool_pool import ExifToolPool
+from services.jpeg_stripper import strip_jpeg_file
+
+
+def time_runs(source, runs, strip):
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(runs):
+            path = os.path.join(tmp_dir, f"{i}.jpg")
+            shutil.copyfile(source, path)
+            start = time.perf_counter()
+            strip(path)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(
+        f"{name:<10} mean={statistics.mean(timings) * 1000:8.2f} ms  "
+        f"p50={statistics.median(timings) * 1000:8.2f} ms  p95={p95 * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", nargs="?", default="Img/aurora.jpg")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.file}: {os.path.getsize(args.file) / 1024:.0f} KB, {args.runs} runs")
+    report("native", time_runs(args.file, args.runs, strip_jpeg_file))
+
+    pool = ExifToolPool(size=1)
+    try:
+        pool.start()
+    except Exception as e:
+        print(f"exiftool   skipped ({e})")
+        return
+
+    def strip_exiftool(path):
+        pool.execute(b"-overwrite_original", b"-all=", path.encode("utf-8"))
+
+    try:
+        report("exiftool", time_runs(args.file, args.runs, strip_exiftool))
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Microbenchmarks for the metadata hot paths, with a regression gate.
+
+Runs each function over a synthetic corpus (see corpus.py) and records
+median/p95 timings.  ``--save`` writes them as a JSON baseline;
+``--compare`` checks a run against one and exits with status 1 when a
+benchmark's median got slower than the threshold allows.  Baselines are
+only comparable on the machine they were recorded on.
+
+    python benchmarks/bench_suite.py --generate --save benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpus  # noqa: E402
+
+# Medians this close to the baseline are treated as noise whatever the ratio
+NOISE_FLOOR_MS = 0.1
+
+
+def measure(fn, setup=None, min_runs=5, max_runs=200, min_time=0.5):
+    """Time ``fn(setup())`` until both ``min_runs`` and ``min_time`` are reached."""
+    timings = []
+    fn(setup() if setup else None)  # warmup
+    started = time.perf_counter()
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() - started < min_time):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 4),
+        "min_ms": round(timings[0] * 1000, 4),
+        "runs": len(timings),
+    }
+
+
+def copier(source, tmp_dir):
+    """Setup that gives every run a fresh copy of ``source`` to modify."""
+    ext = os.path.splitext(source)[1]
+
+    def setup():
+        path = os.path.join(tmp_dir, f"run{ext}")
+        shutil.copyfile(source, path)
+        return path
+    return setup
+
+
+def benchmarks(app, files, tmp_dir, with_exiftool):
+    """Yield ``(name, fn, setup)`` for every benchmark that applies to the corpus."""
+    from OfficeMetadataHelper import OfficeMetadataHelper as OMH
+
+    for path in files:
+        name = os.path.basename(path)
+        ext = os.path.splitext(path)[1].lower()
+
+        if ext in (".docx", ".xlsx"):
+            yield f"view_metadata[{name}]", lambda _, p=path, e=ext: app.view_metadata(p, e), None
+            yield f"OMH.get_metadata[{name}]", lambda _, p=path: OMH.get_metadata(p), None
+            yield f"OMH.delete_metadata[{name}]", lambda p: OMH.delete_metadata(p, None), copier(path, tmp_dir)
+            if ext == ".docx":
+                yield (
+                    f"remove_metadata_docx[{name}]",
+                    # An absolute file_id makes the output path the input path: clean in place
+                    lambda p: app.remove_metadata_docx(p, p),
+                    copier(path, tmp_dir),
+                )
+            continue
+
+        if ext in app.NATIVE_STRIPPERS:
+            strip_file, _ = app.NATIVE_STRIPPERS[ext]
+            yield f"{strip_file.__name__}[{name}]", lambda p, s=strip_file: s(p), copier(path, tmp_dir)
+
+        if with_exiftool:
+            yield f"view_metadata[{name}]", lambda _, p=path, e=ext: app.view_metadata(p, e), None
+            with app.exiftool_pool.checkout() as et:
+                metadata = json.loads(et.execute(b"-G", b"-j", path.encode("utf-8")))[0]
+            yield (
+                f"get_deletable_metadata_exiftool[{name}]",
+                lambda _, m=metadata, e=ext: app.get_deletable_metadata_exiftool(m, e),
+                None,
+            )
+
+    def zip_corpus(_):
+        zip_name = app.create_zip_file(files, "bench")
+        try:
+            entries = app.batch_manifests.load(zip_name)
+            for _ in app.stream_zip(app.zip_entries([entry["id"] for entry in entries])):
+                pass
+        finally:
+            # Every run registers a manifest under the real uploads/.batches/
+            os.remove(app.batch_manifests.path(zip_name))
+    yield f"create_zip_file+stream[{len(files)} files]", zip_corpus, None
+
+
+def run(args):
+    os.chdir(ROOT)  # app.py loads meta.json relative to the repo root
+    import app
+
+    if args.generate or not os.path.isdir(args.corpus):
+        corpus.generate(args.corpus, [corpus.parse_size(s) for s in args.sizes.split(",")],
+                        [int(d) for d in args.densities.split(",")])
+    files = sorted(
+        os.path.abspath(os.path.join(args.corpus, f)) for f in os.listdir(args.corpus) if not f.startswith(".")
+    )
+
+    with_exiftool = True
+    try:
+        app.exiftool_pool.start()
+        app.tag_index.load()
+    except Exception as e:
+        with_exiftool = False
+        print(f"⚠️ exiftool unavailable, skipping exiftool benchmarks: {e}")
+
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, fn, setup in benchmarks(app, files, tmp_dir, with_exiftool):
+                if args.filter and args.filter not in name:
+                    continue
+                results[name] = measure(fn, setup, min_runs=args.min_runs, min_time=args.min_time)
+                r = results[name]
+                print(f"{name:<70} median={r['median_ms']:9.3f} ms  p95={r['p95_ms']:9.3f} ms  runs={r['runs']}")
+    finally:
+        if with_exiftool:
+            app.exiftool_pool.stop()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the comparison and return the names that regressed."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<70} new")
+            continue
+        ratio = current["median_ms"] / previous["median_ms"] if previous["median_ms"] else 1.0
+        slower = current["median_ms"] - previous["median_ms"] > NOISE_FLOOR_MS
+        regressed = ratio > 1 + threshold and slower
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<70} {previous['median_ms']:9.3f} -> {current['median_ms']:9.3f} ms  "
+              f"{ratio:5.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "bench-corpus"))
+    parser.add_argument("--generate", action="store_true", help="(re)generate the corpus first")
+    parser.add_argument("--sizes", default="64k,1m")
+    parser.add_argument("--densities", default="4,64")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--min-runs", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per benchmark")
+    parser.add_argument("--save", help="write results to this baseline file")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown of the median, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Generate a synthetic benchmark corpus offline.
+
+Writes JPEG, PNG, PDF, DOCX, XLSX and MP3 files at roughly the requested
+sizes, each carrying ``density`` metadata fields (EXIF tags, text chunks,
+Info entries, custom document properties, ID3 frames).  Output is
+deterministic for a given seed, so baselines stay comparable.
+
+    python benchmarks/corpus.py bench-corpus --sizes 64k,1m --densities 4,64
+"""
+import argparse
+import io
+import os
+import random
+import struct
+import zipfile
+
+import openpyxl
+from docx import Document
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+FORMATS = ("jpg", "png", "pdf", "docx", "xlsx", "mp3")
+
+# EXIF IFD0 ASCII tags Pillow writes as-is
+EXIF_TEXT_TAGS = {
+    0x010E: "ImageDescription", 0x010F: "Make", 0x0110: "Model", 0x0131: "Software",
+    0x0132: "DateTime", 0x013B: "Artist", 0x8298: "Copyright",
+}
+
+CUSTOM_PROPS_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/custom-properties"
+CUSTOM_PROPS_NS = "http://schemas.openxmlformats.org/officeDocument/2006/custom-properties"
+VT_NS = "http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes"
+CUSTOM_PROPS_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.custom-properties+xml"
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def fields(rng: random.Random, density: int, prefix: str):
+    """``density`` (name, value) pairs of readable filler text."""
+    words = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+    return [
+        (f"{prefix}{i:03d}", " ".join(rng.choice(words) for _ in range(rng.randint(2, 8))))
+        for i in range(density)
+    ]
+
+
+def noise_image(rng: random.Random, size: int, fmt: str) -> Image.Image:
+    # Random pixels don't compress, so the pixel count sets the file size
+    bytes_per_pixel = 3 if fmt == "png" else 0.9
+    side = max(8, int((size / bytes_per_pixel) ** 0.5))
+    return Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+
+
+def make_jpeg(path, size, density, rng):
+    exif = Image.Exif()
+    for tag, (_, value) in zip(EXIF_TEXT_TAGS, fields(rng, len(EXIF_TEXT_TAGS), "")):
+        exif[tag] = value
+    # Fields past the fixed tag set are folded into ImageDescription and the JPEG comment
+    extra = fields(rng, max(0, density - len(EXIF_TEXT_TAGS)), "Field")
+    if extra:
+        exif[0x010E] = "; ".join(f"{k}={v}" for k, v in extra)
+    comment = "; ".join(f"{k}={v}" for k, v in extra).encode() or b"synthetic"
+    noise_image(rng, size, "jpg").save(path, "JPEG", quality=90, exif=exif, comment=comment)
+
+
+def make_png(path, size, density, rng):
+    info = PngInfo()
+    for key, value in fields(rng, density, "Field"):
+        info.add_text(key, value)
+    exif = Image.Exif()
+    exif[0x013B] = "Synthetic Artist"
+    noise_image(rng, size, "png").save(path, "PNG", pnginfo=info, exif=exif, compress_level=1)
+
+
+def make_pdf(path, size, density, rng):
+    info = " ".join(f"/{key} ({value})" for key, value in fields(rng, density, "Field"))
+    padding = rng.randbytes(max(0, size - 600)).hex()[: max(0, size - 600)]
+    stream = f"BT /F1 12 Tf 72 720 Td (synthetic) Tj ET\n% {padding}\n".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"endstream",
+        f"<< /Title (Synthetic) /Author (Bench) /Producer (corpus.py) {info} >>".encode(),
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    with open(path, "wb") as f:
+        f.write(out.getvalue())
+
+
+def add_custom_properties(path, props):
+    """Add a docProps/custom.xml part with ``props`` to an OOXML package."""
+    entries = "".join(
+        f'<property fmtid="{{D5CDD505-2E9C-101B-9397-08002B2CF9AE}}" pid="{pid}" name="{key}">'
+        f"<vt:lpwstr>{value}</vt:lpwstr></property>"
+        for pid, (key, value) in enumerate(props, start=2)
+    )
+    custom = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<Properties xmlns="{CUSTOM_PROPS_NS}" xmlns:vt="{VT_NS}">{entries}</Properties>'
+    )
+
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(path) as zin, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            data = zin.read(info)
+            if info.filename == "[Content_Types].xml":
+                data = data.replace(
+                    b"</Types>",
+                    f'<Override PartName="/docProps/custom.xml" ContentType="{CUSTOM_PROPS_CONTENT_TYPE}"/></Types>'.encode(),
+                )
+            elif info.filename == "_rels/.rels":
+                data = data.replace(
+                    b"</Relationships>",
+                    f'<Relationship Id="rIdCustom" Type="{CUSTOM_PROPS_TYPE}" Target="docProps/custom.xml"/></Relationships>'.encode(),
+                )
+            zout.writestr(info, data)
+        zout.writestr("docProps/custom.xml", custom)
+    os.replace(tmp_path, path)
+
+
+def make_docx(path, size, density, rng):
+    document = Document()
+    core = document.core_properties
+    core.author, core.title, core.subject, core.keywords = "Bench", "Synthetic", "corpus", "synthetic"
+    core.comments = "; ".join(value for _, value in fields(rng, 4, ""))
+    document.add_paragraph("Synthetic benchmark document.")
+    if size > 40 * 1024:
+        # An incompressible image brings the package up to size
+        image = io.BytesIO()
+        noise_image(rng, size - 40 * 1024, "png").save(image, "PNG", compress_level=1)
+        image.seek(0)
+        document.add_picture(image)
+    document.save(path)
+    add_custom_properties(path, fields(rng, density, "Field"))
+
+
+def make_xlsx(path, size, density, rng):
+    workbook = openpyxl.Workbook()
+    workbook.properties.creator = "Bench"
+    workbook.properties.title = "Synthetic"
+    workbook.properties.description = "; ".join(value for _, value in fields(rng, 4, ""))
+    sheet = workbook.active
+    # Random hex cells compress about 2:1 inside the package
+    for row in range(max(1, size // 150)):
+        sheet.append([rng.randbytes(16).hex() for _ in range(6)])
+    workbook.save(path)
+    add_custom_properties(path, fields(rng, density, "Field"))
+
+
+def id3_frame(frame_id: str, text: str) -> bytes:
+    body = b"\x00" + text.encode("latin-1")  # encoding byte: ISO-8859-1
+    return frame_id.encode() + struct.pack(">I", len(body)) + b"\x00\x00" + body
+
+
+def syncsafe(n: int) -> bytes:
+    return bytes([(n >> 21) & 0x7F, (n >> 14) & 0x7F, (n >> 7) & 0x7F, n & 0x7F])
+
+
+def make_mp3(path, size, density, rng):
+    frames = [id3_frame("TIT2", "Synthetic"), id3_frame("TPE1", "Bench"), id3_frame("TALB", "Corpus")]
+    for key, value in fields(rng, density, "Field"):
+        body = b"\x00" + key.encode("latin-1") + b"\x00" + value.encode("latin-1")
+        frames.append(b"TXXX" + struct.pack(">I", len(body)) + b"\x00\x00" + body)
+    tag_body = b"".join(frames)
+    tag = b"ID3\x03\x00\x00" + syncsafe(len(tag_body)) + tag_body
+
+    # MPEG-1 Layer III, 128 kbit/s, 44.1 kHz: 417-byte frames
+    frame = b"\xff\xfb\x90\x64" + bytes(413)
+    with open(path, "wb") as f:
+        f.write(tag)
+        for _ in range(max(1, (size - len(tag)) // len(frame))):
+            f.write(frame)
+
+
+MAKERS = {
+    "jpg": make_jpeg, "png": make_png, "pdf": make_pdf,
+    "docx": make_docx, "xlsx": make_xlsx, "mp3": make_mp3,
+}
+
+
+def generate(out_dir, sizes, densities, formats=FORMATS, seed=0):
+    """Write one file per format/size/density; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        for size in sizes:
+            for density in densities:
+                rng = random.Random(f"{seed}-{fmt}-{size}-{density}")
+                path = os.path.join(out_dir, f"{fmt}-{size // 1024}k-d{density}.{fmt}")
+                MAKERS[fmt](path, size, density, rng)
+                paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir")
+    parser.add_argument("--sizes", default="64k,1m", help="comma-separated target sizes")
+    parser.add_argument("--densities", default="4,64", help="comma-separated metadata field counts")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate(
+        args.out_dir,
+        [parse_size(s) for s in args.sizes.split(",")],
+        [int(d) for d in args.densities.split(",")],
+        args.formats.split(","),
+        args.seed,
+    )
+    for path in paths:
+        print(f"{os.path.getsize(path) / 1024:10.1f} KB  {path}")
+
+
+if __name__ == "__main__":
+    main()
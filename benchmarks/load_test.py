@@ -0,0 +1,281 @@
+"""Concurrent load test for a running server: /upload/ and /clean/batch/v2/.
+
+Closed loop keeps N clients busy back to back; open loop sends requests at
+a fixed average rate (Poisson arrivals) whether or not earlier ones have
+finished, and measures latency from the scheduled send time.  Each step
+reports p50/p95/p99 latency and throughput per endpoint, together with
+CPU and RSS of the server process tree (uvicorn plus exiftool children).
+
+    uvicorn app:app --port 8000 &
+    python benchmarks/load_test.py --files test-files --concurrency 1,2,4,8,16
+    python benchmarks/load_test.py --mode open --rate 5,10,20,40 --duration 20
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import statistics
+import threading
+import time
+
+import httpx
+import psutil
+
+ENDPOINTS = ("upload", "clean")
+
+
+def load_corpus(directory):
+    corpus = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.startswith("."):
+                with open(os.path.join(root, name), "rb") as f:
+                    corpus.append((name, f.read()))
+    if not corpus:
+        raise SystemExit(f"No files found in {directory}")
+    return corpus
+
+
+def find_server(pid, url, match):
+    """The server process: --server-pid, else whoever listens on the URL's port, else a command-line match."""
+    if pid:
+        return psutil.Process(pid)
+
+    port = httpx.URL(url).port or 80
+    try:
+        for conn in psutil.net_connections(kind="tcp"):
+            if conn.status == psutil.CONN_LISTEN and conn.laddr.port == port and conn.pid:
+                return psutil.Process(conn.pid)
+    except psutil.AccessDenied:
+        pass
+
+    for proc in psutil.process_iter(["cmdline"]):
+        cmdline = " ".join(proc.info["cmdline"] or [])
+        if match in cmdline and proc.pid != os.getpid():
+            return proc
+    return None
+
+
+class TreeSampler(threading.Thread):
+    """Samples CPU% and RSS of a process and all of its descendants."""
+
+    def __init__(self, root: psutil.Process, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.root = root
+        self.interval = interval
+        self.samples = []  # (cpu_percent, rss_bytes, process_count)
+        self._procs = {}
+        self._done = threading.Event()
+
+    def _tree(self):
+        try:
+            tree = [self.root, *self.root.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return []
+        for proc in tree:
+            if proc.pid not in self._procs:
+                self._procs[proc.pid] = proc
+                proc.cpu_percent(None)  # the first call only primes the counter
+        return tree
+
+    def run(self):
+        self._tree()
+        while not self._done.wait(self.interval):
+            cpu = rss = count = 0
+            for proc in self._tree():
+                try:
+                    cpu += self._procs[proc.pid].cpu_percent(None)
+                    rss += proc.memory_info().rss
+                    count += 1
+                except psutil.NoSuchProcess:
+                    self._procs.pop(proc.pid, None)
+            self.samples.append((cpu, rss, count))
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class Step:
+    def __init__(self):
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.last_error = {endpoint: None for endpoint in ENDPOINTS}
+
+    def fail(self, endpoint, error):
+        self.errors[endpoint] += 1
+        self.last_error[endpoint] = repr(error)
+
+
+async def run_operation(client, corpus, scenario, step, scheduled=None):
+    """One upload, optionally followed by a clean of the uploaded file."""
+    name, data = random.choice(corpus)
+    start = scheduled if scheduled is not None else time.perf_counter()
+    try:
+        response = await client.post("/upload/", files={"files": (name, data)})
+        response.raise_for_status()
+        file_id = response.json()["files"][0]["fileid"]
+    except Exception as e:
+        step.fail("upload", e)
+        return
+    step.latencies["upload"].append(time.perf_counter() - start)
+
+    if scenario != "upload+clean":
+        return
+    start = time.perf_counter()
+    try:
+        response = await client.post("/clean/batch/v2/", json={file_id: ["all"]})
+        response.raise_for_status()
+    except Exception as e:
+        step.fail("clean", e)
+        return
+    step.latencies["clean"].append(time.perf_counter() - start)
+
+
+async def closed_loop(client, corpus, scenario, concurrency, duration):
+    step = Step()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await run_operation(client, corpus, scenario, step)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return step
+
+
+async def open_loop(client, corpus, scenario, rate, duration, max_inflight):
+    step = Step()
+    inflight = asyncio.Semaphore(max_inflight)
+    tasks = []
+    now = time.perf_counter()
+    deadline = now + duration
+    next_send = now
+
+    async def send(scheduled):
+        async with inflight:
+            await run_operation(client, corpus, scenario, step, scheduled)
+
+    while next_send < deadline:
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+        tasks.append(asyncio.create_task(send(next_send)))
+        next_send += random.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return step
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(mode, level, step, elapsed, samples):
+    cpu = [s[0] for s in samples]
+    rows = []
+    for endpoint in ENDPOINTS:
+        latencies = step.latencies[endpoint]
+        if not latencies and not step.errors[endpoint]:
+            continue
+        rows.append({
+            "mode": mode,
+            "level": level,
+            "endpoint": endpoint,
+            "requests": len(latencies),
+            "errors": step.errors[endpoint],
+            "last_error": step.last_error[endpoint],
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+            **{
+                f"p{int(q * 100)}_ms": round(percentile(latencies, q) * 1000, 2) if latencies else None
+                for q in (0.50, 0.95, 0.99)
+            },
+            "server_cpu_mean": round(statistics.mean(cpu), 1) if cpu else None,
+            "server_cpu_peak": round(max(cpu), 1) if cpu else None,
+            "server_rss_peak_mb": round(max(s[1] for s in samples) / 2**20, 1) if samples else None,
+            "server_procs_peak": max(s[2] for s in samples) if samples else None,
+        })
+    return rows
+
+
+async def main_async(args):
+    corpus = load_corpus(args.files)
+    server = find_server(args.server_pid, args.url, args.server_match)
+    if server is None:
+        print("⚠️ Server process not found; CPU/RSS columns will be empty")
+
+    levels = args.rate if args.mode == "open" else args.concurrency
+    limits = httpx.Limits(max_connections=max(args.max_inflight, max(args.concurrency)))
+    rows = []
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            await closed_loop(client, corpus, args.scenario, 1, args.warmup)
+
+        for level in levels:
+            sampler = TreeSampler(server, args.sample_interval) if server else None
+            if sampler:
+                sampler.start()
+            start = time.perf_counter()
+            if args.mode == "open":
+                step = await open_loop(client, corpus, args.scenario, level, args.duration, args.max_inflight)
+            else:
+                step = await closed_loop(client, corpus, args.scenario, level, args.duration)
+            elapsed = time.perf_counter() - start
+            if sampler:
+                sampler.stop()
+
+            step_rows = summarize(args.mode, level, step, elapsed, sampler.samples if sampler else [])
+            for row in step_rows:
+                print(
+                    f"{args.mode:<6} {level:>6} {row['endpoint']:<7} {row['throughput_rps']:>8} req/s  "
+                    f"p50={row['p50_ms']} p95={row['p95_ms']} p99={row['p99_ms']} ms  "
+                    f"errors={row['errors']}  cpu={row['server_cpu_mean']}%  rss={row['server_rss_peak_mb']} MB"
+                )
+                if row["last_error"]:
+                    print(f"       last error: {row['last_error']}")
+            rows.extend(step_rows)
+    return rows
+
+
+def parse_levels(value, kind):
+    return [kind(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--files", default="test-files", help="directory of files to upload")
+    parser.add_argument("--scenario", choices=["upload", "upload+clean"], default="upload+clean")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", type=lambda v: parse_levels(v, int), default=[1, 2, 4, 8, 16],
+                        help="closed loop: comma-separated client counts")
+    parser.add_argument("--rate", type=lambda v: parse_levels(v, float), default=[5.0, 10.0, 20.0],
+                        help="open loop: comma-separated arrival rates (operations/s)")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per step")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of single-client warmup")
+    parser.add_argument("--max-inflight", type=int, default=256, help="open loop: cap on outstanding operations")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--server-pid", type=int, help="server process; found by the URL's port or --server-match if omitted")
+    parser.add_argument("--server-match", default="uvicorn", help="substring of the server's command line")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--out", default="load_test", help="writes <out>.csv and <out>.json")
+    args = parser.parse_args()
+
+    rows = asyncio.run(main_async(args))
+    if not rows:
+        return
+
+    with open(f"{args.out}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(f"{args.out}.json", "w") as f:
+        json.dump({"args": {k: v for k, v in vars(args).items()}, "results": rows}, f, indent=2)
+    print(f"Wrote {args.out}.csv and {args.out}.json")
+
+
+if __name__ == "__main__":
+    main()
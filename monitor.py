@@ -1,37 +1,63 @@
 import time
-import psutil
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-
-class PerformanceMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        proc = psutil.Process()
-
-        mem_before = proc.memory_info().rss
-        cpu_start = proc.cpu_times()
-
-        # Warm up CPU % sampling
-        proc.cpu_percent(interval=None)
-
-        start_time = time.perf_counter()
-        response = await call_next(request)
-        duration = time.perf_counter() - start_time
-
-        cpu_percent = proc.cpu_percent(interval=None)  # % over the last interval
-        cpu_end = proc.cpu_times()
-        mem_after = proc.memory_info().rss
-
-        cpu_user = cpu_end.user - cpu_start.user
-        cpu_system = cpu_end.system - cpu_start.system
-        mem_diff = (mem_after - mem_before) / (1024 * 1024)
-
-        print(f"""
-=== Performance Log ===
-→ PATH: {request.url.path}
-→ METHOD: {request.method}
-→ Wall Time: {duration:.4f} s
-→ CPU Time: User={cpu_user:.4f}s | System={cpu_system:.4f}s
-→ Memory Change: {mem_diff:.2f} MB
-""")
-
-        return response
+
+from services import spans
+from services.metrics import REGISTRY
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "metastrip_request_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+REQUEST_BYTES = REGISTRY.counter("metastrip_request_bytes_total", "Request body bytes received", ("route",))
+RESPONSE_BYTES = REGISTRY.counter("metastrip_response_bytes_total", "Response body bytes sent", ("route",))
+
+
+class PerformanceMiddleware:
+    """Pure ASGI middleware recording latency and bytes in/out per route.
+
+    Routes are labelled by their path template (``/clean/{file_id}``), so
+    the number of series stays bounded.  Response bodies are passed through
+    untouched, which keeps streaming responses streaming.  Stage spans
+    recorded while handling the request go out in a ``Server-Timing``
+    header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recorder = spans.start_request()
+        start = recorder.started
+        bytes_in = 0
+        bytes_out = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal bytes_in
+            message = await receive()
+            if message["type"] == "http.request":
+                bytes_in += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal bytes_out, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = recorder.server_timing(time.perf_counter() - start)
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, (scope["method"], route, status))
+            if bytes_in:
+                REQUEST_BYTES.inc((route,), bytes_in)
+            if bytes_out:
+                RESPONSE_BYTES.inc((route,), bytes_out)
@@ -0,0 +1,78 @@
+import json
+import os
+import uuid
+
+
+class BatchManifests:
+    """Batch downloads (zip name -> file ids) kept as small JSON files.
+
+    The archive itself is built when it is fetched, so the manifest lives on
+    disk next to the uploads: any worker can serve it, also after a restart.
+    Each entry records the file's size and mtime when the batch was made, so
+    a file that expired or was cleaned again since is reported instead of
+    being left out of the archive or zipped in its newer state.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+
+    def path(self, zip_name: str) -> str:
+        return os.path.join(self.directory, f"{zip_name}.json")
+
+    def create(self, prefix: str, file_ids: list[str], ref_dir: str) -> tuple[str, str]:
+        """Write a manifest for files in ``ref_dir``; returns the zip name and manifest path.
+
+        Files that don't exist are not recorded.
+        """
+        zip_name = f"{prefix}_{uuid.uuid4().hex[:8]}.zip"
+        files = []
+        for file_id in file_ids:
+            try:
+                st = os.stat(os.path.join(ref_dir, file_id))
+            except FileNotFoundError:
+                continue
+            files.append({"id": file_id, "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(zip_name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": files}, f)
+        os.replace(tmp_path, path)
+        return zip_name, path
+
+    def load(self, zip_name: str) -> list[dict] | None:
+        """The manifest's entries, or None when there is no such batch."""
+        if not zip_name.endswith(".zip") or os.path.basename(zip_name) != zip_name:
+            return None
+        try:
+            with open(self.path(zip_name), encoding="utf-8") as f:
+                return json.load(f)["files"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def unavailable(entries: list[dict], ref_dir: str) -> list[str]:
+        """File ids of ``entries`` that are gone or changed since the batch was made."""
+        stale = []
+        for entry in entries:
+            try:
+                st = os.stat(os.path.join(ref_dir, entry["id"]))
+            except FileNotFoundError:
+                stale.append(entry["id"])
+                continue
+            if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+                stale.append(entry["id"])
+        return stale
+
+    def entries(self):
+        """``(path, created_at, size)`` for every manifest on disk."""
+        found = []
+        if not os.path.isdir(self.directory):
+            return found
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".zip.json"):
+                    st = entry.stat()
+                    found.append((entry.path, st.st_mtime, st.st_size))
+        return found
@@ -0,0 +1,287 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: one worker only
+    fcntl = None
+
+
+class BlobStore:
+    """Content-addressed storage behind the upload directory.
+
+    Each distinct upload is kept once as ``blob_dir/ab/cd/<sha256><ext>``;
+    a file ID in ``ref_dir`` is a hard link to its blob, so the rest of the
+    app keeps opening ``uploads/<file_id>`` as before.  Every cleaner writes
+    a new file and renames it over the ref, which detaches that ref from the
+    blob without touching the others (copy-on-write).  Blobs are reference
+    counted and removed with their last ref.
+
+    Refs are appended to a journal in ``blob_dir`` and replayed on start,
+    so a restart doesn't have to scan the upload directory.  The journal is
+    compacted once it holds more than twice as many records as live refs.
+    Where hard links aren't supported the blob is copied instead.
+
+    Workers share the blob directory, so the journal is also how they see
+    each other's refs: every change takes an exclusive ``flock`` on
+    ``registry.lock``, reads what other workers appended since, and only
+    then counts, writes and compacts.
+    """
+
+    JOURNAL_NAME = "registry.jsonl"
+    LOCK_NAME = "registry.lock"
+    # Fewest records before a compaction is worth it
+    COMPACT_MIN_RECORDS = 1000
+
+    def __init__(self, ref_dir: str, blob_dir: str):
+        self.ref_dir = os.path.abspath(ref_dir)
+        self.blob_dir = os.path.abspath(blob_dir)
+        self.journal_path = os.path.join(self.blob_dir, self.JOURNAL_NAME)
+        self.lock_path = os.path.join(self.blob_dir, self.LOCK_NAME)
+        # file_id -> {"blob", "size", "created_at"}; size is the blob's
+        self._refs: dict[str, dict] = {}
+        self._counts: dict[str, int] = {}
+        self._journal = None
+        # Inode and read position of the journal, so other workers' records are replayed once
+        self._journal_ino = None
+        self._journal_pos = 0
+        self._journal_records = 0
+        self._lock_file = None
+        self._lock = threading.Lock()
+        self.dedup_hits = 0
+
+    @classmethod
+    def from_env(cls, ref_dir: str) -> "BlobStore":
+        return cls(ref_dir, os.getenv("BLOB_DIR", os.path.join(ref_dir, ".blobs")))
+
+    def start(self) -> bool:
+        """Replay and compact the journal. Returns False when there was none."""
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._lock_file = open(self.lock_path, "a")
+        with self._locked():
+            found = self._journal_ino is not None
+            self._compact()
+        return found
+
+    @contextmanager
+    def _locked(self):
+        """Hold the thread lock and the cross-process lock, with other workers' records applied."""
+        with self._lock:
+            if self._lock_file is not None and fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                self._catch_up()
+                yield
+            finally:
+                if self._lock_file is not None and fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _catch_up(self) -> None:
+        """Apply journal records written since the last read, from the start if it was compacted."""
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            ino = os.fstat(f.fileno()).st_ino
+            if ino != self._journal_ino:
+                self._refs.clear()
+                self._counts.clear()
+                self._journal_ino, self._journal_pos, self._journal_records = ino, 0, 0
+                if self._journal is not None:
+                    self._journal.close()
+                    self._journal = None
+            f.seek(self._journal_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a record still being written
+                self._journal_pos += len(line)
+                self._journal_records += 1
+                try:
+                    record = json.loads(line)
+                    ref = None
+                    if record.get("op") == "add":
+                        ref = {"blob": record["blob"], "size": record["size"], "created_at": record["t"]}
+                except (ValueError, KeyError):
+                    continue  # torn line after a crash
+                self._apply(record["id"], ref)
+        if self._journal is None and self._lock_file is not None:
+            self._journal = open(self.journal_path, "ab")
+
+    def _apply(self, file_id: str, ref: dict | None) -> None:
+        """Set (or with ``ref=None`` drop) a ref in memory, keeping blob counts in step."""
+        old = self._refs.pop(file_id, None)
+        if old is not None and old["blob"] is not None:
+            self._counts[old["blob"]] -= 1
+            if not self._counts[old["blob"]]:
+                del self._counts[old["blob"]]
+        if ref is not None:
+            self._refs[file_id] = ref
+            if ref["blob"] is not None:
+                self._counts[ref["blob"]] = self._counts.get(ref["blob"], 0) + 1
+
+    def _compact(self) -> None:
+        """Rewrite the journal with one record per live ref."""
+        if self._journal is not None:
+            self._journal.close()
+        tmp_path = f"{self.journal_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for file_id, ref in self._refs.items():
+                f.write(self._record("add", file_id, ref))
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "ab")
+        self._journal_ino = os.fstat(self._journal.fileno()).st_ino
+        self._journal_pos = self._journal.tell()
+        self._journal_records = len(self._refs)
+
+    def stop(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @staticmethod
+    def _record(op: str, file_id: str, ref: dict | None = None) -> bytes:
+        record = {"op": op, "id": file_id}
+        if ref is not None:
+            record.update(blob=ref["blob"], size=ref["size"], t=ref["created_at"])
+        return (json.dumps(record) + "\n").encode()
+
+    def _log(self, line: bytes) -> None:
+        """Append a record; call with the lock held, after ``_apply``-ing it."""
+        if self._journal is None:
+            return
+        self._journal.write(line)
+        self._journal.flush()
+        self._journal_pos += len(line)
+        self._journal_records += 1
+        if self._journal_records > max(self.COMPACT_MIN_RECORDS, 2 * len(self._refs)):
+            self._compact()
+
+    def blob_path(self, blob: str) -> str:
+        return os.path.join(self.blob_dir, blob[:2], blob[2:4], blob)
+
+    def ref_path(self, file_id: str) -> str:
+        return os.path.join(self.ref_dir, file_id)
+
+    def _link(self, blob_path: str, ref_path: str) -> None:
+        try:
+            os.link(blob_path, ref_path)
+        except OSError:
+            shutil.copyfile(blob_path, ref_path)
+
+    def put(self, file_id: str, sha256: str, ext: str, write) -> tuple[str, str, int]:
+        """Store an upload as ``file_id``, calling ``write(path)`` only for new content.
+
+        Returns the ref path, the blob and the blob's size, whether this
+        upload wrote it or found it already stored.
+        """
+        blob = f"{sha256}{ext.lower()}"
+        blob_path = self.blob_path(blob)
+        ref_path = self.ref_path(file_id)
+
+        with self._locked():
+            if self._counts.get(blob):
+                self._link(blob_path, ref_path)
+                self.dedup_hits += 1
+                return ref_path, blob, self._add_ref(file_id, blob, os.path.getsize(blob_path))
+
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        tmp_path = f"{blob_path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            write(tmp_path)
+            size = os.path.getsize(tmp_path)
+            with self._locked():
+                if self._counts.get(blob):
+                    # Same bytes finished uploading concurrently
+                    self.dedup_hits += 1
+                else:
+                    os.replace(tmp_path, blob_path)
+                self._link(blob_path, ref_path)
+                return ref_path, blob, self._add_ref(file_id, blob, size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _add_ref(self, file_id: str, blob: str, size: int) -> int:
+        ref = {"blob": blob, "size": size, "created_at": time.time()}
+        self._apply(file_id, ref)
+        self._log(self._record("add", file_id, ref))
+        return size
+
+    def remove(self, ref_path: str) -> None:
+        """Delete a ref and, when it was the last one, its blob."""
+        file_id = os.path.basename(ref_path)
+        try:
+            os.remove(ref_path)
+        except FileNotFoundError:
+            pass
+
+        with self._locked():
+            ref = self._refs.get(file_id)
+            if ref is None:
+                return  # unknown, or already removed by another worker
+            self._apply(file_id, None)
+            self._log(self._record("del", file_id))
+            blob = ref["blob"]
+            if blob is None or self._counts.get(blob):
+                return
+            try:
+                os.remove(self.blob_path(blob))
+            except FileNotFoundError:
+                pass
+
+    def usage(self, ref_path: str) -> tuple[int, str | None, int] | None:
+        """``(size, blob, blob_size)`` a ref holds on disk, or None when it is gone.
+
+        ``size`` is what the ref adds on top of its blob: nothing while it
+        is still a link to it, its own size once a cleaner has replaced it
+        (the blob stays until its last ref is removed).
+        """
+        with self._locked():
+            ref = self._refs.get(os.path.basename(ref_path))
+            blob = ref["blob"] if ref is not None else None
+        try:
+            st = os.stat(ref_path)
+        except FileNotFoundError:
+            return None
+        if blob is None:
+            return st.st_size, None, 0
+        try:
+            blob_st = os.stat(self.blob_path(blob))
+        except FileNotFoundError:
+            return st.st_size, None, 0
+        linked = (st.st_dev, st.st_ino) == (blob_st.st_dev, blob_st.st_ino)
+        return 0 if linked else st.st_size, blob, blob_st.st_size
+
+    def entries(self):
+        """``(ref_path, created_at, size, blob, blob_size)`` for every registered ref still on disk."""
+        with self._locked():
+            refs = [(self.ref_path(file_id), ref["created_at"]) for file_id, ref in self._refs.items()]
+        entries = []
+        for ref_path, created_at in refs:
+            usage = self.usage(ref_path)
+            if usage is not None:
+                entries.append((ref_path, created_at, *usage))
+        return entries
+
+    def live_paths(self) -> set[str]:
+        """The journal, its lock and every blob some ref still holds."""
+        with self._locked():
+            blobs = {self.blob_path(blob) for blob in self._counts}
+        return blobs | {self.journal_path, self.lock_path}
+
+    def stats(self) -> dict:
+        with self._locked():
+            return {
+                "refs": len(self._refs),
+                "blobs": len(self._counts),
+                "dedup_hits": self.dedup_hits,
+            }
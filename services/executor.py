@@ -0,0 +1,77 @@
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from services import spans
+
+
+class BlockingExecutor:
+    """Runs blocking work (exiftool, zipfile, disk I/O) off the event loop.
+
+    A single thread pool is shared by every endpoint.  ``max_workers`` caps
+    the total number of blocking jobs in flight and each named limit caps how
+    many of those one endpoint may hold, so a burst of batch cleans can't
+    starve uploads.  Callers beyond a limit wait on the event loop, where the
+    wait stays cancellable, rather than in the pool's queue.
+    """
+
+    def __init__(self, max_workers: int = 8, limits: dict[str, int] | None = None):
+        self.max_workers = max(1, max_workers)
+        self.limits = limits or {}
+        self._pool: ThreadPoolExecutor | None = None
+        self._global: asyncio.Semaphore | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @classmethod
+    def from_env(cls) -> "BlockingExecutor":
+        return cls(
+            max_workers=int(os.getenv("BLOCKING_WORKERS", "8")),
+            limits={
+                "view": int(os.getenv("VIEW_CONCURRENCY", "8")),
+                "upload": int(os.getenv("UPLOAD_CONCURRENCY", "6")),
+                "clean": int(os.getenv("CLEAN_CONCURRENCY", "4")),
+            },
+        )
+
+    def start(self) -> None:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="blocking")
+
+    def stop(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore | None:
+        if name not in self.limits:
+            return None
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(max(1, self.limits[name]))
+        return self._semaphores[name]
+
+    async def run(self, name: str, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the pool under the ``name`` limit.
+
+        The caller's context is carried into the worker thread, so spans
+        recorded there land in the current request.
+        """
+        self.start()
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_workers)
+
+        limit = self._semaphore(name)
+        loop = asyncio.get_running_loop()
+        queued = time.perf_counter()
+        if limit is not None:
+            await limit.acquire()
+        try:
+            async with self._global:
+                spans.record(f"{name}_queue", time.perf_counter() - queued)
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(self._pool, context.run, partial(fn, *args, **kwargs))
+        finally:
+            if limit is not None:
+                limit.release()
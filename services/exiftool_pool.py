@@ -0,0 +1,160 @@
+import os
+import queue
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import exiftool
+
+from services import spans
+
+# Errors that leave a worker's pipes broken or its output out of step; a
+# caller's own OSError (a missing file, say) says nothing about the worker
+WORKER_FAILURES = (
+    BrokenPipeError,
+    TimeoutError,
+    subprocess.SubprocessError,
+    exiftool.exceptions.ExifToolProcessStateError,
+)
+
+
+class ExifToolPool:
+    """A fixed-size pool of persistent ``-stay_open`` ExifTool processes.
+
+    Workers are checked out one caller at a time, so several threads can run
+    exiftool concurrently without paying for a Perl startup on every call.
+    A worker is restarted once it has served ``max_requests`` commands, or if
+    its process died or its pipes failed while it was checked out.
+    """
+
+    def __init__(self, size: int = 4, max_requests: int = 500, checkout_timeout: float = 30.0):
+        self.size = max(1, size)
+        self.max_requests = max_requests
+        self.checkout_timeout = checkout_timeout
+        self._idle: "queue.LifoQueue[exiftool.ExifTool]" = queue.LifoQueue()
+        self._uses: dict[int, int] = {}
+        self._spawned = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self.waiting = 0
+
+    @classmethod
+    def from_env(cls) -> "ExifToolPool":
+        return cls(
+            size=int(os.getenv("EXIFTOOL_POOL_SIZE", "4")),
+            max_requests=int(os.getenv("EXIFTOOL_MAX_REQUESTS", "500")),
+            checkout_timeout=float(os.getenv("EXIFTOOL_CHECKOUT_TIMEOUT", "30")),
+        )
+
+    def _spawn(self) -> exiftool.ExifTool:
+        et = exiftool.ExifTool()
+        et.run()
+        self._uses[id(et)] = 0
+        return et
+
+    def _retire(self, et: exiftool.ExifTool) -> None:
+        self._uses.pop(id(et), None)
+        try:
+            if et.running:
+                et.terminate()
+        except Exception as e:
+            print(f"⚠️ Failed to stop exiftool worker: {e}")
+
+    def start(self) -> None:
+        """Spawn every worker up front so the first requests don't pay for it."""
+        self._closed = False
+        while True:
+            with self._lock:
+                if self._spawned >= self.size:
+                    return
+                self._spawned += 1
+            try:
+                self._idle.put(self._spawn())
+            except Exception:
+                with self._lock:
+                    self._spawned -= 1
+                raise
+
+    def stop(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                et = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(et)
+            with self._lock:
+                self._spawned -= 1
+
+    def _acquire(self) -> exiftool.ExifTool:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_spawn = self._spawned < self.size
+            if can_spawn:
+                self._spawned += 1
+        if can_spawn:
+            try:
+                return self._spawn()
+            except Exception:
+                with self._lock:
+                    self._spawned -= 1
+                raise
+
+        with self._lock:
+            self.waiting += 1
+        try:
+            return self._idle.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            raise TimeoutError("Timed out waiting for an exiftool worker")
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def _release(self, et: exiftool.ExifTool, healthy: bool) -> None:
+        uses = self._uses.get(id(et), 0) + 1
+        self._uses[id(et)] = uses
+
+        if healthy and et.running and uses < self.max_requests and not self._closed:
+            self._idle.put(et)
+            return
+
+        self._retire(et)
+        if self._closed:
+            with self._lock:
+                self._spawned -= 1
+            return
+        try:
+            self._idle.put(self._spawn())
+        except Exception as e:
+            print(f"⚠️ Failed to restart exiftool worker: {e}")
+            with self._lock:
+                self._spawned -= 1
+
+    @contextmanager
+    def checkout(self):
+        """Borrow a running ExifTool instance for the duration of the block."""
+        start = time.perf_counter()
+        et = self._acquire()
+        spans.record("exiftool_wait", time.perf_counter() - start)
+        healthy = True
+        try:
+            yield et
+        except WORKER_FAILURES:
+            healthy = False
+            raise
+        finally:
+            # Anything else (an exiftool error, bad JSON, a cancelled caller)
+            # leaves the process usable; a dead one is caught by et.running.
+            self._release(et, healthy)
+
+    def stats(self) -> dict:
+        return {"size": self.size, "idle": self._idle.qsize(), "waiting": self.waiting}
+
+    def execute(self, *params) -> str:
+        with self.checkout() as et:
+            return et.execute(*params)
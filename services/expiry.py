@@ -0,0 +1,208 @@
+import heapq
+import os
+import threading
+import time
+
+
+class ExpiryIndex:
+    """Expiry times and sizes of the files in a directory, kept in a min-heap.
+
+    Files are registered when they are written, so a sweep only looks at
+    the files that are actually due instead of listing and stat-ing the
+    whole directory.  Each sweep removes at most ``batch_size`` files.  When
+    the tracked bytes pass ``high_water``, the files closest to expiry are
+    evicted early until usage drops under ``low_water``.
+
+    Files that share a blob (see BlobStore) count its size once, for as long
+    as any of them is tracked; ``size`` is what a file holds on top of that,
+    e.g. a cleaned copy renamed over it.
+
+    ``reconcile`` is the slow path for whatever registration misses, such as
+    temp files left behind by a crash; run it now and then, not every sweep.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_age: float,
+        high_water: int,
+        low_water: int | None = None,
+        batch_size: int = 500,
+        remove=os.remove,
+    ):
+        self.directory = directory
+        self.max_age = max_age
+        self.high_water = high_water
+        self.low_water = low_water if low_water is not None else int(high_water * 0.8)
+        self.batch_size = batch_size
+        self.remove = remove
+        self._heap: list[tuple[float, str]] = []
+        # path -> (expires_at, size, blob); heap entries that don't match are stale
+        self._entries: dict[str, tuple[float, int, str | None]] = {}
+        # blob -> [size, tracked files holding it]
+        self._blobs: dict[str, list[int]] = {}
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, directory: str, max_age: float, remove=os.remove) -> "ExpiryIndex":
+        low_water = os.getenv("UPLOADS_LOW_WATER_BYTES")
+        return cls(
+            directory=os.path.abspath(directory),
+            max_age=max_age,
+            high_water=int(os.getenv("UPLOADS_HIGH_WATER_BYTES", str(5 * 1024**3))),
+            low_water=int(low_water) if low_water else None,
+            batch_size=int(os.getenv("EXPIRY_BATCH_SIZE", "500")),
+            remove=remove,
+        )
+
+    def rebuild(self, entries=None) -> None:
+        """Seed the index after a restart.
+
+        ``entries`` are ``(path, created_at, size)`` tuples, optionally
+        followed by ``blob, blob_size``; without them the directory is
+        scanned once and file mtimes are used.
+        """
+        if entries is None:
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries.append((entry.path, st.st_mtime, st.st_size))
+        with self._lock:
+            self._heap.clear()
+            self._entries.clear()
+            self._blobs.clear()
+            self.total_bytes = 0
+            for path, created_at, size, *shared in entries:
+                self._add(path, created_at + self.max_age, size, *shared)
+
+    def _hold(self, size: int, blob: str | None, blob_size: int) -> None:
+        self.total_bytes += size
+        if blob is not None:
+            held = self._blobs.setdefault(blob, [blob_size, 0])
+            if held[1] == 0:
+                self.total_bytes += held[0]
+            held[1] += 1
+
+    def _release(self, size: int, blob: str | None) -> None:
+        self.total_bytes -= size
+        if blob is not None:
+            held = self._blobs[blob]
+            held[1] -= 1
+            if held[1] == 0:
+                self.total_bytes -= held[0]
+                del self._blobs[blob]
+
+    def _add(self, path: str, expires_at: float, size: int, blob: str | None = None, blob_size: int = 0) -> None:
+        old = self._entries.get(path)
+        if old is not None:
+            self._release(old[1], old[2])
+        self._entries[path] = (expires_at, size, blob)
+        self._hold(size, blob, blob_size)
+        heapq.heappush(self._heap, (expires_at, path))
+
+    def track(
+        self,
+        path: str,
+        size: int | None = None,
+        created_at: float | None = None,
+        blob: str | None = None,
+        blob_size: int = 0,
+    ) -> None:
+        if size is None:
+            size = os.path.getsize(path)
+        if created_at is None:
+            created_at = time.time()
+        with self._lock:
+            self._add(path, created_at + self.max_age, size, blob, blob_size)
+
+    def update(self, path: str, size: int, blob: str | None = None, blob_size: int = 0) -> None:
+        """Re-count a tracked file's bytes (after a clean) without changing its expiry."""
+        with self._lock:
+            old = self._entries.get(path)
+            if old is None:
+                return
+            self._release(old[1], old[2])
+            self._entries[path] = (old[0], size, blob)
+            self._hold(size, blob, blob_size)
+
+    def _pop_due(self, limit: int, due) -> list[str]:
+        paths = []
+        while self._heap and len(paths) < limit:
+            expires_at, path = self._heap[0]
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != expires_at:
+                heapq.heappop(self._heap)  # stale
+                continue
+            if not due(expires_at):
+                break
+            heapq.heappop(self._heap)
+            del self._entries[path]
+            self._release(entry[1], entry[2])
+            paths.append(path)
+        return paths
+
+    def sweep(self) -> int:
+        """Delete up to ``batch_size`` expired or over-quota files; returns how many."""
+        now = time.time()
+        with self._lock:
+            paths = self._pop_due(self.batch_size, lambda expires_at: expires_at <= now)
+            if self.total_bytes > self.high_water:
+                over = lambda _: self.total_bytes > self.low_water
+                paths += self._pop_due(self.batch_size - len(paths), over)
+
+        self._remove_all(paths)
+        if paths:
+            print(f"🗑️ Deleted {len(paths)} expired file(s)")
+        return len(paths)
+
+    def reconcile(self, keep=()) -> int:
+        """Delete untracked files under the directory that haven't changed for ``max_age``.
+
+        Both mtime and ctime have to be that old, as linking a new upload to
+        an old blob only moves the latter.  ``keep`` lists paths to leave
+        alone (journals, blobs still in use).  Returns how many files were deleted.
+        """
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            tracked = set(self._entries)
+        stale = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if path in tracked or path in keep:
+                    continue
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if max(st.st_mtime, st.st_ctime) < cutoff:
+                    stale.append(path)
+
+        self._remove_all(stale)
+        if stale:
+            print(f"🗑️ Deleted {len(stale)} untracked file(s)")
+        return len(stale)
+
+    def _remove_all(self, paths) -> None:
+        for path in paths:
+            try:
+                self.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"⚠️ Failed to delete {path}: {e}")
+
+    def over_high_water(self) -> bool:
+        return self.total_bytes > self.high_water
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self.total_bytes,
+                "high_water": self.high_water,
+                "low_water": self.low_water,
+            }
@@ -0,0 +1,91 @@
+import hashlib
+import struct
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Top-level boxes a file may start with
+LEADING_BOXES = {b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"}
+# Top-level boxes holding media samples or padding rather than metadata
+PAYLOAD_BOXES = {b"mdat", b"free", b"skip", b"wide"}
+
+
+class IsobmffFormatError(ValueError):
+    pass
+
+
+def read_box_header(f, offset: int, end: int) -> tuple[bytes, int, int]:
+    """``(type, header_size, box_size)`` of the box at ``offset``.
+
+    A box whose size field is 0 runs to ``end``.
+    """
+    f.seek(offset)
+    header = f.read(8)
+    if len(header) < 8:
+        raise IsobmffFormatError(f"Truncated box header at {offset}")
+    size, box_type = struct.unpack(">I4s", header)
+    header_size = 8
+    if size == 1:
+        large = f.read(8)
+        if len(large) < 8:
+            raise IsobmffFormatError(f"Truncated box header at {offset}")
+        size = struct.unpack(">Q", large)[0]
+        header_size = 16
+    elif size == 0:
+        size = end - offset
+    if size < header_size or offset + size > end:
+        raise IsobmffFormatError(f"Bad size {size} for {box_type!r} box at {offset}")
+    return box_type, header_size, size
+
+
+def iter_boxes(f, start: int, end: int):
+    """Yield ``(offset, type, header_size, size)`` for the boxes between ``start`` and ``end``."""
+    offset = start
+    while offset < end:
+        box_type, header_size, size = read_box_header(f, offset, end)
+        yield offset, box_type, header_size, size
+        offset += size
+
+
+def skeleton_ranges(f, size: int) -> list[tuple[int, int]]:
+    """Byte ranges of a file that carry everything but media payloads.
+
+    Headers of payload boxes are kept, their contents are not, so the ranges
+    usually amount to the leading and trailing boxes (``ftyp``, ``moov``,
+    ``meta``, ``uuid``) whatever the file size.
+    """
+    ranges = []
+    for index, (offset, box_type, header_size, box_size) in enumerate(iter_boxes(f, 0, size)):
+        if index == 0 and box_type not in LEADING_BOXES:
+            raise IsobmffFormatError(f"Not an ISOBMFF file (starts with {box_type!r})")
+        length = header_size if box_type in PAYLOAD_BOXES else box_size
+        if ranges and ranges[-1][0] + ranges[-1][1] == offset:
+            ranges[-1] = (ranges[-1][0], ranges[-1][1] + length)
+        else:
+            ranges.append((offset, length))
+    return ranges
+
+
+def write_skeleton(src, dest: str, ranges: list[tuple[int, int]], size: int) -> str:
+    """Copy ``ranges`` of ``src`` to ``dest`` at the same offsets, leaving holes elsewhere.
+
+    ``dest`` gets the full size of ``src``, sparse where the filesystem
+    allows.  Returns a SHA-256 over the copied ranges, their offsets and the
+    size: it identifies the skeleton, not the source file.
+    """
+    digest = hashlib.sha256(b"isobmff-skeleton")
+    with open(dest, "wb") as out:
+        for offset, length in ranges:
+            digest.update(struct.pack(">QQ", offset, length))
+            src.seek(offset)
+            out.seek(offset)
+            remaining = length
+            while remaining:
+                chunk = src.read(min(remaining, COPY_BUFFER_SIZE))
+                if not chunk:
+                    raise IsobmffFormatError(f"Unexpected end of file at {offset + length - remaining}")
+                digest.update(chunk)
+                out.write(chunk)
+                remaining -= len(chunk)
+        out.truncate(size)
+    digest.update(struct.pack(">Q", size))
+    return digest.hexdigest()
@@ -0,0 +1,642 @@
+import io
+import os
+import shutil
+import struct
+import uuid
+
+from services.isobmff import IsobmffFormatError, read_box_header
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+XMP_UUID = bytes.fromhex("be7acfcb97a942e89c71999491e3afac")
+XMP_CONTENT_TYPE = b"application/rdf+xml"
+# ftyp brands of HEIF/AVIF images, whose top-level meta box holds the image itself
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1", b"avif", b"avis"}
+LEADING_BOXES = {b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"}
+# Containers on the way from moov to the chunk offset tables
+SAMPLE_TABLE_PATH = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+# Top-level boxes of fragmented files, which hold absolute or segment-relative
+# offsets (tfhd base_data_offset, sidx, tfra) that a rewrite doesn't patch
+FRAGMENT_BOXES = {b"moof", b"sidx", b"mfra", b"ssix"}
+
+# Request group names (lower-cased) -> what they remove; XMP-* groups map to "xmp"
+GROUP_ALIASES = {
+    "quicktime": "quicktime",
+    "userdata": "quicktime",
+    "keys": "quicktime",
+    "itemlist": "quicktime",
+    "xmp": "xmp",
+    "exif": "exif",
+    "ifd0": "exif",
+    "exififd": "exif",
+    "gps": "exif",
+}
+
+
+class IsobmffSelection:
+    """Which metadata to remove.
+
+    ``quicktime`` drops the ``udta`` and ``meta`` boxes of the movie and its
+    tracks (user data, Keys and ItemList tags), ``xmp`` the XMP ``uuid`` box,
+    ``XMP_`` atoms and HEIF XMP items, ``exif`` HEIF Exif items.
+    """
+
+    def __init__(self, quicktime=False, xmp=False, exif=False):
+        self.quicktime = quicktime
+        self.xmp = xmp
+        self.exif = exif
+
+
+# What `exiftool -all=` removes, as far as boxes go
+STRIP_ALL = IsobmffSelection(quicktime=True, xmp=True, exif=True)
+
+
+def selection_for_tags(tags) -> IsobmffSelection | None:
+    """Build a selection from request tags such as ``XMP:all`` or ``QuickTime:all``.
+
+    Returns None for single tags, which live inside boxes and need exiftool.
+    """
+    selection = IsobmffSelection()
+    for tag in tags:
+        group, _, name = tag.rpartition(":")
+        group, name = group.lower(), name.lower()
+        family = "xmp" if group.startswith("xmp") else GROUP_ALIASES.get(group)
+        if name != "all" or family is None:
+            return None
+        setattr(selection, family, True)
+    return selection
+
+
+def children(f, start: int, end: int):
+    """Boxes between ``start`` and ``end``, ignoring a QuickTime zero terminator."""
+    offset = start
+    while end - offset >= 8:
+        box_type, header_size, size = read_box_header(f, offset, end)
+        yield offset, box_type, header_size, size
+        offset += size
+
+
+def box_header(box_type: bytes, header_size: int, size: int) -> bytes:
+    """A header in the original form, so rebuilt boxes shrink by exactly what was dropped."""
+    if header_size == 16:
+        return struct.pack(">I4sQ", 1, box_type, size)
+    return struct.pack(">I4s", size, box_type)
+
+
+def _field(data: bytes, pos: int, size: int) -> bytes:
+    """``size`` bytes of a box payload at ``pos``; raises IsobmffFormatError past its end."""
+    if pos + size > len(data):
+        raise IsobmffFormatError(f"Truncated box: {size}-byte field at {pos} of {len(data)}")
+    return data[pos:pos + size]
+
+
+def _uint(data: bytes, pos: int, size: int) -> int:
+    return int.from_bytes(_field(data, pos, size), "big") if size else 0
+
+
+def _pack_uint(value: int, size: int) -> bytes:
+    if value < 0 or value >= 1 << (8 * size):
+        raise IsobmffFormatError(f"Offset {value} doesn't fit in {size} bytes")
+    return value.to_bytes(size, "big")
+
+
+def _cstring(data: bytes, pos: int) -> tuple[bytes, int]:
+    end = data.find(b"\0", pos)
+    if end < 0:
+        return data[pos:], len(data)
+    return data[pos:end], end + 1
+
+
+# -----------------------------------------------------------------------------
+# HEIF items
+# -----------------------------------------------------------------------------
+
+
+def metadata_items(iinf: bytes, selection: IsobmffSelection) -> set[int]:
+    """IDs of the Exif and XMP items listed in an ``iinf`` payload."""
+    version = _uint(iinf, 0, 1)
+    pos = 6 if version == 0 else 8
+    items = set()
+    f = io.BytesIO(iinf)
+    for offset, box_type, header_size, size in children(f, pos, len(iinf)):
+        if box_type != b"infe":
+            continue
+        infe = iinf[offset + header_size:offset + size]
+        infe_version = _uint(infe, 0, 1)
+        if infe_version < 2:
+            continue  # no item type before version 2
+        id_size = 2 if infe_version == 2 else 4
+        item_id = _uint(infe, 4, id_size)
+        type_pos = 4 + id_size + 2
+        item_type = _field(infe, type_pos, 4)
+        if item_type == b"Exif" and selection.exif:
+            items.add(item_id)
+        elif item_type == b"mime" and selection.xmp:
+            _, pos_after_name = _cstring(infe, type_pos + 4)
+            content_type, _ = _cstring(infe, pos_after_name)
+            if content_type == XMP_CONTENT_TYPE:
+                items.add(item_id)
+    return items
+
+
+class ItemLocations:
+    """A parsed ``iloc`` payload."""
+
+    def __init__(self, payload: bytes):
+        self.version = _uint(payload, 0, 1)
+        self.flags = payload[1:4]
+        sizes = _uint(payload, 4, 2)
+        self.offset_size = sizes >> 12
+        self.length_size = sizes >> 8 & 0x0F
+        self.base_offset_size = sizes >> 4 & 0x0F
+        self.index_size = sizes & 0x0F if self.version in (1, 2) else 0
+        self.id_size = 4 if self.version == 2 else 2
+        pos = 6
+        count = _uint(payload, pos, self.id_size)
+        pos += self.id_size
+
+        # item_id -> [construction_method, data_reference_index, base_offset, [(index, offset, length)]]
+        self.items: dict[int, list] = {}
+        for _ in range(count):
+            item_id = _uint(payload, pos, self.id_size)
+            pos += self.id_size
+            method = 0
+            if self.version in (1, 2):
+                method = _uint(payload, pos, 2) & 0x0F
+                pos += 2
+            reference = _uint(payload, pos, 2)
+            pos += 2
+            base_offset = _uint(payload, pos, self.base_offset_size)
+            pos += self.base_offset_size
+            extent_count = _uint(payload, pos, 2)
+            pos += 2
+            extents = []
+            for _ in range(extent_count):
+                index = _uint(payload, pos, self.index_size)
+                pos += self.index_size
+                offset = _uint(payload, pos, self.offset_size)
+                pos += self.offset_size
+                length = _uint(payload, pos, self.length_size)
+                pos += self.length_size
+                extents.append((index, offset, length))
+            self.items[item_id] = [method, reference, base_offset, extents]
+
+    def shift_file_offsets(self, shift) -> None:
+        """Move file offsets (construction method 0) to where ``shift`` says their data went."""
+        for item in self.items.values():
+            method, _, base_offset, extents = item
+            if method != 0 or not extents:
+                continue
+            if self.base_offset_size:
+                first = base_offset + extents[0][1]
+                item[2] = base_offset + shift(first) - first
+            else:
+                item[3] = [(index, shift(offset), length) for index, offset, length in extents]
+
+    def to_bytes(self) -> bytes:
+        out = [
+            bytes([self.version]), self.flags,
+            bytes([self.offset_size << 4 | self.length_size, self.base_offset_size << 4 | self.index_size]),
+            _pack_uint(len(self.items), self.id_size),
+        ]
+        for item_id, (method, reference, base_offset, extents) in self.items.items():
+            out.append(_pack_uint(item_id, self.id_size))
+            if self.version in (1, 2):
+                out.append(_pack_uint(method, 2))
+            out.append(_pack_uint(reference, 2))
+            out.append(_pack_uint(base_offset, self.base_offset_size) if self.base_offset_size else b"")
+            out.append(_pack_uint(len(extents), 2))
+            for index, offset, length in extents:
+                if self.index_size:
+                    out.append(_pack_uint(index, self.index_size))
+                if self.offset_size:
+                    out.append(_pack_uint(offset, self.offset_size))
+                if self.length_size:
+                    out.append(_pack_uint(length, self.length_size))
+        return b"".join(out)
+
+
+def item_ranges(locations: ItemLocations, item_ids: set[int]):
+    """``(method, offset, length)`` of the data of ``item_ids``; offsets are absolute for method 0."""
+    ranges = []
+    for item_id in item_ids:
+        method, _, base_offset, extents = locations.items.get(item_id, (0, 0, 0, []))
+        for _, offset, length in extents:
+            if method == 2:
+                continue  # data is another item's
+            if not length:
+                raise IsobmffFormatError(f"Item {item_id} runs to the end of its data")
+            ranges.append((method, base_offset + offset, length))
+    return ranges
+
+
+def drop_from_iinf(payload: bytes, item_ids: set[int]) -> bytes:
+    version = _uint(payload, 0, 1)
+    count_size = 2 if version == 0 else 4
+    kept = []
+    f = io.BytesIO(payload)
+    for offset, box_type, header_size, size in children(f, 4 + count_size, len(payload)):
+        infe = payload[offset:offset + size]
+        infe_version = _uint(infe, header_size, 1) if box_type == b"infe" else 0
+        if infe_version >= 2:
+            id_size = 2 if infe_version == 2 else 4
+            if _uint(infe, header_size + 4, id_size) in item_ids:
+                continue
+        kept.append(infe)
+    return payload[:4] + _pack_uint(len(kept), count_size) + b"".join(kept)
+
+
+def drop_from_iref(payload: bytes, item_ids: set[int]) -> bytes:
+    id_size = 2 if _uint(payload, 0, 1) == 0 else 4
+    out = [payload[:4]]
+    f = io.BytesIO(payload)
+    for offset, box_type, header_size, size in children(f, 4, len(payload)):
+        ref = payload[offset + header_size:offset + size]
+        from_id = _uint(ref, 0, id_size)
+        count = _uint(ref, id_size, 2)
+        to_ids = [_uint(ref, id_size + 2 + i * id_size, id_size) for i in range(count)]
+        kept = [to_id for to_id in to_ids if to_id not in item_ids]
+        if from_id in item_ids or not kept:
+            continue
+        body = _pack_uint(from_id, id_size) + _pack_uint(len(kept), 2) + b"".join(_pack_uint(i, id_size) for i in kept)
+        out.append(box_header(box_type, header_size, header_size + len(body)) + body)
+    return b"".join(out)
+
+
+def drop_from_ipma(payload: bytes, item_ids: set[int]) -> bytes:
+    version, flags = _uint(payload, 0, 1), _uint(payload, 1, 3)
+    id_size = 2 if version < 1 else 4
+    property_size = 2 if flags & 1 else 1
+    count = _uint(payload, 4, 4)
+    pos = 8
+    kept = []
+    for _ in range(count):
+        start = pos
+        item_id = _uint(payload, pos, id_size)
+        pos += id_size
+        pos += 1 + _uint(payload, pos, 1) * property_size
+        if pos > len(payload):
+            raise IsobmffFormatError("Truncated ipma box")
+        if item_id not in item_ids:
+            kept.append(payload[start:pos])
+    return payload[:4] + _pack_uint(len(kept), 4) + b"".join(kept)
+
+
+def rebuild_item_meta(data: bytes, base: int, item_ids: set[int], shift) -> bytes:
+    """A HEIF ``meta`` box (``data``, at file offset ``base``) without ``item_ids``.
+
+    The items' ``iinf``, ``iloc``, ``iref`` and ``ipma`` entries are dropped,
+    their ``idat`` bytes zeroed, and file offsets of the others moved with ``shift``.
+    """
+    f = io.BytesIO(data)
+    box_type, header_size, size = read_box_header(f, 0, len(data))
+    out = [data[header_size:header_size + 4]]  # version and flags
+    locations = None
+    for offset, child_type, child_header, child_size in children(f, header_size + 4, size):
+        payload = data[offset + child_header:offset + child_size]
+        if child_type == b"iinf":
+            payload = drop_from_iinf(payload, item_ids)
+        elif child_type == b"iref":
+            payload = drop_from_iref(payload, item_ids)
+        elif child_type == b"iprp":
+            payload = rebuild_properties(payload, item_ids)
+        elif child_type == b"iloc":
+            locations = ItemLocations(payload)
+            for item_id in item_ids:
+                locations.items.pop(item_id, None)
+            locations.shift_file_offsets(shift)
+            payload = locations.to_bytes()
+        out.append(box_header(child_type, child_header, child_header + len(payload)) + payload)
+    if locations is None:
+        raise IsobmffFormatError("HEIF meta box without iloc")
+    body = b"".join(out)
+    return box_header(box_type, header_size, header_size + len(body)) + body
+
+
+def rebuild_properties(payload: bytes, item_ids: set[int]) -> bytes:
+    out = []
+    f = io.BytesIO(payload)
+    for offset, box_type, header_size, size in children(f, 0, len(payload)):
+        box = payload[offset:offset + size]
+        if box_type == b"ipma":
+            body = drop_from_ipma(box[header_size:], item_ids)
+            box = box_header(box_type, header_size, header_size + len(body)) + body
+        out.append(box)
+    return b"".join(out)
+
+
+def zero_idat(data: bytes, idat_ranges) -> bytes:
+    """``data`` (a meta box) with ``idat_ranges`` of its idat payload zeroed."""
+    if not idat_ranges:
+        return data
+    f = io.BytesIO(data)
+    _, header_size, size = read_box_header(f, 0, len(data))
+    for offset, box_type, child_header, child_size in children(f, header_size + 4, size):
+        if box_type == b"idat":
+            buffer = bytearray(data)
+            start = offset + child_header
+            for position, length in idat_ranges:
+                if position + length > child_size - child_header:
+                    raise IsobmffFormatError("Item data past the end of idat")
+                buffer[start + position:start + position + length] = bytes(length)
+            return bytes(buffer)
+    raise IsobmffFormatError("Item stored in idat, but there is no idat box")
+
+
+# -----------------------------------------------------------------------------
+# Planning
+# -----------------------------------------------------------------------------
+
+
+class StripPlan:
+    """What to change in a file, found without writing anything.
+
+    ``drops`` maps the offset of every box to remove, at any depth, to its
+    ``(header_size, size)``.  ``item_meta`` is the HEIF meta box as
+    ``(offset, size)``, ``item_ids`` the items to take out of it, and
+    ``idat_zeros``/``zeros`` the ranges of their data to blank.
+    ``fragmented`` is set when the file has movie fragments.
+    """
+
+    def __init__(self):
+        self.top: list[tuple[int, bytes, int, int]] = []
+        self.fragmented = False
+        self.drops: dict[int, tuple[int, int]] = {}
+        self.item_meta: tuple[int, int] | None = None
+        self.item_ids: set[int] = set()
+        self.idat_zeros: list[tuple[int, int]] = []
+        self.zeros: list[tuple[int, int]] = []
+
+
+def plan_strip(f, size: int, selection: IsobmffSelection) -> StripPlan:
+    plan = StripPlan()
+    plan.top = list(children(f, 0, size))
+    if not plan.top or plan.top[0][1] not in LEADING_BOXES:
+        raise IsobmffFormatError("Not an ISOBMFF file")
+
+    heif = False
+    for offset, box_type, header_size, box_size in plan.top:
+        if box_type in FRAGMENT_BOXES:
+            plan.fragmented = True
+        elif box_type == b"ftyp":
+            f.seek(offset + header_size)
+            ftyp = f.read(box_size - header_size)
+            brands = {ftyp[:4]} | {ftyp[i:i + 4] for i in range(8, len(ftyp) - 3, 4)}
+            heif = bool(brands & HEIF_BRANDS)
+        elif box_type == b"uuid" and selection.xmp:
+            f.seek(offset + header_size)
+            if f.read(16) == XMP_UUID:
+                plan.drops[offset] = (header_size, box_size)
+        elif box_type == b"moov":
+            plan_movie(f, offset, header_size, box_size, selection, plan)
+        elif box_type in (b"meta", b"udta"):
+            if box_type == b"meta" and heif:
+                plan_item_meta(f, offset, header_size, box_size, selection, plan)
+            elif selection.quicktime:
+                plan.drops[offset] = (header_size, box_size)
+    return plan
+
+
+def plan_movie(f, offset, header_size, size, selection, plan) -> None:
+    """Queue the metadata boxes of a movie and its tracks."""
+    for child, child_type, child_header, child_size in children(f, offset + header_size, offset + size):
+        if child_type == b"trak":
+            plan_movie(f, child, child_header, child_size, selection, plan)
+        elif child_type in (b"udta", b"meta") and selection.quicktime:
+            plan.drops[child] = (child_header, child_size)
+        elif child_type == b"udta" and selection.xmp:
+            for atom, atom_type, atom_header, atom_size in children(f, child + child_header, child + child_size):
+                if atom_type == b"XMP_":
+                    plan.drops[atom] = (atom_header, atom_size)
+
+
+def plan_item_meta(f, offset, header_size, size, selection, plan) -> None:
+    f.seek(offset)
+    data = f.read(size)
+    boxes = {
+        box_type: data[child + child_header:child + child_size]
+        for child, box_type, child_header, child_size in children(io.BytesIO(data), header_size + 4, size)
+    }
+    if b"iinf" not in boxes or b"iloc" not in boxes:
+        raise IsobmffFormatError("HEIF meta box without iinf or iloc")
+    # Kept even with nothing to remove: its item offsets move with the boxes before them
+    plan.item_meta = (offset, size)
+    plan.item_ids = metadata_items(boxes[b"iinf"], selection)
+    pitm = boxes.get(b"pitm")
+    if pitm is not None and _uint(pitm, 4, 2 if _uint(pitm, 0, 1) == 0 else 4) in plan.item_ids:
+        raise IsobmffFormatError("The primary item is metadata")
+
+    for method, position, length in item_ranges(ItemLocations(boxes[b"iloc"]), plan.item_ids):
+        if method == 1:
+            plan.idat_zeros.append((position, length))
+        elif offset <= position < offset + size:
+            raise IsobmffFormatError("Item data inside the meta box")
+        else:
+            plan.zeros.append((position, length))
+
+
+# -----------------------------------------------------------------------------
+# Rewriting
+# -----------------------------------------------------------------------------
+
+
+def rebuild_container(data: bytes, base: int, plan: StripPlan, shift) -> bytes:
+    """The box ``data`` (at file offset ``base``) without dropped children, chunk offsets moved."""
+    f = io.BytesIO(data)
+    box_type, header_size, size = read_box_header(f, 0, len(data))
+    out = []
+    end = header_size
+    for offset, child_type, child_header, child_size in children(f, header_size, size):
+        end = offset + child_size
+        box = data[offset:end]
+        if base + offset in plan.drops:
+            continue
+        if child_type in SAMPLE_TABLE_PATH or any(base + offset < d < base + end for d in plan.drops):
+            box = rebuild_container(box, base + offset, plan, shift)
+        elif child_type in (b"stco", b"co64"):
+            box = patch_chunk_offsets(box, child_header, 4 if child_type == b"stco" else 8, shift)
+        out.append(box)
+    body = b"".join(out) + data[end:size]
+    return box_header(box_type, header_size, header_size + len(body)) + body
+
+
+def patch_chunk_offsets(box: bytes, header_size: int, entry_size: int, shift) -> bytes:
+    count = _uint(box, header_size + 4, 4)
+    start = header_size + 8
+    if start + count * entry_size > len(box):
+        raise IsobmffFormatError("Truncated chunk offset table")
+    entries = b"".join(
+        _pack_uint(shift(_uint(box, start + i * entry_size, entry_size)), entry_size) for i in range(count)
+    )
+    return box[:start] + entries + box[start + count * entry_size:]
+
+
+def shift_function(deltas: list[tuple[int, int, int]]):
+    """Maps an old file offset to its new one, given ``(start, end, bytes removed)`` per top-level box."""
+    def shift(offset: int) -> int:
+        moved = 0
+        for start, end, removed in deltas:
+            if offset >= end:
+                moved += removed
+            elif offset > start and removed:
+                raise IsobmffFormatError(f"Offset {offset} points into a rewritten box")
+        return offset - moved
+    return shift
+
+
+def _copy_range(src, dst, offset: int, length: int, zeros) -> None:
+    """Copy ``length`` bytes at ``offset``, writing zeros over any of ``zeros`` inside them."""
+    end = offset + length
+    position = offset
+    for zero_start, zero_length in sorted(zeros):
+        zero_start, zero_end = max(zero_start, offset), min(zero_start + zero_length, end)
+        if zero_start >= zero_end:
+            continue
+        _copy_exact(src, dst, position, zero_start - position)
+        _write_zeros(dst, zero_end - zero_start)
+        position = zero_end
+    _copy_exact(src, dst, position, end - position)
+
+
+def _copy_exact(src, dst, offset: int, n: int) -> None:
+    src.seek(offset)
+    while n:
+        chunk = src.read(min(n, COPY_BUFFER_SIZE))
+        if not chunk:
+            raise IsobmffFormatError("Truncated file")
+        dst.write(chunk)
+        n -= len(chunk)
+
+
+def _write_zeros(dst, n: int) -> None:
+    while n:
+        chunk = min(n, COPY_BUFFER_SIZE)
+        dst.write(bytes(chunk))
+        n -= chunk
+
+
+def strip_isobmff(src, dst, selection: IsobmffSelection | None = None) -> int:
+    """Copy an MP4/MOV/HEIF file from ``src`` to ``dst`` without the selected metadata.
+
+    Metadata boxes are dropped and the boxes around them shrunk; chunk
+    offsets (``stco``/``co64``) and item offsets (``iloc``) are moved to
+    match.  HEIF Exif/XMP items are taken out of the item tables and their
+    data zeroed in place, so ``mdat`` is copied through unchanged in size.
+    Fragmented files raise IsobmffFormatError when anything would move, as
+    their fragment offsets aren't patched.  ``src`` must be seekable.
+    Returns the number of bytes dropped.
+    """
+    selection = selection or STRIP_ALL
+    size = src.seek(0, os.SEEK_END)
+    plan = plan_strip(src, size, selection)
+
+    # First pass: how much each top-level box shrinks
+    rebuilt = {}
+    deltas = []
+    for offset, box_type, header_size, box_size in plan.top:
+        removed = 0
+        if offset in plan.drops:
+            removed = box_size
+        elif box_type == b"moov":
+            removed = sum(s for d, (_, s) in plan.drops.items() if offset < d < offset + box_size)
+        elif plan.item_meta and plan.item_meta[0] == offset:
+            src.seek(offset)
+            rebuilt[offset] = zero_idat(src.read(box_size), plan.idat_zeros)
+            removed = box_size - len(rebuild_item_meta(rebuilt[offset], offset, plan.item_ids, lambda o: o))
+        deltas.append((offset, offset + box_size, removed))
+    if plan.fragmented and any(removed for _, _, removed in deltas):
+        raise IsobmffFormatError("Fragmented file: moof/sidx offsets would go stale")
+    shift = shift_function(deltas)
+
+    end = 0
+    for offset, box_type, header_size, box_size in plan.top:
+        end = offset + box_size
+        if offset in plan.drops:
+            continue
+        if box_type == b"moov":
+            src.seek(offset)
+            dst.write(rebuild_container(src.read(box_size), offset, plan, shift))
+        elif offset in rebuilt:
+            dst.write(rebuild_item_meta(rebuilt[offset], offset, plan.item_ids, shift))
+        else:
+            _copy_range(src, dst, offset, box_size, plan.zeros)
+    _copy_exact(src, dst, end, size - end)  # trailing bytes too short to be a box
+    return sum(removed for _, _, removed in deltas)
+
+
+# -----------------------------------------------------------------------------
+# Blanking
+# -----------------------------------------------------------------------------
+
+
+def plan_in_place(f, plan: StripPlan) -> tuple[bytes | None, int]:
+    """The HEIF meta box rewritten and padded to its old size, and the bytes that frees.
+
+    ``(None, 0)`` when no items are removed.
+    """
+    if not plan.item_ids:
+        return None, 0
+    offset, box_size = plan.item_meta
+    f.seek(offset)
+    meta = rebuild_item_meta(zero_idat(f.read(box_size), plan.idat_zeros), offset, plan.item_ids, lambda o: o)
+    gap = box_size - len(meta)
+    if 0 < gap < 8:
+        raise IsobmffFormatError("No room for a free box after the meta box")
+    if gap:
+        meta += box_header(b"free", 8, gap) + bytes(gap - 8)
+    return meta, gap + sum(length for _, length in plan.idat_zeros)
+
+
+def apply_in_place(f, plan: StripPlan, meta: bytes | None, blanked: int = 0) -> int:
+    """Write a plan into an open ``r+b`` file without moving any data.
+
+    Dropped boxes become ``free`` boxes of the same size with their contents
+    zeroed, and a shrunken HEIF ``meta`` box (from plan_in_place) is padded
+    with a ``free`` box, so no offset changes.  Returns the number of
+    metadata bytes blanked.
+    """
+    for offset, (header_size, box_size) in plan.drops.items():
+        if any(o < offset < o + s for o, (_, s) in plan.drops.items()):
+            continue  # inside a box that is dropped anyway
+        f.seek(offset + 4)
+        f.write(b"free")
+        f.seek(offset + header_size)
+        _write_zeros(f, box_size - header_size)
+        blanked += box_size
+    if meta is not None:
+        f.seek(plan.item_meta[0])
+        f.write(meta)
+    for offset, length in plan.zeros:
+        f.seek(offset)
+        _write_zeros(f, length)
+        blanked += length
+    return blanked
+
+
+def strip_isobmff_file(file_path: str, selection: IsobmffSelection | None = None) -> int:
+    """Strip an MP4/MOV/HEIF file via a sibling temp file and an atomic rename.
+
+    The file itself is never written to: it may be hard-linked to a shared
+    blob or open in a download.  Fragmented files, whose offsets a rewrite
+    can't patch, are copied whole and blanked in the copy (see
+    apply_in_place).  Nothing is written when there is nothing to strip.
+    """
+    selection = selection or STRIP_ALL
+    tmp_path = f"{file_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(file_path, "rb") as src:
+            plan = plan_strip(src, src.seek(0, os.SEEK_END), selection)
+            if not plan.drops and not plan.item_ids:
+                return 0
+            with open(tmp_path, "w+b") as dst:
+                if plan.fragmented:
+                    src.seek(0)
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                    dropped = apply_in_place(dst, plan, *plan_in_place(dst, plan))
+                else:
+                    dropped = strip_isobmff(src, dst, selection)
+        os.replace(tmp_path, file_path)
+        return dropped
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import time
+import uuid
+
+from services import spans
+
+TERMINAL_STATES = {"done", "failed", "cancelled"}
+SSE_KEEPALIVE_SECONDS = 15
+
+
+class Job:
+    def __init__(self, job_id: str, file_ids: list[str]):
+        self.id = job_id
+        self.file_ids = file_ids
+        self.status = "queued"
+        self.results: dict[str, dict] = {}
+        self.download_url: str | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        self._version = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+    def snapshot(self, include_results: bool = True) -> dict:
+        snapshot = {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.file_ids),
+            "completed": len(self.results),
+            "failed": sum(1 for r in self.results.values() if "error" in r),
+            "download_url": self.download_url,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if include_results:
+            snapshot["results"] = [self.results[f] for f in self.file_ids if f in self.results]
+        return snapshot
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    async def _wait_for_change(self, version: int) -> bool:
+        """Wait until the job moves past ``version``; False after SSE_KEEPALIVE_SECONDS.
+
+        Returns with the condition released, so a slow reader never holds
+        up ``_notify`` in the job runner.
+        """
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self._version != version),
+                    SSE_KEEPALIVE_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def events(self):
+        """Server-Sent Events: one snapshot per change until the job finishes."""
+        version = -1
+        while True:
+            if version != self._version:
+                version = self._version
+                snapshot = json.dumps(self.snapshot())
+                yield f"event: progress\ndata: {snapshot}\n\n"
+                if self.finished:
+                    return
+            if not await self._wait_for_change(version):
+                yield ": keepalive\n\n"
+
+
+class JobManager:
+    """Runs batch cleans as background tasks that outlive the submitting request.
+
+    A job's items are handed to ``process_chunk`` a chunk at a time and its
+    results are published after every chunk; ``finalize``, also a coroutine
+    function, then gives the job its download URL.  At most ``max_concurrent``
+    jobs run at once; the rest wait queued.  Finished jobs are kept for
+    ``retention`` seconds, matching how long their files stay on disk.
+    """
+
+    def __init__(self, max_concurrent: int = 2, retention: float = 300):
+        self.retention = retention
+        self._jobs: dict[str, Job] = {}
+        self._slots = asyncio.Semaphore(max(1, max_concurrent))
+
+    def submit(self, items: dict, process_chunk, chunk_size: int = 32, finalize=None) -> Job:
+        self.prune()
+        job = Job(uuid.uuid4().hex, list(items))
+        job.task = asyncio.create_task(self._run(job, items, process_chunk, chunk_size, finalize))
+        self._jobs[job.id] = job
+        return job
+
+    async def _run(self, job: Job, items: dict, process_chunk, chunk_size: int, finalize) -> None:
+        # The job outlives the request that submitted it; don't time into its response
+        spans.detach()
+        try:
+            async with self._slots:
+                job.status = "running"
+                await job._notify()
+
+                keys = list(items)
+                for i in range(0, len(keys), chunk_size):
+                    chunk = {key: items[key] for key in keys[i:i + chunk_size]}
+                    job.results.update(await process_chunk(chunk))
+                    await job._notify()
+
+                if finalize is not None:
+                    job.download_url = await finalize(job)
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            await job._notify()
+
+    def get(self, job_id: str) -> Job | None:
+        self.prune()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.task.cancel()
+        return True
+
+    def prune(self) -> None:
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        for job in self._jobs.values():
+            if not job.finished:
+                job.task.cancel()
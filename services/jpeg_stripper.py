@@ -0,0 +1,206 @@
+import os
+import shutil
+import struct
+import uuid
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+SOI = 0xD8
+EOI = 0xD9
+SOS = 0xDA
+COM = 0xFE
+# Markers that stand alone without a length field
+STANDALONE = {0x01, *range(0xD0, 0xD8)}
+
+# Families `exiftool -all=` leaves alone; Adobe APP14 affects colour decoding.
+KEEP_ON_STRIP_ALL = {"Adobe"}
+
+# Request group names (lower-cased) -> segment families they remove.  IPTC
+# lives inside the Photoshop APP13 block, so removing either drops both.
+GROUP_ALIASES = {
+    "exif": {"EXIF"},
+    "xmp": {"XMP"},
+    "iptc": {"Photoshop"},
+    "photoshop": {"Photoshop"},
+    "icc_profile": {"ICC_Profile"},
+    "jfif": {"JFIF"},
+    "mpf": {"MPF"},
+    "flashpix": {"FlashPix"},
+    "ducky": {"Ducky"},
+    "comment": {"Comment"},
+    **{f"app{n}": {f"APP{n}"} for n in range(16)},
+}
+
+
+class JpegFormatError(ValueError):
+    pass
+
+
+def segment_family(marker: int, payload: bytes) -> str | None:
+    """Name the metadata family a segment belongs to, or None for image data."""
+    if marker == COM:
+        return "Comment"
+    if not 0xE0 <= marker <= 0xEF:
+        return None
+
+    n = marker - 0xE0
+    if n == 0 and payload[:5] in (b"JFIF\0", b"JFXX\0"):
+        return "JFIF"
+    if n == 1:
+        if payload.startswith(b"Exif\0"):
+            return "EXIF"
+        if payload.startswith((b"http://ns.adobe.com/xap/1.0/\0", b"http://ns.adobe.com/xmp/extension/\0")):
+            return "XMP"
+    if n == 2:
+        if payload.startswith(b"ICC_PROFILE\0"):
+            return "ICC_Profile"
+        if payload.startswith(b"MPF\0"):
+            return "MPF"
+        if payload.startswith(b"FPXR\0"):
+            return "FlashPix"
+    if n == 12 and payload.startswith(b"Ducky"):
+        return "Ducky"
+    if n == 13 and payload.startswith(b"Photoshop 3.0\0"):
+        return "Photoshop"
+    if n == 14 and payload.startswith(b"Adobe"):
+        return "Adobe"
+    return f"APP{n}"
+
+
+def families_for_groups(groups) -> set[str] | None:
+    """Map request groups like ``XMP`` or ``EXIF:all`` to segment families.
+
+    Returns None if any group can't be removed at segment level, in which case
+    the caller should fall back to exiftool.
+    """
+    families = set()
+    for group in groups:
+        name, _, tag = group.partition(":")
+        if tag and tag.lower() != "all":
+            return None
+        aliases = GROUP_ALIASES.get(name.lower())
+        if aliases is None:
+            return None
+        families |= aliases
+    return families
+
+
+def strip_jpeg(src, dst, families: set[str] | None = None) -> int:
+    """Copy a JPEG from ``src`` to ``dst`` minus its metadata segments.
+
+    With ``families=None`` everything `exiftool -all=` would remove is
+    dropped; otherwise only segments in ``families``.  Everything from the
+    first SOS on, including the entropy-coded data, is copied through in
+    large chunks without being parsed.  Returns the number of bytes dropped.
+
+    A strip-all also stops at the image's EOI: whatever follows it (MPO
+    secondary images with their own metadata, appended archives, vendor
+    trailers, previews) is dropped.  A selective strip keeps the trailer,
+    unless it drops the MPF segment that describes MPO images.  An MPF
+    segment that has to be kept raises JpegFormatError so the file goes
+    to exiftool.
+    """
+    if src.read(2) != b"\xff\xd8":
+        raise JpegFormatError("Not a JPEG file")
+    dst.write(b"\xff\xd8")
+
+    dropped = 0
+    mpf_dropped = False
+    while True:
+        byte = src.read(1)
+        if byte != b"\xff":
+            raise JpegFormatError("Expected a marker")
+        while byte == b"\xff":  # fill bytes
+            byte = src.read(1)
+        if not byte:
+            raise JpegFormatError("Truncated JPEG")
+        marker = byte[0]
+
+        if marker == EOI:
+            dst.write(b"\xff\xd9")
+            return dropped
+        if marker in STANDALONE:
+            dst.write(bytes((0xFF, marker)))
+            continue
+
+        length_bytes = src.read(2)
+        if len(length_bytes) != 2:
+            raise JpegFormatError("Truncated JPEG")
+        length = struct.unpack(">H", length_bytes)[0]
+        payload = src.read(length - 2)
+        if len(payload) != length - 2:
+            raise JpegFormatError("Truncated JPEG")
+
+        if marker == SOS:
+            dst.write(bytes((0xFF, marker)) + length_bytes + payload)
+            if families is None or mpf_dropped:
+                return dropped + copy_to_eoi(src, dst)
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+            return dropped
+
+        family = segment_family(marker, payload)
+        if family is not None and (
+            family not in KEEP_ON_STRIP_ALL if families is None else family in families
+        ):
+            mpf_dropped = mpf_dropped or family == "MPF"
+            dropped += length + 2
+            continue
+
+        if family == "MPF":
+            # The secondary images would keep their metadata, and their
+            # offsets would go stale if anything before them is dropped.
+            raise JpegFormatError("Cannot strip an MPO file while keeping its MPF block")
+        dst.write(bytes((0xFF, marker)) + length_bytes + payload)
+
+
+def copy_to_eoi(src, dst) -> int:
+    """Copy scan data up to the EOI that ends the current image.
+
+    Marker segments between scans (progressive JPEGs) are skipped over by
+    length, so bytes inside them are never taken for an EOI.  Returns the
+    number of bytes left behind after the EOI.
+    """
+    data = b""
+    pos = 0
+    while True:
+        i = data.find(b"\xff", pos)
+        if 0 <= i < len(data) - 1:
+            marker = data[i + 1]
+            if marker == EOI:
+                dst.write(data[:i + 2])
+                left = len(data) - (i + 2)
+                return left + src.seek(0, os.SEEK_END) - src.tell()
+            if marker == 0x00 or marker in STANDALONE:  # stuffed byte or RST
+                pos = i + 2
+                continue
+            if marker == 0xFF:  # fill byte
+                pos = i + 1
+                continue
+            if i + 4 <= len(data):
+                end = i + 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+                if end <= len(data):
+                    pos = end
+                    continue
+
+        # Flush what has been scanned and read on
+        cut = i if i >= 0 else len(data)
+        dst.write(data[:cut])
+        data = data[cut:]
+        pos = 0
+        chunk = src.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            raise JpegFormatError("Truncated JPEG")
+        data += chunk
+
+
+def strip_jpeg_file(file_path: str, families: set[str] | None = None) -> int:
+    """Strip a JPEG in place via a sibling temp file and an atomic rename."""
+    tmp_path = f"{file_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(file_path, "rb") as src, open(tmp_path, "wb") as dst:
+            dropped = strip_jpeg(src, dst, families)
+        os.replace(tmp_path, file_path)
+        return dropped
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
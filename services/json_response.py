@@ -0,0 +1,91 @@
+import json
+import zlib
+
+import orjson
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Smaller bodies aren't worth the compression overhead
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def dumps(obj) -> bytes:
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError:
+        # e.g. integers past 64 bits, which exiftool can report
+        return json.dumps(obj, default=str).encode("utf-8")
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data: bytes, sync: bool = False) -> bytes:
+        """Compress ``data``; with ``sync`` everything so far is emitted, so it can be sent now."""
+        if self.encoding == "br":
+            return self._c.process(data) + (self._c.flush() if sync else b"")
+        return self._c.compress(data) + (self._c.flush(zlib.Z_SYNC_FLUSH) if sync else b"")
+
+    def finish(self) -> bytes:
+        return self._c.finish() if self.encoding == "br" else self._c.flush()
+
+
+def json_response(payload, request, status_code: int = 200) -> Response:
+    """Encode ``payload`` with orjson, compressed when the client accepts it and it pays off."""
+    body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(request.headers.get("accept-encoding")) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        compressor = _Compressor(encoding)
+        body = compressor.compress(body) + compressor.finish()
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def streaming_json_response(chunks, request) -> StreamingResponse:
+    """Stream JSON produced piece by piece by the async iterator ``chunks``.
+
+    When compressed, each chunk is flushed through the compressor as it
+    arrives so the client sees results as they are ready.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    async def body():
+        compressor = _Compressor(encoding) if encoding else None
+        async for chunk in chunks:
+            if compressor is None:
+                yield chunk
+            else:
+                yield compressor.compress(chunk, sync=True)
+        if compressor is not None:
+            yield compressor.finish()
+
+    return StreamingResponse(body(), media_type="application/json", headers=headers)
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from cachetools import LRUCache, TTLCache
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# exiftool tags that describe where a file sits, not what it holds.  Identical
+# content stored under two names must not share them, so entries keep these
+# keys with null values and get them from the path they are served for.
+PATH_TAGS = (
+    "SourceFile",
+    "File:FileName",
+    "File:Directory",
+    "File:FileModifyDate",
+    "File:FileAccessDate",
+    "File:FileInodeChangeDate",
+    "File:FilePermissions",
+)
+
+
+def exiftool_date(timestamp: float) -> str:
+    """A timestamp the way exiftool prints file dates: local time with a ``+HH:MM`` offset."""
+    formatted = datetime.fromtimestamp(timestamp).astimezone().strftime("%Y:%m:%d %H:%M:%S%z")
+    return f"{formatted[:-2]}:{formatted[-2:]}"
+
+
+def path_tags(file_path: str) -> dict:
+    """PATH_TAGS values for ``file_path``, as exiftool would report them."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        st = None
+    values = {
+        "SourceFile": file_path,
+        "File:FileName": os.path.basename(file_path),
+        "File:Directory": os.path.dirname(file_path) or ".",
+    }
+    if st is not None:
+        values.update({
+            "File:FileModifyDate": exiftool_date(st.st_mtime),
+            "File:FileAccessDate": exiftool_date(st.st_atime),
+            "File:FileInodeChangeDate": exiftool_date(st.st_ctime),
+            # exiftool runs with -n, which gives the octal mode as a number
+            "File:FilePermissions": int(f"{st.st_mode:o}"),
+        })
+    return values
+
+
+def without_path_tags(value: tuple) -> tuple:
+    """``value`` with the PATH_TAGS of each of its dicts nulled, keeping key order."""
+    return tuple(
+        {key: None if key in PATH_TAGS else item for key, item in part.items()}
+        if any(key in part for key in PATH_TAGS) else part
+        for part in value
+    )
+
+
+def with_path_tags(value: tuple, file_path: str | None) -> tuple:
+    """Fills the nulled PATH_TAGS of a cached ``value`` in for ``file_path``.
+
+    Without a path (content never written to disk) the keys are left out.
+    """
+    values = path_tags(file_path) if file_path is not None else {}
+    return tuple(
+        {
+            key: values[key] if item is None and key in values else item
+            for key, item in part.items()
+            if item is not None or key not in PATH_TAGS or key in values
+        }
+        if any(key in part for key in PATH_TAGS) else part
+        for part in value
+    )
+
+
+class MetadataCache:
+    """Caches ``view_metadata`` results by content hash and suffix.
+
+    The in-memory tier is a bounded TTL/LRU cache.  When ``disk_dir`` is set,
+    entries are also written there as JSON (sharded by the first two hex
+    digits) and survive restarts and memory evictions.  ``evict_disk``
+    removes files not read for ``disk_ttl`` seconds, then the least recently
+    read ones until the tier fits in ``disk_max_bytes``.
+
+    Entries are keyed by content, so they are stored without PATH_TAGS;
+    ``get`` fills those in for the path the caller is reading.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 15 * 60,
+        disk_dir: str | None = None,
+        disk_ttl: float = 24 * 3600,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        # path -> (inode, mtime_ns, size, sha256), so unchanged files are hashed once
+        self._digests = LRUCache(maxsize=maxsize * 4)
+        self.disk_dir = disk_dir
+        self.disk_ttl = disk_ttl
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "MetadataCache":
+        return cls(
+            maxsize=int(os.getenv("METADATA_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("METADATA_CACHE_TTL", str(15 * 60))),
+            disk_dir=os.getenv("METADATA_CACHE_DIR") or None,
+            disk_ttl=float(os.getenv("METADATA_CACHE_DISK_TTL", str(24 * 3600))),
+            disk_max_bytes=int(os.getenv("METADATA_CACHE_DISK_BYTES", str(256 * 1024 * 1024))),
+        )
+
+    @staticmethod
+    def key(sha256: str, suffix: str) -> str:
+        return f"{sha256}{suffix.lower()}"
+
+    def digest(self, file_path: str) -> str:
+        """SHA-256 of a file, reusing the last result while its inode, size and mtime are unchanged.
+
+        Cleaners rename a new file over the old one, so a clean that keeps
+        the size within the same mtime tick still changes the inode.
+        """
+        st = os.stat(file_path)
+        with self._lock:
+            known = self._digests.get(file_path)
+        if known and known[:3] == (st.st_ino, st.st_mtime_ns, st.st_size):
+            return known[3]
+
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        self.remember_digest(file_path, sha256)
+        return sha256
+
+    def remember_digest(self, file_path: str, sha256: str) -> None:
+        st = os.stat(file_path)
+        with self._lock:
+            self._digests[file_path] = (st.st_ino, st.st_mtime_ns, st.st_size, sha256)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str, file_path: str | None = None):
+        """The entry for ``key`` with PATH_TAGS for ``file_path``, or None."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self.hits += 1
+                return with_path_tags(value, file_path)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r") as f:
+                    value = tuple(json.load(f))
+                os.utime(path)  # mtime is the last read, for evict_disk
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._memory[key] = value
+                return with_path_tags(value, file_path)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: tuple) -> None:
+        value = without_path_tags(value)
+        with self._lock:
+            self._memory[key] = value
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(value, f)
+                os.replace(tmp_path, path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"⚠️ Failed to write metadata cache entry {key}: {e}")
+
+    def get_or_compute(self, sha256: str, suffix: str, compute, file_path: str | None = None):
+        """The cached entry, or ``compute()`` stored for next time.
+
+        ``file_path`` is where a hit's PATH_TAGS point; a computed value is
+        returned as exiftool reported it.
+        """
+        key = self.key(sha256, suffix)
+        value = self.get(key, file_path)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def evict_disk(self) -> int:
+        """Delete expired disk entries, then the oldest until the tier fits; returns how many."""
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return 0
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+
+        files.sort()
+        cutoff = time.time() - self.disk_ttl
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"⚠️ Failed to evict metadata cache entry {path}: {e}")
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,174 @@
+import os
+import struct
+import uuid
+import zipfile
+import zlib
+from typing import Callable
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+_END_RECORD = struct.Struct("<4s4H2LH")
+_END_RECORD_SIGNATURE = b"PK\x05\x06"
+_ZIP64_END_RECORD = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_RECORD_SIGNATURE = b"PK\x06\x06"
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+_ZIP64_EXTRA_ID = 0x0001
+_MASK_USE_DATA_DESCRIPTOR = 0x08
+_MASK_UTF8 = 0x800
+_UINT16_MAX = 0xFFFF
+_UINT32_MAX = 0xFFFFFFFF
+
+
+def _raw_member_length(src, info: zipfile.ZipInfo) -> int:
+    """Bytes a member occupies on disk: local header, compressed data, descriptor."""
+    src.seek(info.header_offset)
+    header = src.read(_LOCAL_HEADER.size)
+    if len(header) != _LOCAL_HEADER.size:
+        raise zipfile.BadZipFile(f"Truncated local header for {info.filename}")
+    fields = _LOCAL_HEADER.unpack(header)
+    if fields[0] != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    name_length, extra_length = fields[-2], fields[-1]
+    length = _LOCAL_HEADER.size + name_length + extra_length + info.compress_size
+
+    if info.flag_bits & _MASK_USE_DATA_DESCRIPTOR:
+        src.seek(info.header_offset + length)
+        has_signature = src.read(4) == _DESCRIPTOR_SIGNATURE
+        zip64 = info.compress_size >= zipfile.ZIP64_LIMIT or info.file_size >= zipfile.ZIP64_LIMIT
+        length += (20 if zip64 else 12) + (4 if has_signature else 0)
+    return length
+
+
+def _copy_range(src, dst, offset: int, length: int) -> None:
+    src.seek(offset)
+    while length:
+        chunk = src.read(min(length, COPY_CHUNK_SIZE))
+        if not chunk:
+            raise zipfile.BadZipFile("Truncated ZIP member")
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+def _deflated(name: str, source: zipfile.ZipInfo, data: bytes) -> tuple[zipfile.ZipInfo, bytes]:
+    """A ZipInfo and raw deflate stream for a rewritten part."""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    info = zipfile.ZipInfo(name, source.date_time)
+    info.external_attr = source.external_attr
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.CRC = zlib.crc32(data)
+    info.file_size = len(data)
+    info.compress_size = len(compressed)
+    return info, compressed
+
+
+def _without_zip64_extra(extra: bytes) -> bytes:
+    fields = []
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<HH", extra, pos)
+        if header_id != _ZIP64_EXTRA_ID:
+            fields.append(extra[pos:pos + 4 + size])
+        pos += 4 + size
+    return b"".join(fields)
+
+
+def _encoded_name(info: zipfile.ZipInfo) -> tuple[bytes, int]:
+    if not info.flag_bits & _MASK_UTF8:
+        try:
+            return info.filename.encode("ascii"), info.flag_bits
+        except UnicodeEncodeError:
+            pass
+    return info.filename.encode("utf-8"), info.flag_bits | _MASK_UTF8
+
+
+def _central_header(info: zipfile.ZipInfo, offset: int) -> bytes:
+    """The central directory entry for a member written at ``offset``."""
+    # Zip64 extra fields appear in this order, each only when its header field overflows
+    large = [value for value in (info.file_size, info.compress_size, offset) if value >= zipfile.ZIP64_LIMIT]
+    extra = _without_zip64_extra(info.extra)
+    if large:
+        extra = struct.pack(f"<HH{len(large)}Q", _ZIP64_EXTRA_ID, 8 * len(large), *large) + extra
+    version = 45 if large else 20
+    name, flag_bits = _encoded_name(info)
+    year, month, day, hour, minute, second = info.date_time
+    return _CENTRAL_HEADER.pack(
+        _CENTRAL_HEADER_SIGNATURE,
+        max(version, info.create_version), info.create_system,
+        max(version, info.extract_version), info.reserved,
+        flag_bits, info.compress_type,
+        hour << 11 | minute << 5 | second // 2, (year - 1980) << 9 | month << 5 | day,
+        info.CRC,
+        min(info.compress_size, _UINT32_MAX), min(info.file_size, _UINT32_MAX),
+        len(name), len(extra), len(info.comment),
+        0, info.internal_attr, info.external_attr,
+        min(offset, _UINT32_MAX),
+    ) + name + extra + info.comment
+
+
+def _end_records(count: int, directory_offset: int, directory_size: int, comment: bytes) -> bytes:
+    records = b""
+    if count > _UINT16_MAX or directory_offset >= zipfile.ZIP64_LIMIT or directory_size >= zipfile.ZIP64_LIMIT:
+        zip64_offset = directory_offset + directory_size
+        records += _ZIP64_END_RECORD.pack(
+            _ZIP64_END_RECORD_SIGNATURE, _ZIP64_END_RECORD.size - 12, 45, 45, 0, 0,
+            count, count, directory_size, directory_offset,
+        )
+        records += _ZIP64_LOCATOR.pack(_ZIP64_LOCATOR_SIGNATURE, 0, zip64_offset, 1)
+    return records + _END_RECORD.pack(
+        _END_RECORD_SIGNATURE, 0, 0,
+        min(count, _UINT16_MAX), min(count, _UINT16_MAX),
+        min(directory_size, _UINT32_MAX), min(directory_offset, _UINT32_MAX),
+        len(comment),
+    ) + comment
+
+
+def rewrite_ooxml(
+    src_path: str,
+    dst_path: str,
+    rewrites: dict[str, Callable[[bytes], bytes]],
+) -> None:
+    """Copy an OOXML package, rewriting only the parts named in ``rewrites``.
+
+    Every other member is copied as its original bytes, local header and
+    data descriptor included, so images under ``word/media`` and the like
+    are never inflated or deflated again.  Rewritten parts are re-deflated
+    and get a header from ``ZipInfo.FileHeader``.  zipfile only reads the
+    source; the central directory is written here, Zip64 records included
+    when offsets or counts call for them.
+    """
+    with open(src_path, "rb") as raw, zipfile.ZipFile(raw) as zin, open(dst_path, "wb") as dst:
+        entries = []
+        for info in zin.infolist():
+            offset = dst.tell()
+            rewrite = rewrites.get(info.filename)
+            if rewrite is not None:
+                info, compressed = _deflated(info.filename, info, rewrite(zin.read(info)))
+                dst.write(info.FileHeader())
+                dst.write(compressed)
+            else:
+                _copy_range(raw, dst, info.header_offset, _raw_member_length(raw, info))
+            entries.append((info, offset))
+
+        directory_offset = dst.tell()
+        for info, offset in entries:
+            dst.write(_central_header(info, offset))
+        dst.write(_end_records(len(entries), directory_offset, dst.tell() - directory_offset, zin.comment))
+
+
+def rewrite_ooxml_in_place(file_path: str, rewrites: dict[str, Callable[[bytes], bytes]]) -> None:
+    """``rewrite_ooxml`` into a sibling temp file, then swap it in atomically."""
+    root, ext = os.path.splitext(file_path)
+    tmp_path = f"{root}.{uuid.uuid4().hex[:8]}.tmp{ext}"
+    try:
+        rewrite_ooxml(file_path, tmp_path, rewrites)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
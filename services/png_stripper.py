@@ -0,0 +1,146 @@
+import os
+import struct
+import uuid
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COPY_BUFFER_SIZE = 64 * 1024
+# Longest keyword (79 bytes) plus its NUL separator
+KEYWORD_PEEK = 80
+
+TEXT_CHUNKS = {b"tEXt", b"zTXt", b"iTXt"}
+XMP_KEYWORD = b"XML:com.adobe.xmp"
+
+
+class PngFormatError(ValueError):
+    pass
+
+
+class PngSelection:
+    """Which metadata chunks to drop.
+
+    ``chunk_types`` are removed outright; text chunks are removed when
+    ``all_text`` is set or their keyword is in ``keywords`` (compared the way
+    exiftool names them: spaces removed, case-insensitive).  The XMP packet
+    is an iTXt chunk and is only dropped when ``xmp`` is set.
+    """
+
+    def __init__(self, chunk_types=(), keywords=(), all_text=False, xmp=False):
+        self.chunk_types = set(chunk_types)
+        self.keywords = {normalize_keyword(k) for k in keywords}
+        self.all_text = all_text
+        self.xmp = xmp
+
+    def drops(self, chunk_type: bytes, keyword: bytes | None = None) -> bool:
+        if chunk_type in self.chunk_types:
+            return True
+        if chunk_type not in TEXT_CHUNKS:
+            return False
+        if keyword == XMP_KEYWORD:
+            return self.xmp
+        return self.all_text or normalize_keyword(keyword or b"") in self.keywords
+
+
+def normalize_keyword(keyword) -> str:
+    if isinstance(keyword, bytes):
+        keyword = keyword.decode("latin-1")
+    return keyword.replace(" ", "").lower()
+
+
+# What `exiftool -all=` removes from a PNG
+STRIP_ALL = PngSelection(chunk_types={b"eXIf", b"tIME", b"iCCP"}, all_text=True, xmp=True)
+
+
+def selection_for_tags(tags) -> PngSelection | None:
+    """Build a selection from request tags such as ``PNG:Author`` or ``XMP:all``.
+
+    Returns None when a tag lives inside a chunk (e.g. a single XMP
+    property), so the caller can fall back to exiftool.
+    """
+    selection = PngSelection()
+    for tag in tags:
+        group, _, name = tag.rpartition(":")
+        group, name = group.lower(), name.lower()
+        if group == "png":
+            if name == "all":
+                selection.all_text = True
+                selection.chunk_types.add(b"tIME")
+            elif name == "modifydate":
+                selection.chunk_types.add(b"tIME")
+            else:
+                selection.keywords.add(name)
+        elif group == "xmp" and name == "all":
+            selection.xmp = True
+        elif group == "exif" and name == "all":
+            selection.chunk_types.add(b"eXIf")
+        elif group == "icc_profile" and name == "all":
+            selection.chunk_types.add(b"iCCP")
+        else:
+            return None
+    return selection
+
+
+def _copy_exact(src, dst, n: int) -> None:
+    while n:
+        chunk = src.read(min(n, COPY_BUFFER_SIZE))
+        if not chunk:
+            raise PngFormatError("Truncated PNG")
+        dst.write(chunk)
+        n -= len(chunk)
+
+
+def strip_png(src, dst, selection: PngSelection | None = None) -> int:
+    """Copy a PNG from ``src`` to ``dst`` without the selected metadata chunks.
+
+    Kept chunks, ``IDAT`` included, are copied byte for byte with their
+    original CRCs through a fixed-size buffer; nothing is decoded.  Dropped
+    chunks are skipped with ``seek``.  Returns the number of bytes dropped.
+    """
+    selection = selection or STRIP_ALL
+    if src.read(8) != PNG_SIGNATURE:
+        raise PngFormatError("Not a PNG file")
+    dst.write(PNG_SIGNATURE)
+
+    dropped = 0
+    while True:
+        header = src.read(8)
+        if not header:
+            raise PngFormatError("Missing IEND chunk")
+        if len(header) != 8:
+            raise PngFormatError("Truncated PNG")
+        length, chunk_type = struct.unpack(">I4s", header)
+        if not chunk_type.isalpha():
+            raise PngFormatError(f"Invalid chunk type {chunk_type!r}")
+
+        peek = b""
+        keyword = None
+        if chunk_type in TEXT_CHUNKS:
+            peek = src.read(min(length, KEYWORD_PEEK))
+            keyword = peek.split(b"\0", 1)[0]
+
+        remaining = length - len(peek) + 4  # data left plus CRC
+        if selection.drops(chunk_type, keyword):
+            src.seek(remaining, os.SEEK_CUR)
+            dropped += length + 12
+            continue
+
+        dst.write(header + peek)
+        _copy_exact(src, dst, remaining)
+
+        if chunk_type == b"IEND":
+            # Keep any trailing bytes as they were
+            while chunk := src.read(COPY_BUFFER_SIZE):
+                dst.write(chunk)
+            return dropped
+
+
+def strip_png_file(file_path: str, selection: PngSelection | None = None) -> int:
+    """Strip a PNG in place via a sibling temp file and an atomic rename."""
+    tmp_path = f"{file_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(file_path, "rb") as src, open(tmp_path, "wb") as dst:
+            dropped = strip_png(src, dst, selection)
+        os.replace(tmp_path, file_path)
+        return dropped
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
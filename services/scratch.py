@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+
+class ScratchQuotaExceeded(Exception):
+    pass
+
+
+def pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # another user's process
+    return True
+
+
+class ScratchSpace:
+    """Per-request scratch files, on tmpfs when they fit and on disk otherwise.
+
+    Space is reserved up front from a size hint: files that fit both the
+    per-file and total RAM quotas go under ``ram_dir`` (``/dev/shm``), larger
+    ones under ``disk_dir``, and anything past the disk quota is refused.
+    Every path handed out by a session is deleted when the session exits.
+
+    Workers share ``ram_dir`` and ``disk_dir`` but each writes under its own
+    ``<pid>`` subdirectory.  On start a worker clears its own and removes
+    those of workers that are no longer running, to drop leftovers of a crash
+    without touching files other workers are still using.
+    """
+
+    def __init__(
+        self,
+        ram_dir: str | None,
+        disk_dir: str,
+        ram_quota: int = 256 * 1024 * 1024,
+        ram_max_file: int = 32 * 1024 * 1024,
+        disk_quota: int = 4 * 1024 * 1024 * 1024,
+    ):
+        self.ram_root = ram_dir
+        self.disk_root = disk_dir
+        self._set_process_dirs()
+        self.ram_quota = ram_quota
+        self.ram_max_file = ram_max_file
+        self.disk_quota = disk_quota
+        self._lock = threading.Lock()
+        self._used = {"ram": 0, "disk": 0}
+        self._peak = {"ram": 0, "disk": 0}
+        self._files_created = {"ram": 0, "disk": 0}
+        self._rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "ScratchSpace":
+        ram_root = os.getenv("SCRATCH_RAM_DIR", "/dev/shm")
+        return cls(
+            ram_dir=os.path.join(ram_root, "metastrip") if os.path.isdir(ram_root) else None,
+            disk_dir=os.path.join(os.getenv("SCRATCH_DISK_DIR", tempfile.gettempdir()), "metastrip"),
+            ram_quota=int(os.getenv("SCRATCH_RAM_QUOTA", str(256 * 1024 * 1024))),
+            ram_max_file=int(os.getenv("SCRATCH_RAM_MAX_FILE", str(32 * 1024 * 1024))),
+            disk_quota=int(os.getenv("SCRATCH_DISK_QUOTA", str(4 * 1024 * 1024 * 1024))),
+        )
+
+    def _set_process_dirs(self) -> None:
+        pid = str(os.getpid())
+        self.ram_dir = os.path.join(self.ram_root, pid) if self.ram_root else None
+        self.disk_dir = os.path.join(self.disk_root, pid)
+
+    def start(self) -> None:
+        self._set_process_dirs()  # the app may have been imported before a fork
+        for root, directory in ((self.ram_root, self.ram_dir), (self.disk_root, self.disk_dir)):
+            if not root:
+                continue
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory, exist_ok=True)
+            with os.scandir(root) as it:
+                stale = [
+                    entry.path for entry in it
+                    if entry.is_dir(follow_symlinks=False) and entry.name.isdigit() and not pid_running(int(entry.name))
+                ]
+            for path in stale:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _reserve(self, size: int) -> str:
+        with self._lock:
+            if (
+                self.ram_dir
+                and size <= self.ram_max_file
+                and self._used["ram"] + size <= self.ram_quota
+            ):
+                tier = "ram"
+            elif self._used["disk"] + size <= self.disk_quota:
+                tier = "disk"
+            else:
+                self._rejected += 1
+                raise ScratchQuotaExceeded(f"No scratch space left for {size} bytes")
+            self._used[tier] += size
+            self._peak[tier] = max(self._peak[tier], self._used[tier])
+            self._files_created[tier] += 1
+            return tier
+
+    def _release(self, tier: str, size: int) -> None:
+        with self._lock:
+            self._used[tier] -= size
+
+    @contextmanager
+    def session(self):
+        session = ScratchSession(self)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ram_enabled": self.ram_dir is not None,
+                "ram_bytes_in_use": self._used["ram"],
+                "disk_bytes_in_use": self._used["disk"],
+                "ram_bytes_peak": self._peak["ram"],
+                "disk_bytes_peak": self._peak["disk"],
+                "ram_files_created": self._files_created["ram"],
+                "disk_files_created": self._files_created["disk"],
+                "rejected": self._rejected,
+                "ram_quota": self.ram_quota,
+                "disk_quota": self.disk_quota,
+            }
+
+
+class ScratchSession:
+    def __init__(self, space: ScratchSpace):
+        self.space = space
+        self._files: list[tuple[str, str, int]] = []
+
+    def path(self, suffix: str = "", size_hint: int = 0) -> str:
+        """Reserve room for a ``size_hint``-byte file and return a fresh path for it."""
+        tier = self.space._reserve(size_hint)
+        directory = self.space.ram_dir if tier == "ram" else self.space.disk_dir
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{uuid.uuid4().hex}{suffix}")
+        self._files.append((path, tier, size_hint))
+        return path
+
+    def close(self) -> None:
+        for path, tier, size in self._files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"⚠️ Failed to delete scratch file {path}: {e}")
+            self.space._release(tier, size)
+        self._files.clear()
@@ -0,0 +1,82 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from services.metrics import REGISTRY
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "metastrip_stage_seconds", "Time spent per processing stage across all requests", ("stage",)
+)
+
+_current: ContextVar["SpanRecorder | None"] = ContextVar("spans", default=None)
+
+
+class SpanRecorder:
+    """Stage timings collected during one request.
+
+    Spans run in worker threads as well as on the event loop, so several
+    spans of one stage may overlap; their durations are summed and counted.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._spans: list[tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self._spans.append((name, seconds))  # list.append is atomic
+
+    def totals(self) -> dict[str, tuple[float, int]]:
+        totals = {}
+        for name, seconds in list(self._spans):
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + seconds, count + 1)
+        return totals
+
+    def snapshot(self) -> dict[str, float]:
+        """Milliseconds per stage, for including in a JSON response."""
+        return {name: round(total * 1000, 3) for name, (total, _) in self.totals().items()}
+
+    def server_timing(self, total_seconds: float) -> str:
+        entries = [
+            f'{name};dur={total * 1000:.3f}' + (f';desc="x{count}"' if count > 1 else "")
+            for name, (total, count) in self.totals().items()
+        ]
+        entries.append(f"total;dur={total_seconds * 1000:.3f}")
+        return ", ".join(entries)
+
+
+def start_request() -> SpanRecorder:
+    recorder = SpanRecorder()
+    _current.set(recorder)
+    return recorder
+
+
+def detach() -> None:
+    _current.set(None)
+
+
+def current() -> SpanRecorder | None:
+    return _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, (name,))
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.add(name, seconds)
+
+
+def since_request_start(name: str) -> None:
+    """Record the time from the start of the request until now as ``name``."""
+    recorder = _current.get()
+    if recorder is not None:
+        record(name, time.perf_counter() - recorder.started)
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
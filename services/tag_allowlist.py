@@ -0,0 +1,54 @@
+import json
+
+# Upload groups where every tag of these family-0 groups is selectable,
+# on top of the tags meta.json lists.
+WHOLE_GROUPS = {
+    "JPEG/HEIC/TIFF": ("EXIF",),
+}
+
+
+class GroupMatcher:
+    """The selectable tags of one upload group, compiled once from meta.json.
+
+    ``arguments`` are the exiftool tag filters that extract just these tags,
+    so a selectable-only read skips decoding everything else.
+    """
+
+    def __init__(self, tags, whole_groups=()):
+        self.tags = frozenset(tags)
+        self.whole_groups = frozenset(whole_groups)
+        self.arguments = tuple(
+            f"-{tag}".encode("utf-8")
+            for tag in [*sorted(self.tags), *(f"{group}:all" for group in sorted(self.whole_groups))]
+        )
+
+    def matches(self, key: str) -> bool:
+        return key in self.tags or key.partition(":")[0] in self.whole_groups
+
+    def select(self, metadata: dict) -> dict:
+        """Subset of `metadata` (keyed `Group:Tag`) that is selectable, in exiftool's order."""
+        if not self.whole_groups:
+            return {key: value for key, value in metadata.items() if key in self.tags}
+        return {key: value for key, value in metadata.items() if self.matches(key)}
+
+
+class TagAllowlist:
+    """meta.json as frozen per-group matchers."""
+
+    def __init__(self, mapping: dict[str, list[str]]):
+        self._matchers = {
+            group: GroupMatcher(tags, WHOLE_GROUPS.get(group, ()))
+            for group, tags in mapping.items()
+        }
+
+    @classmethod
+    def load(cls, path: str = "meta.json") -> "TagAllowlist":
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def matcher(self, group: str | None) -> GroupMatcher | None:
+        return self._matchers.get(group)
+
+    def selectable(self, metadata: dict, group: str | None) -> dict:
+        matcher = self._matchers.get(group)
+        return matcher.select(metadata) if matcher else {}
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+from services.exiftool_pool import ExifToolPool
+
+# Family-0 groups that `exiftool -all=` strips for each upload group.  Only
+# deletable tags inside these groups are reported; structural groups
+# (File, Composite, ExifTool, ...) never are, except for DELETABLE_FILE_TAGS.
+DELETABLE_GROUPS = {
+    "JPEG/HEIC/TIFF": {
+        "EXIF", "IPTC", "XMP", "Photoshop", "ICC_Profile", "MakerNotes",
+        "JFIF", "Ducky", "FlashPix", "MPF", "APP1", "APP2", "APP4", "APP5",
+        "APP6", "APP7", "APP8", "APP9", "APP10", "APP11", "APP12", "APP13",
+        "APP14", "APP15",
+    },
+    "PNG": {"PNG", "XMP", "EXIF", "ICC_Profile"},
+    "PDF": {"PDF", "XMP"},
+    "DOCX/XLSX": {"XMP"},
+    "MP4/MOV": {"QuickTime", "XMP", "EXIF", "MakerNotes"},
+    "MP3": {"XMP"},
+}
+
+# File-group tags that are metadata all the same: a JPEG's COM segment
+DELETABLE_FILE_TAGS = {"JPEG/HEIC/TIFF": {"comment"}}
+
+# Groups `-all=` drops as one block, so each of their tags goes with it
+BLOCK_GROUPS = {"ICC_Profile"}
+
+# `-listx -f` flags of writable tags that `-all=` can't remove: Permanent
+# ones (QuickTime mvhd/tkhd/mdhd dates, ...) and Protected/Unsafe ones that
+# are only rewritten with the structure they belong to
+KEPT_FLAGS = {"Permanent", "Protected", "Unsafe"}
+
+# Bumped when _build changes what it keeps, so older caches are rebuilt
+CACHE_FORMAT = 2
+
+
+class TagIndex:
+    """Deletable-tag lookup built once from ExifTool's tag tables.
+
+    The table dump with tag flags (`exiftool -listx -f`) is parsed on first
+    use and cached on disk next to the exiftool version that produced it, so
+    later startups only read a small JSON file.
+    """
+
+    def __init__(self, pool: ExifToolPool, cache_path: str):
+        self.pool = pool
+        self.cache_path = cache_path
+        self._writable: dict[str, frozenset[str]] | None = None
+        self._all_writable: frozenset[str] = frozenset()
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            if self._writable is not None:
+                return
+
+            with self.pool.checkout() as et:
+                version = et.version
+                cached = self._read_cache(version)
+                if cached is None:
+                    cached = self._build(et.execute("-listx", "-f"))
+                    self._write_cache(version, cached)
+
+            self._writable = {group: frozenset(tags) for group, tags in cached.items()}
+            self._all_writable = frozenset().union(*self._writable.values())
+
+    def _read_cache(self, version: str):
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != version or data.get("format") != CACHE_FORMAT:
+            return None
+        return data["writable"]
+
+    def _write_cache(self, version: str, writable: dict) -> None:
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": version, "format": CACHE_FORMAT, "writable": writable}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    @staticmethod
+    def _build(listx: str) -> dict[str, list[str]]:
+        """Map lower-cased family 0 and 1 group names to the names of tags `-all=` can delete."""
+        writable: dict[str, set[str]] = {}
+        root = ET.fromstring(listx)
+        for table in root.iter("table"):
+            table_groups = (table.get("g0"), table.get("g1"))
+            for tag in table.iter("tag"):
+                if tag.get("writable") != "true":
+                    continue
+                if KEPT_FLAGS.intersection((tag.get("flags") or "").split(",")):
+                    continue
+                name = tag.get("name", "").lower()
+                groups = (tag.get("g0") or table_groups[0], tag.get("g1") or table_groups[1])
+                for group in groups:
+                    if group:
+                        writable.setdefault(group.lower(), set()).add(name)
+        return {group: sorted(tags) for group, tags in writable.items()}
+
+    def _ensure_loaded(self) -> dict[str, frozenset[str]]:
+        if self._writable is None:
+            self.load()
+        return self._writable
+
+    def is_writable(self, tag: str) -> bool:
+        """True for `Group:Tag`, `Group:all`, `all` or a bare writable tag name."""
+        writable = self._ensure_loaded()
+        group, _, name = tag.rpartition(":")
+        group, name = group.lower(), name.lower()
+        if name == "all":
+            return not group or group in writable or group in {g.lower() for g in BLOCK_GROUPS}
+        if not group:
+            return name in self._all_writable
+        return name in writable.get(group, ())
+
+    def unknown_tags(self, tags: list[str]) -> list[str]:
+        return [tag for tag in tags if not self.is_writable(tag)]
+
+    def deletable(self, metadata: dict, group: str | None) -> dict:
+        """Subset of `metadata` (keyed `Group:Tag`) that `-all=` would remove."""
+        deletable_groups = DELETABLE_GROUPS.get(group)
+        if not deletable_groups:
+            return {}
+        file_tags = DELETABLE_FILE_TAGS.get(group, ())
+        writable = self._ensure_loaded()
+        result = {}
+        for key, value in metadata.items():
+            tag_group, _, name = key.partition(":")
+            name = name.lower()
+            if tag_group == "File":
+                deletable = name in file_tags
+            elif tag_group in BLOCK_GROUPS:
+                deletable = tag_group in deletable_groups
+            else:
+                deletable = tag_group in deletable_groups and name in writable.get(tag_group.lower(), ())
+            if deletable:
+                result[key] = value
+        return result
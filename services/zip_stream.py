@@ -0,0 +1,56 @@
+import os
+import zipfile
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Formats that are already compressed; deflating them again only burns CPU.
+PRECOMPRESSED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".heic", ".png", ".gif", ".webp",
+    ".mp4", ".mov", ".mp3",
+    ".docx", ".xlsx", ".zip",
+}
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object that collects what zipfile writes."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of ``(path, arcname)`` entries as it is built.
+
+    Bytes go out as soon as each chunk is compressed, so the first response
+    bytes don't wait for the whole archive.  Already-compressed formats are
+    stored; only the rest go through deflate.  A path that no longer exists
+    raises, cutting the response short rather than sending an archive
+    without it.  This is a plain generator, so Starlette runs it in its
+    threadpool and the deflate work stays off the event loop.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w") as zf:
+        for path, arcname in entries:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            if os.path.splitext(path)[1].lower() in PRECOMPRESSED_EXTENSIONS:
+                zinfo.compress_type = zipfile.ZIP_STORED
+            else:
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+
+            with open(path, "rb") as src, zf.open(zinfo, "w") as dst:
+                while chunk := src.read(STREAM_CHUNK_SIZE):
+                    dst.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
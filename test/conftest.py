@@ -0,0 +1,26 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Ad-hoc scripts that run against local files at import time
+collect_ignore = ["test_deletable.py", "test_docx.py", "test_excel.py"]
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """app.py imported from a scratch working directory, so uploads/ stays out of the tree."""
+    workdir = tmp_path_factory.mktemp("app")
+    shutil.copy(os.path.join(ROOT, "meta.json"), workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import app
+        app.blob_store.start()
+        yield app
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,59 @@
+import io
+import os
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from services.batch_manifests import BatchManifests
+
+
+def test_manifest_survives_a_new_instance(tmp_path):
+    (tmp_path / "a_1.txt").write_bytes(b"a")
+    zip_name, path = BatchManifests(str(tmp_path / ".batches")).create("cleaned", ["a_1.txt", "gone.txt"], str(tmp_path))
+
+    reloaded = BatchManifests(str(tmp_path / ".batches"))
+    entries = reloaded.load(zip_name)
+    assert [entry["id"] for entry in entries] == ["a_1.txt"]
+    assert reloaded.unavailable(entries, str(tmp_path)) == []
+    assert [p for p, _, _ in reloaded.entries()] == [path]
+    assert reloaded.load("../a_1.txt") is None
+
+
+def test_download_reports_expired_and_changed_files(app_module):
+    client = TestClient(app_module.app)
+    file_ids = []
+    for name, data in (("one.txt", b"first"), ("two.txt", b"second")):
+        file_id, _, _ = app_module.save_upload_stream(io.BytesIO(data), name)
+        file_ids.append(file_id)
+    zip_name = app_module.create_zip_file(file_ids, "cleaned_files")
+
+    response = client.get(f"/download/cleaned/{zip_name}")
+    assert response.status_code == 200
+    assert len(zipfile.ZipFile(io.BytesIO(response.content)).namelist()) == 2
+
+    with open(os.path.join(app_module.TEMP_DIR, file_ids[1]), "ab") as f:
+        f.write(b" cleaned again")
+    response = client.get(f"/download/cleaned/{zip_name}")
+    assert response.status_code == 410
+    assert file_ids[1] in response.json()["detail"]
+
+    app_module.blob_store.remove(os.path.join(app_module.TEMP_DIR, file_ids[0]))
+    response = client.get(f"/download/cleaned/{zip_name}")
+    assert response.status_code == 410
+    assert file_ids[0] in response.json()["detail"]
+
+
+def test_batch_clean_streams_results_and_download_url(app_module):
+    client = TestClient(app_module.app)
+    file_ids = [app_module.save_upload_stream(io.BytesIO(b"x" * 2000), "big.txt")[0], "missing.txt"]
+
+    response = client.post("/clean/batch/v2/", json={file_id: ["all"] for file_id in file_ids},
+                           headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["file"] for result in body["results"]] == file_ids
+    assert body["results"][1]["error"] == "File not found"
+    assert body["download_url"].startswith("/download/cleaned/")
+
+    response = client.get(f"/clean/{file_ids[0]}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-type"].startswith("application/json")
@@ -0,0 +1,48 @@
+import os
+
+from services.blob_store import BlobStore
+
+
+def write(data):
+    def writer(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return writer
+
+
+def workers(tmp_path, n=2):
+    stores = [BlobStore(str(tmp_path), str(tmp_path / ".blobs")) for _ in range(n)]
+    for store in stores:
+        store.start()
+    return stores
+
+
+def test_workers_share_blob_counts(tmp_path):
+    first, second = workers(tmp_path)
+    a, blob, _ = first.put("a.bin", "1" * 64, ".bin", write(b"same"))
+    b, _, _ = second.put("b.bin", "1" * 64, ".bin", write(b"other"))
+
+    assert second.dedup_hits == 1
+    assert open(b, "rb").read() == b"same"
+    first.remove(a)
+    assert os.path.exists(first.blob_path(blob))  # still linked from b.bin
+    second.remove(b)
+    assert not os.path.exists(first.blob_path(blob))
+    assert first.stats()["blobs"] == second.stats()["blobs"] == 0
+
+
+def test_compaction_keeps_other_workers_refs(tmp_path):
+    first, second = workers(tmp_path)
+    kept, _, _ = second.put("kept.bin", "2" * 64, ".bin", write(b"kept"))
+    first.COMPACT_MIN_RECORDS = 5
+    for i in range(20):
+        path, _, _ = first.put(f"{i}.bin", f"{i:064x}", ".bin", write(b"z"))
+        first.remove(path)
+    with open(first.journal_path) as f:
+        assert len(f.readlines()) <= 5
+    second.put("late.bin", "3" * 64, ".bin", write(b"late"))  # appended to the compacted journal
+
+    for store in (first, second, *workers(tmp_path, 1)):
+        assert store.stats()["refs"] == 2
+        assert [os.path.basename(p) for p, *_ in store.entries()] == ["kept.bin", "late.bin"]
+    assert os.path.exists(kept)
@@ -0,0 +1,68 @@
+import json
+
+import exiftool
+import pytest
+
+from services import exiftool_pool
+from services.exiftool_pool import ExifToolPool
+
+
+class FakeExifTool:
+    def __init__(self):
+        self.running = False
+
+    def run(self):
+        self.running = True
+
+    def terminate(self):
+        self.running = False
+
+    def execute(self, *params):
+        return "not json"
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(exiftool_pool.exiftool, "ExifTool", FakeExifTool)
+    pool = ExifToolPool(size=1)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def worker(pool):
+    with pool.checkout() as et:
+        return et
+
+
+@pytest.mark.parametrize("error", [
+    json.JSONDecodeError("Expecting value", "not json", 0),
+    exiftool.exceptions.ExifToolExecuteError(1, b"", b"", b"Error"),
+    FileNotFoundError("photo.jpg"),
+    KeyboardInterrupt(),
+])
+def test_caller_errors_keep_the_worker(pool, error):
+    first = worker(pool)
+    with pytest.raises(type(error)):
+        with pool.checkout() as et:
+            et.execute(b"-j")
+            raise error
+
+    assert worker(pool) is first and first.running
+
+
+@pytest.mark.parametrize("error", [BrokenPipeError(), TimeoutError()])
+def test_pipe_failures_retire_the_worker(pool, error):
+    first = worker(pool)
+    with pytest.raises(type(error)):
+        with pool.checkout():
+            raise error
+
+    assert worker(pool) is not first and not first.running
+
+
+def test_dead_worker_is_replaced(pool):
+    with pool.checkout() as et:
+        et.running = False
+
+    assert worker(pool) is not et
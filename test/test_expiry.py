@@ -0,0 +1,91 @@
+import os
+import time
+
+from services.blob_store import BlobStore
+from services.expiry import ExpiryIndex
+
+
+def write(data):
+    def writer(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return writer
+
+
+def store(tmp_path):
+    blobs = BlobStore(str(tmp_path), str(tmp_path / ".blobs"))
+    blobs.start()
+    index = ExpiryIndex(str(tmp_path), max_age=60, high_water=10**9, remove=blobs.remove)
+    return blobs, index
+
+
+def put(blobs, index, file_id, data, created_at=None):
+    path, blob, blob_size = blobs.put(file_id, f"{len(data):064x}", ".bin", write(data))
+    index.track(path, 0, created_at=created_at, blob=blob, blob_size=blob_size)
+    return path
+
+
+def test_shared_blob_is_counted_once_until_its_last_ref(tmp_path):
+    blobs, index = store(tmp_path)
+    first = put(blobs, index, "a.bin", b"x" * 100, created_at=time.time() - 120)
+    second = put(blobs, index, "b.bin", b"x" * 100)
+    assert index.total_bytes == 100
+
+    assert index.sweep() == 1
+    assert not os.path.exists(first)
+    assert index.total_bytes == 100  # the blob is still on disk for b.bin
+
+    index.rebuild([(second, time.time() - 120, *blobs.usage(second))])
+    assert index.total_bytes == 100
+    assert index.sweep() == 1
+    assert index.total_bytes == 0
+    assert blobs.stats()["blobs"] == 0
+
+
+def test_cleaned_copy_is_counted_next_to_its_blob(tmp_path):
+    blobs, index = store(tmp_path)
+    path = put(blobs, index, "a.bin", b"x" * 100)
+    put(blobs, index, "b.bin", b"x" * 100)
+
+    # A cleaner writes a new file and renames it over the ref
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(b"y" * 40)
+    os.replace(f"{path}.tmp", path)
+    index.update(path, *blobs.usage(path))
+    assert index.total_bytes == 140
+
+    index.rebuild(blobs.entries())
+    assert index.total_bytes == 140
+
+
+def test_journal_is_compacted_as_refs_come_and_go(tmp_path):
+    blobs, _ = store(tmp_path)
+    blobs.COMPACT_MIN_RECORDS = 10
+    for i in range(50):
+        path, _, _ = blobs.put(f"{i}.bin", f"{i:064x}", ".bin", write(b"z"))
+        blobs.remove(path)
+
+    with open(blobs.journal_path) as f:
+        assert len(f.readlines()) <= 10
+    blobs.stop()
+    restarted = BlobStore(blobs.ref_dir, blobs.blob_dir)
+    restarted.start()
+    assert restarted.stats()["refs"] == 0
+
+
+def test_reconcile_removes_only_untracked_files(tmp_path):
+    blobs, index = store(tmp_path)
+    tracked = put(blobs, index, "a.bin", b"x" * 100)
+    orphans = [tmp_path / "b.bin.1234abcd.tmp", tmp_path / ".blobs" / "ab" / "cd" / "abcd.bin.5678ef01.tmp"]
+    for orphan in orphans:
+        orphan.parent.mkdir(parents=True, exist_ok=True)
+        orphan.write_bytes(b"left by a crash")
+
+    assert index.reconcile() == 0  # nothing has been untouched for max_age yet
+
+    index.max_age = 0
+    keep = blobs.live_paths()
+    assert index.reconcile(keep) == 2
+    assert not any(orphan.exists() for orphan in orphans)
+    assert os.path.exists(tracked) and all(os.path.exists(path) for path in keep)
+    assert len(keep) == 3  # journal, lock and a.bin's blob
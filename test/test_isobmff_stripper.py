@@ -0,0 +1,211 @@
+import io
+import os
+import struct
+
+import pytest
+
+from conftest import ROOT
+from services import isobmff_stripper as S
+from services.isobmff import IsobmffFormatError
+
+HEIC_PATH = os.path.join(ROOT, "Img", "IMG1.HEIC")
+
+
+def box(box_type, body):
+    return struct.pack(">I4s", 8 + len(body), box_type) + body
+
+
+def full_box(box_type, body, version=0):
+    return box(box_type, bytes([version, 0, 0, 0]) + body)
+
+
+def movie(co64=False, mov=False, fragmented=False):
+    """A small MP4/MOV with user data, Keys and XMP around three samples; returns (bytes, samples)."""
+    samples = [bytes([i]) * 100 for i in range(1, 4)]
+    ftyp = box(b"ftyp", (b"qt  " if mov else b"isom") + bytes(4) + b"isom")
+    xmp = box(b"uuid", S.XMP_UUID + b"<x:xmpmeta>secret xmp</x:xmpmeta>")
+
+    def moov(offsets):
+        if co64:
+            table = full_box(b"co64", struct.pack(">I", 3) + b"".join(struct.pack(">Q", o) for o in offsets))
+        else:
+            table = full_box(b"stco", struct.pack(">I", 3) + b"".join(struct.pack(">I", o) for o in offsets))
+        stbl = box(b"stbl", full_box(b"stsd", struct.pack(">I", 0)) + table)
+        trak = box(b"trak", full_box(b"tkhd", bytes(80)) + box(b"mdia", box(b"minf", stbl))
+                   + box(b"udta", box(b"name", b"secret track")))
+        udta = box(b"\xa9xyz", b"+12.3-045.6/") + (box(b"XMP_", b"<secret xmp/>") + bytes(4) if mov else b"")
+        return box(b"moov", full_box(b"mvhd", bytes(96)) + trak + box(b"udta", udta)
+                   + full_box(b"meta", box(b"keys", b"secret keys")))
+
+    start = len(ftyp) + len(xmp) + len(moov([0, 0, 0])) + 8
+    data = ftyp + xmp + moov([start, start + 100, start + 200]) + box(b"mdat", b"".join(samples))
+    if fragmented:
+        data += box(b"moof", full_box(b"mfhd", struct.pack(">I", 1))) + box(b"mdat", b"fragment")
+    return data, samples
+
+
+def still_image(iinf=None, iloc=None, ipma=None):
+    """A HEIF with an image item and an Exif item in mdat; any item table can be replaced."""
+    ftyp = box(b"ftyp", b"heic" + bytes(4) + b"mif1heic")
+    infe = [full_box(b"infe", struct.pack(">HH4s", item_id, 0, item_type) + b"\0", version=2)
+            for item_id, item_type in ((1, b"hvc1"), (2, b"Exif"))]
+    iinf = iinf or full_box(b"iinf", struct.pack(">H", 2) + b"".join(infe))
+    ipma = ipma or full_box(b"ipma", struct.pack(">IHBBHBB", 2, 1, 1, 0x81, 2, 1, 0x81))
+    samples = [b"image tile", b"Exif\0\0secret exif"]
+
+    def meta(offsets):
+        entries = b"".join(
+            struct.pack(">HHHII", item_id, 0, 1, offset, len(sample))
+            for item_id, offset, sample in zip((1, 2), offsets, samples)
+        )
+        table = iloc or full_box(b"iloc", bytes([0x44, 0]) + struct.pack(">H", 2) + entries)
+        return full_box(b"meta", full_box(b"pitm", struct.pack(">H", 1)) + iinf + table
+                        + box(b"iprp", box(b"ipco", box(b"colr", b"nclx")) + ipma))
+
+    start = len(ftyp) + len(meta([0, 0])) + 8
+    return ftyp + meta([start, start + len(samples[0])]) + box(b"mdat", b"".join(samples))
+
+
+def sample_offsets(data):
+    f = io.BytesIO(data)
+    offsets = []
+
+    def walk(start, end):
+        for offset, box_type, header_size, size in S.children(f, start, end):
+            if box_type in S.SAMPLE_TABLE_PATH:
+                walk(offset + header_size, offset + size)
+            elif box_type in (b"stco", b"co64"):
+                entry_size = 4 if box_type == b"stco" else 8
+                count = S._uint(data, offset + header_size + 4, 4)
+                first = offset + header_size + 8
+                offsets.extend(S._uint(data, first + i * entry_size, entry_size) for i in range(count))
+
+    walk(0, len(data))
+    return offsets
+
+
+def heif_items(data):
+    """{item_id: item bytes} and the ids of Exif/XMP items."""
+    f = io.BytesIO(data)
+    meta = next((o, h, s) for o, t, h, s in S.children(f, 0, len(data)) if t == b"meta")
+    offset, header_size, size = meta
+    boxes = {
+        box_type: data[offset + child + child_header:offset + child + child_size]
+        for child, box_type, child_header, child_size in S.children(
+            io.BytesIO(data[offset:offset + size]), header_size + 4, size
+        )
+    }
+    locations = S.ItemLocations(boxes[b"iloc"])
+    items = {}
+    for item_id, (method, _, base_offset, extents) in locations.items.items():
+        source = data if method == 0 else boxes.get(b"idat", b"")
+        items[item_id] = b"".join(source[base_offset + o:base_offset + o + n] for _, o, n in extents)
+    return items, S.metadata_items(boxes[b"iinf"], S.STRIP_ALL)
+
+
+def assert_heic_cleaned(original, cleaned):
+    before, metadata_ids = heif_items(original)
+    after, left = heif_items(cleaned)
+    assert metadata_ids and not left
+    assert set(after) == set(before) - metadata_ids
+    assert all(after[item_id] == before[item_id] for item_id in after)  # image tiles untouched
+    for item_id in metadata_ids:
+        assert before[item_id][16:48] not in cleaned
+
+    try:
+        import pillow_heif
+    except ImportError:
+        return
+    pillow_heif.open_heif(io.BytesIO(cleaned)).to_pillow().load()
+
+
+@pytest.fixture
+def heic():
+    with open(HEIC_PATH, "rb") as f:
+        return f.read()
+
+
+def test_heic_copy(heic):
+    dst = io.BytesIO()
+    dropped = S.strip_isobmff(io.BytesIO(heic), dst)
+
+    assert dropped == len(heic) - len(dst.getvalue()) > 0
+    assert_heic_cleaned(heic, dst.getvalue())
+
+
+def test_heic_file_is_replaced_not_written(heic, tmp_path):
+    path = tmp_path / "photo.heic"
+    path.write_bytes(heic)
+
+    with open(path, "rb") as reader:  # a download in progress
+        S.strip_isobmff_file(str(path))
+        assert reader.read() == heic
+
+    assert_heic_cleaned(heic, path.read_bytes())
+    once = path.read_bytes()
+    inode = os.stat(path).st_ino
+    assert S.strip_isobmff_file(str(path)) == 0
+    assert path.read_bytes() == once and os.stat(path).st_ino == inode
+
+
+def test_linked_heic_is_copied(heic, tmp_path):
+    path = tmp_path / "photo.heic"
+    path.write_bytes(heic)
+    os.link(path, tmp_path / "other.heic")
+
+    S.strip_isobmff_file(str(path))
+
+    assert (tmp_path / "other.heic").read_bytes() == heic
+    assert_heic_cleaned(heic, path.read_bytes())
+
+
+@pytest.mark.parametrize("co64", [False, True])
+@pytest.mark.parametrize("mov", [False, True])
+def test_movie_copy_and_in_place(tmp_path, co64, mov):
+    data, samples = movie(co64, mov)
+    dst = io.BytesIO()
+    S.strip_isobmff(io.BytesIO(data), dst)
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(data)
+    S.strip_isobmff_file(str(path))
+
+    for cleaned in (dst.getvalue(), path.read_bytes()):
+        assert b"secret" not in cleaned and b"+12.3" not in cleaned
+        assert [cleaned[o:o + 100] for o in sample_offsets(cleaned)] == samples
+
+
+def test_fragmented_movie_is_blanked_in_a_copy(tmp_path):
+    data, _ = movie(fragmented=True)
+    with pytest.raises(IsobmffFormatError):
+        S.strip_isobmff(io.BytesIO(data), io.BytesIO())
+
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(data)
+    os.link(path, tmp_path / "blob.mp4")
+    S.strip_isobmff_file(str(path))
+    cleaned = path.read_bytes()
+    assert len(cleaned) == len(data) and b"secret" not in cleaned
+    assert cleaned.endswith(box(b"moof", full_box(b"mfhd", struct.pack(">I", 1))) + box(b"mdat", b"fragment"))
+    assert (tmp_path / "blob.mp4").read_bytes() == data
+
+
+@pytest.mark.parametrize("tables", [
+    {"iinf": box(b"iinf", b"")},
+    {"iinf": full_box(b"iinf", struct.pack(">H", 1) + box(b"infe", b""))},
+    {"iloc": full_box(b"iloc", bytes([0x44]))},
+    {"iloc": full_box(b"iloc", bytes([0x44, 0]) + struct.pack(">HHH", 2, 1, 0))},
+    {"ipma": full_box(b"ipma", struct.pack(">IHB", 2, 1, 3))},
+])
+def test_truncated_item_tables_are_format_errors(tmp_path, tables):
+    cleaned = io.BytesIO()
+    S.strip_isobmff(io.BytesIO(still_image()), cleaned)
+    assert b"secret" not in cleaned.getvalue() and b"image tile" in cleaned.getvalue()
+
+    data = still_image(**tables)
+    with pytest.raises(IsobmffFormatError):
+        S.strip_isobmff(io.BytesIO(data), io.BytesIO())
+    path = tmp_path / "photo.heic"
+    path.write_bytes(data)
+    with pytest.raises(IsobmffFormatError):
+        S.strip_isobmff_file(str(path))
+    assert path.read_bytes() == data
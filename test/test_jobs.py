@@ -0,0 +1,42 @@
+import asyncio
+
+from services import jobs
+from services.jobs import JobManager
+
+
+def test_stalled_event_reader_does_not_block_the_job(monkeypatch):
+    monkeypatch.setattr(jobs, "SSE_KEEPALIVE_SECONDS", 0.01)
+
+    async def process_chunk(chunk):
+        await asyncio.sleep(0.02)
+        return {key: {"file": key} for key in chunk}
+
+    async def scenario():
+        manager = JobManager()
+        job = manager.submit({f"f{i}": None for i in range(4)}, process_chunk, chunk_size=1)
+        events = job.events()
+        await anext(events)  # queued
+        while (await anext(events)).startswith("event:"):
+            pass  # read up to a keepalive, then stop reading
+        await asyncio.sleep(0.5)
+        finished = job.status, len(job.results)
+        await events.aclose()
+        return finished
+
+    assert asyncio.run(scenario()) == ("done", 4)
+
+
+def test_finalize_is_awaited():
+    async def process_chunk(chunk):
+        return {key: {"file": key} for key in chunk}
+
+    async def finalize(job):
+        await asyncio.sleep(0)
+        return f"/download/cleaned/{len(job.file_ids)}.zip"
+
+    async def scenario():
+        job = JobManager().submit({"a": None, "b": None}, process_chunk, finalize=finalize)
+        await job.task
+        return job.status, job.download_url
+
+    assert asyncio.run(scenario()) == ("done", "/download/cleaned/2.zip")
@@ -0,0 +1,98 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from conftest import ROOT
+from services.jpeg_stripper import JpegFormatError, strip_jpeg, strip_jpeg_file
+
+
+def exif_with_make(make="SecretMake"):
+    exif = Image.Exif()
+    exif[0x010F] = make
+    return exif
+
+
+def mpo_bytes(progressive=False):
+    """A two-image MPO whose images both carry EXIF."""
+    first = Image.new("RGB", (64, 48), "red")
+    second = Image.new("RGB", (64, 48), "blue")
+    second.encoderinfo = {"exif": exif_with_make(), "progressive": progressive}
+    buffer = io.BytesIO()
+    first.save(
+        buffer, "MPO", save_all=True, append_images=[second], exif=exif_with_make(), progressive=progressive
+    )
+    return buffer.getvalue()
+
+
+def strip(data, families=None):
+    dst = io.BytesIO()
+    dropped = strip_jpeg(io.BytesIO(data), dst, families)
+    return dst.getvalue(), dropped
+
+
+def decode(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def test_strip_all_removes_metadata_and_keeps_image():
+    with open(os.path.join(ROOT, "Img", "aurora.jpg"), "rb") as f:
+        data = f.read()
+    assert decode(data).info.get("icc_profile")
+
+    cleaned, dropped = strip(data)
+
+    assert dropped == len(data) - len(cleaned) > 0
+    assert not decode(cleaned).info.get("icc_profile")
+    assert b"ICC_PROFILE\0" not in cleaned
+    assert decode(cleaned).size == decode(data).size
+
+
+@pytest.mark.parametrize("progressive", [False, True])
+def test_strip_all_drops_mpo_secondary_images(progressive):
+    data = mpo_bytes(progressive)
+    assert data.count(b"SecretMake") == 2
+
+    cleaned, dropped = strip(data)
+
+    assert b"SecretMake" not in cleaned
+    assert b"MPF\0" not in cleaned
+    assert dropped == len(data) - len(cleaned)
+    image = decode(cleaned)
+    assert image.format == "JPEG"
+    assert image.getpixel((10, 10))[0] > 200  # the red primary image
+
+
+def test_strip_all_drops_data_after_eoi():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "green").save(buffer, "JPEG")
+    trailer = b"PK\x03\x04secret archive" + b"\xff\xd9more"
+    data = buffer.getvalue() + trailer
+
+    cleaned, dropped = strip(data)
+    assert cleaned.endswith(b"\xff\xd9") and b"secret" not in cleaned
+    assert dropped == len(data) - len(cleaned) >= len(trailer)
+    decode(cleaned)
+
+    kept, _ = strip(data, {"EXIF"})  # a selective strip leaves the rest of the file alone
+    assert kept.endswith(trailer)
+
+
+def test_kept_mpf_falls_back():
+    with pytest.raises(JpegFormatError):
+        strip(mpo_bytes(), {"EXIF"})
+
+
+def test_strip_file_in_place(tmp_path):
+    path = tmp_path / "photo.mpo"
+    path.write_bytes(mpo_bytes())
+
+    strip_jpeg_file(str(path))
+
+    cleaned = path.read_bytes()
+    assert b"SecretMake" not in cleaned
+    decode(cleaned)
+    assert [p.name for p in tmp_path.iterdir()] == ["photo.mpo"]
@@ -0,0 +1,165 @@
+import contextlib
+import io
+import json
+import os
+import time
+
+from services.metadata_cache import PATH_TAGS, MetadataCache, path_tags
+
+
+def fake_exiftool_output(file_path):
+    """What `exiftool -G -j` reports for a small JPEG stored at `file_path`."""
+    return {
+        "SourceFile": file_path,
+        "ExifTool:ExifToolVersion": 12.76,
+        "File:FileName": os.path.basename(file_path),
+        "File:Directory": os.path.dirname(file_path),
+        "File:FileSize": "4 bytes",
+        "File:FileModifyDate": "2025:01:01 00:00:00+00:00",
+        "File:FilePermissions": 100644,
+        "EXIF:Make": "SecretMake",
+    }
+
+
+def test_entries_are_stored_without_path_tags(tmp_path):
+    first = tmp_path / "a_11111111.jpg"
+    second = tmp_path / "b_22222222.jpg"
+    first.write_bytes(b"same")
+    second.write_bytes(b"same")
+    disk_dir = tmp_path / "cache"
+    cache = MetadataCache(disk_dir=str(disk_dir))
+
+    metadata = fake_exiftool_output(str(first))
+    computed = cache.get_or_compute("0" * 64, ".jpg", lambda: (metadata, {}, {"EXIF:Make": "SecretMake"}))
+    assert computed[0]["SourceFile"] == str(first)
+
+    for reader in (cache, MetadataCache(disk_dir=str(disk_dir))):  # memory tier, then after a restart
+        served = reader.get_or_compute("0" * 64, ".jpg", lambda: None, file_path=str(second))
+        assert served[0]["SourceFile"] == str(second)
+        assert served[0]["File:FileName"] == "b_22222222.jpg"
+        assert served[0]["File:Directory"] == str(tmp_path)
+        assert served[0]["EXIF:Make"] == "SecretMake"
+        assert list(served[0]) == list(metadata)
+        assert "a_11111111" not in json.dumps(served)
+
+    stored = next(disk_dir.rglob("*.json")).read_text()
+    assert "a_11111111" not in stored
+
+
+def test_path_tags_are_dropped_without_a_path():
+    cache = MetadataCache()
+    cache.put("key.jpg", (fake_exiftool_output("uploads/a_11111111.jpg"), {}, {}))
+
+    metadata = cache.get("key.jpg")[0]
+    assert not any(tag in metadata for tag in PATH_TAGS)
+    assert metadata["File:FileSize"] == "4 bytes"
+
+
+def test_identical_uploads_get_their_own_path_tags(app_module, monkeypatch):
+    calls = []
+
+    def view_metadata(file_path, suffix, full_scan=False):
+        calls.append(file_path)
+        return fake_exiftool_output(file_path), {}, {}
+
+    monkeypatch.setattr(app_module, "view_metadata", view_metadata)
+    views = {}
+    for name in ("a.jpg", "b.jpg"):
+        file_id, sha256, _ = app_module.save_upload_stream(io.BytesIO(b"identical bytes"), name)
+        file_path = os.path.join(app_module.TEMP_DIR, file_id)
+        views[file_id] = app_module.cached_view_metadata(file_path, ".jpg", sha256=sha256)[0]
+
+    assert len(calls) == 1
+    (first_id, first), (second_id, second) = views.items()
+    assert second["SourceFile"] == os.path.join(app_module.TEMP_DIR, second_id)
+    assert second["File:FileName"] == second_id
+    assert first_id not in json.dumps(second)
+
+
+def test_deduplicated_uploads_in_a_batch_view(app_module, monkeypatch):
+    def view_metadata_batch(file_paths, suffixes):
+        return {path: (fake_exiftool_output(path), {}, {}) for path in file_paths}
+
+    monkeypatch.setattr(app_module, "view_metadata_batch", view_metadata_batch)
+    file_ids = [
+        app_module.save_upload_stream(io.BytesIO(b"batch bytes"), name)[0] for name in ("c.jpg", "d.jpg", "e.jpg")
+    ]
+    assert app_module.blob_store.stats()["dedup_hits"] >= 2
+
+    first = os.path.join(app_module.TEMP_DIR, file_ids[0])
+    app_module.cached_view_metadata_batch([first], [".jpg"])
+    paths = [os.path.join(app_module.TEMP_DIR, file_id) for file_id in file_ids[1:]]
+    views = app_module.cached_view_metadata_batch(paths, [".jpg", ".jpg"])
+
+    for file_id, path in zip(file_ids[1:], paths):
+        metadata = views[path][0]
+        assert metadata["SourceFile"] == path
+        assert metadata["File:FileName"] == file_id
+        assert file_ids[0] not in json.dumps(metadata)
+
+
+def test_batch_view_scans_like_a_single_view(app_module, monkeypatch):
+    commands = []
+
+    class FakeExifTool:
+        def execute(self, *args):
+            commands.append(args)
+            paths = [arg.decode() for arg in args if not arg.startswith(b"-")]
+            return json.dumps([fake_exiftool_output(path) for path in paths]).encode()
+
+    @contextlib.contextmanager
+    def checkout():
+        yield FakeExifTool()
+
+    monkeypatch.setattr(app_module.exiftool_pool, "checkout", checkout)
+    monkeypatch.setattr(app_module, "split_metadata", lambda metadata, suffix: (metadata, {}, {}))
+    file_ids = [app_module.save_upload_stream(io.BytesIO(name.encode()), name)[0] for name in ("clip.mp4", "photo.jpg")]
+    paths = [os.path.join(app_module.TEMP_DIR, file_id) for file_id in file_ids]
+
+    app_module.cached_view_metadata_batch(paths, [".mp4", ".jpg"])
+    assert sorted(b"-fast" in args for args in commands) == [False, True]
+    assert all((b"-fast" in args) == any(arg.endswith(b".mp4") for arg in args) for args in commands)
+
+    commands.clear()
+    assert app_module.cached_view_selectable(paths[0], ".mp4") == {}
+    assert app_module.cached_view_metadata(paths[1], ".jpg")[0]["SourceFile"] == paths[1]
+    assert commands == []
+
+
+def test_digest_follows_a_same_size_rename(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"before")
+    cache = MetadataCache()
+    before = cache.digest(str(path))
+
+    tmp = tmp_path / "clip.mp4.tmp"
+    tmp.write_bytes(b"after!")
+    st = os.stat(path)
+    os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))  # same size, same mtime tick
+    os.replace(tmp, path)
+
+    assert cache.digest(str(path)) != before
+
+
+def test_path_tags_match_exiftool_n_output(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"same")
+    os.chmod(path, 0o640)
+
+    assert path_tags(str(path))["File:FilePermissions"] == 100640
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    cache = MetadataCache(disk_dir=str(tmp_path), disk_ttl=3600)
+    now = time.time()
+    for i in range(5):
+        cache.put(f"{i:064x}.jpg", ({"EXIF:Make": "x" * 50}, {}, {}))
+        written = now - 7200 if i == 0 else now - 100 + i
+        os.utime(cache._disk_path(f"{i:064x}.jpg"), (written, written))
+    cache.disk_max_bytes = 2 * os.path.getsize(cache._disk_path(f"{0:064x}.jpg"))
+    cache._memory.clear()
+    cache.get(f"{1:064x}.jpg")  # read, so the most recently used
+
+    assert cache.evict_disk() == 3  # entry 0 expired, then the least recently read
+    left = sorted(p.name[:64] for p in tmp_path.rglob("*.json"))
+    assert left == [f"{1:064x}", f"{4:064x}"]
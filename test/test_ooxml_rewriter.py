@@ -0,0 +1,67 @@
+import os
+import shutil
+import struct
+import zipfile
+
+import docx
+import pytest
+
+from conftest import ROOT
+from OfficeMetadataHelper import OfficeMetadataHelper as OMH
+from services.ooxml_rewriter import rewrite_ooxml, rewrite_ooxml_in_place
+
+PART = "word/settings.xml"  # in both fixtures, unlike docProps
+
+
+def raw_members(path):
+    """{name: local header + compressed data} read straight from the file."""
+    members = {}
+    with open(path, "rb") as f, zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            f.seek(info.header_offset)
+            *_, name_length, extra_length = struct.unpack("<4s5H3L2H", f.read(30))
+            f.seek(info.header_offset)
+            members[info.filename] = f.read(30 + name_length + extra_length + info.compress_size)
+    return members
+
+
+@pytest.mark.parametrize("name", ["Test.docx", "Test2.docx"])
+def test_untouched_members_are_copied_byte_for_byte(tmp_path, name):
+    src = os.path.join(ROOT, "test", name)
+    dst = tmp_path / name
+    rewrite_ooxml(src, str(dst), {PART: lambda data: data + b"\n"})
+
+    before, after = raw_members(src), raw_members(dst)
+    assert list(after) == list(before)
+    assert all(after[member] == before[member] for member in before if member != PART)
+    with zipfile.ZipFile(dst) as zf:
+        assert zf.testzip() is None
+        assert zf.read(PART) == zipfile.ZipFile(src).read(PART) + b"\n"
+    docx.Document(str(dst))
+
+
+@pytest.mark.parametrize("name", ["Test.docx", "Test2.docx"])
+def test_clearing_metadata_keeps_the_document(tmp_path, name):
+    path = tmp_path / name
+    shutil.copyfile(os.path.join(ROOT, "test", name), path)
+    text = [p.text for p in docx.Document(str(path)).paragraphs]
+
+    OMH.clear_metadata(str(path))
+
+    assert not any(value for key, value in OMH.get_metadata(str(path)).items() if key.startswith("core:"))
+    assert [p.text for p in docx.Document(str(path)).paragraphs] == text
+    assert [p.name for p in tmp_path.iterdir()] == [name]
+
+
+def test_rewrite_in_place_leaves_nothing_behind_on_error(tmp_path):
+    path = tmp_path / "Test.docx"
+    shutil.copyfile(os.path.join(ROOT, "test", "Test.docx"), path)
+    original = path.read_bytes()
+
+    def fail(data):
+        raise ValueError("bad part")
+
+    with pytest.raises(ValueError):
+        rewrite_ooxml_in_place(str(path), {PART: fail})
+    assert path.read_bytes() == original
+    assert [p.name for p in tmp_path.iterdir()] == ["Test.docx"]
@@ -0,0 +1,82 @@
+import io
+import struct
+import zlib
+
+from PIL import Image, PngImagePlugin
+
+from services.png_stripper import selection_for_tags, strip_png, strip_png_file
+
+XMP_PACKET = '<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF/>SecretXmp</x:xmpmeta>'
+
+
+def png_bytes():
+    """A PNG with text, XMP, EXIF, ICC and tIME chunks."""
+    image = Image.new("RGB", (32, 24), (10, 200, 30))
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Author", "SecretAuthor")
+    info.add_text("Comment", "SecretComment", zip=True)
+    info.add_itxt("XML:com.adobe.xmp", XMP_PACKET)
+    info.add(b"tIME", struct.pack(">HBBBBB", 2024, 5, 6, 7, 8, 9))
+    exif = Image.Exif()
+    exif[0x010F] = "SecretMake"
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", pnginfo=info, exif=exif, icc_profile=b"\0" * 128)
+    return buffer.getvalue()
+
+
+def chunks(data):
+    """(type, data, crc ok) for every chunk."""
+    found = []
+    offset = 8
+    while offset < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        crc = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])[0]
+        found.append((chunk_type, body, zlib.crc32(chunk_type + body) == crc))
+        offset += length + 12
+    return found
+
+
+def strip(data, selection=None):
+    dst = io.BytesIO()
+    dropped = strip_png(io.BytesIO(data), dst, selection)
+    return dst.getvalue(), dropped
+
+
+def test_strip_all_leaves_valid_chunks_and_pixels():
+    data = png_bytes()
+    assert {b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"iCCP", b"tIME"} <= {t for t, _, _ in chunks(data)}
+
+    cleaned, dropped = strip(data)
+
+    assert dropped == len(data) - len(cleaned)
+    assert [t for t, _, _ in chunks(cleaned)] == [b"IHDR", b"IDAT", b"IEND"]
+    assert all(ok for _, _, ok in chunks(cleaned))
+    for secret in (b"SecretAuthor", b"SecretXmp", b"SecretMake"):
+        assert secret not in cleaned
+    image = Image.open(io.BytesIO(cleaned))
+    image.load()
+    assert image.tobytes() == Image.open(io.BytesIO(data)).tobytes()
+    assert not image.info.get("icc_profile") and not image.getexif()
+
+
+def test_selected_keywords_only():
+    cleaned, _ = strip(png_bytes(), selection_for_tags(["PNG:Author"]))
+
+    assert b"SecretAuthor" not in cleaned
+    assert b"SecretXmp" in cleaned and b"SecretMake" in cleaned
+    assert all(ok for _, _, ok in chunks(cleaned))
+    Image.open(io.BytesIO(cleaned)).load()
+
+
+def test_strip_file_in_place(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(png_bytes())
+
+    strip_png_file(str(path))
+
+    cleaned = path.read_bytes()
+    assert all(ok for _, _, ok in chunks(cleaned))
+    assert b"SecretAuthor" not in cleaned
+    Image.open(path).load()
+    assert [p.name for p in tmp_path.iterdir()] == ["image.png"]
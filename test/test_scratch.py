@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+from services.scratch import ScratchSpace
+
+
+def test_start_keeps_other_workers_files(tmp_path):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    ram, disk = tmp_path / "ram", tmp_path / "disk"
+    for root in (ram, disk):
+        for pid in (os.getppid(), exited.pid, os.getpid()):
+            (root / str(pid)).mkdir(parents=True)
+            (root / str(pid) / "in-flight.bin").write_bytes(b"x")
+
+    space = ScratchSpace(str(ram), str(disk))
+    space.start()
+
+    for root in (ram, disk):
+        assert (root / str(os.getppid()) / "in-flight.bin").exists()  # a live worker's
+        assert not (root / str(exited.pid)).exists()
+        assert list((root / str(os.getpid())).iterdir()) == []
+    with space.session() as session:
+        path = session.path(".jpg", size_hint=10)
+        assert os.path.dirname(path) == str(ram / str(os.getpid()))
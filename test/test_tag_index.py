@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+
+from services.tag_index import TagIndex
+
+LISTX = """<?xml version='1.0' encoding='UTF-8'?>
+<taginfo>
+<table name='QuickTime::MovieHeader' g0='QuickTime' g1='QuickTime' g2='Video'>
+ <tag id='4' name='CreateDate' type='int32u' writable='true' flags='Permanent' g2='Time'/>
+</table>
+<table name='QuickTime::UserData' g0='QuickTime' g1='QuickTime' g2='Video'>
+ <tag id='&#xa9;xyz' name='GPSCoordinates' type='undef' writable='true' g2='Location'/>
+</table>
+<table name='Exif::Main' g0='EXIF' g1='IFD0' g2='Image'>
+ <tag id='0x010f' name='Make' type='string' writable='true' g2='Camera'/>
+ <tag id='0x0201' name='ThumbnailOffset' type='int32u' writable='true' flags='Protected,Unsafe'/>
+</table>
+<table name='Extra' g0='File' g1='File' g2='Other'>
+ <tag id='Comment' name='Comment' type='?' writable='true' g2='Image'/>
+ <tag id='FileName' name='FileName' type='?' writable='true'/>
+</table>
+<table name='ICC_Profile::Main' g0='ICC_Profile' g1='ICC_Profile' g2='Camera'>
+ <tag id='desc' name='ProfileDescription' type='?' writable='false'/>
+</table>
+</taginfo>"""
+
+
+class FakePool:
+    def __init__(self):
+        self.commands = []
+
+    @contextmanager
+    def checkout(self):
+        yield self
+
+    version = "13.00"
+
+    def execute(self, *params):
+        self.commands.append(params)
+        return LISTX
+
+
+def test_deletable_skips_permanent_tags_and_keeps_comments(tmp_path):
+    pool = FakePool()
+    index = TagIndex(pool, str(tmp_path / "tag_index.json"))
+    metadata = {
+        "QuickTime:CreateDate": "2024:01:01 00:00:00",
+        "QuickTime:GPSCoordinates": "12.3 -45.6",
+        "File:Comment": "secret",
+        "File:FileName": "a.jpg",
+        "EXIF:Make": "SecretMake",
+        "EXIF:ThumbnailOffset": 1234,
+        "ICC_Profile:ProfileDescription": "Display P3",
+    }
+
+    assert list(index.deletable(metadata, "MP4/MOV")) == ["QuickTime:GPSCoordinates", "EXIF:Make"]
+    assert list(index.deletable(metadata, "JPEG/HEIC/TIFF")) == [
+        "File:Comment", "EXIF:Make", "ICC_Profile:ProfileDescription",
+    ]
+    assert pool.commands == [("-listx", "-f")]
+    assert index.unknown_tags(["QuickTime:CreateDate", "ICC_Profile:all", "EXIF:Make"]) == ["QuickTime:CreateDate"]
+
+    reloaded = TagIndex(pool, str(tmp_path / "tag_index.json"))
+    reloaded.load()
+    assert pool.commands == [("-listx", "-f")]  # served from the cache file